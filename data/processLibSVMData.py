@@ -1,33 +1,401 @@
 import numpy
+import scipy.sparse
+import scipy.sparse.linalg
+import json
+import multiprocessing
+import os
+import time
 
+# number of bytes of the input file that are read and parsed at a time
+CHUNK_BYTES = 2 ** 26
 
-def parseRawDataUtil(idxValStr):
-    idxValPair = idxValStr[2:-1].split(':') ###
-    #idxValPair = idxValStr.split(':') ###
-    return [int(idxValPair[0]), float(idxValPair[1])]
 
-def parseRawData(rawData, d):
-    labelVec = numpy.zeros(d + 1)
-    labelVec[0] = float(rawData[0][2:-1]) ####
-    #labelVec[0] = float(rawData[0]) ####
-    vecStr = rawData[1:]
-    vecIdxVal = list(map(parseRawDataUtil, vecStr))
-    for idxValPair in vecIdxVal:
-        labelVec[idxValPair[0]] = idxValPair[1]
-    return labelVec
+def iterLibSVMChunks(inputFileName, chunkBytes=CHUNK_BYTES, startByte=0, stopByte=None):
+    '''
+    Read A Text File in Chunks of Complete Lines
 
-def processLibSVMData(inputFileName, d):
-    outputFileName = inputFileName + '.npy'
-    
-    listArrayStr = numpy.loadtxt(inputFileName, dtype='str')
-    n = len(listArrayStr)
-    mat = numpy.zeros((n, d+1))
-    for i in range(n):
-        rawData = listArrayStr[i]
-        mat[i, :] = parseRawData(rawData, d)
-    
-    numpy.save(outputFileName, mat)
-    return mat
+    Input
+        inputFileName: path of the file;
+        chunkBytes: approximate number of bytes in a chunk;
+        startByte, stopByte: only the bytes startByte, ..., stopByte-1 are read (default: the whole file);
+                             they should be line boundaries (see splitByteRanges).
+    Output
+        a generator of bytes objects, each ending at a line break (except possibly the last).
+    '''
+    tailBytes = b''
+    with open(inputFileName, 'rb') as f:
+        f.seek(startByte)
+        remainBytes = os.path.getsize(inputFileName) - startByte if stopByte is None else stopByte - startByte
+        while remainBytes > 0:
+            blockBytes = f.read(min(chunkBytes, remainBytes))
+            remainBytes -= len(blockBytes)
+            if len(blockBytes) == 0:
+                break
+            blockBytes = tailBytes + blockBytes
+            lastNewline = blockBytes.rfind(b'\n')
+            if lastNewline < 0:
+                tailBytes = blockBytes
+                continue
+            tailBytes = blockBytes[lastNewline+1:]
+            yield blockBytes[:lastNewline+1]
+    if len(tailBytes) > 0:
+        yield tailBytes
+
+def splitLibSVMLines(chunkBytes):
+    '''
+    Line Structure of A Chunk of LibSVM Data
+
+    Input
+        chunkBytes: bytes containing complete lines.
+    Output
+        colonVec: number of "index:value" pairs in each nonblank line.
+    '''
+    byteVec = numpy.frombuffer(chunkBytes, dtype=numpy.uint8)
+    lineEndVec = numpy.flatnonzero(byteVec == ord('\n'))
+    if len(lineEndVec) == 0 or lineEndVec[-1] < len(byteVec) - 1:
+        lineEndVec = numpy.append(lineEndVec, len(byteVec))
+    colonPosVec = numpy.flatnonzero(byteVec == ord(':'))
+    colonVec = numpy.bincount(numpy.searchsorted(lineEndVec, colonPosVec), minlength=len(lineEndVec))
+    # a line without colons is either blank or contains only a label
+    isNonblankVec = colonVec > 0
+    for i in numpy.flatnonzero(colonVec == 0):
+        lineStart = lineEndVec[i-1] + 1 if i > 0 else 0
+        isNonblankVec[i] = len(chunkBytes[lineStart:lineEndVec[i]].strip()) > 0
+    return colonVec[isNonblankVec]
+
+def splitByteRanges(inputFileName, numRanges):
+    '''
+    Split A Text File into Byte Ranges Aligned on Line Breaks
+
+    Input
+        inputFileName: path of the file;
+        numRanges: number of ranges (nearly equal in bytes).
+    Output
+        rangeList: list of (startByte, stopByte); every range starts at the beginning of a line.
+    '''
+    size = os.path.getsize(inputFileName)
+    boundList = [0]
+    with open(inputFileName, 'rb') as f:
+        for k in range(1, numRanges):
+            f.seek(max((k * size) // numRanges - 1, boundList[-1]))
+            f.readline()
+            boundList.append(min(f.tell(), size))
+    boundList.append(size)
+    return [(boundList[k], boundList[k+1]) for k in range(numRanges) if boundList[k+1] > boundList[k]]
+
+def mapRanges(func, argList, processes=None):
+    '''
+    Apply func to every tuple of argList, in a pool of processes if processes > 1
+    '''
+    if processes is None or processes <= 1 or len(argList) <= 1:
+        return list(map(func, argList))
+    with multiprocessing.Pool(min(processes, len(argList))) as pool:
+        return pool.map(func, argList)
+
+def countLibSVMRange(argTuple):
+    '''
+    Number of Samples and Number of Nonzeros in A Byte Range of A LibSVM File
+
+    Input
+        argTuple: (inputFileName, startByte, stopByte, chunkBytes).
+    Output
+        n: number of nonblank lines;
+        nnz: number of "index:value" pairs.
+    '''
+    inputFileName, startByte, stopByte, chunkBytes = argTuple
+    n, nnz = 0, 0
+    for chunk in iterLibSVMChunks(inputFileName, chunkBytes, startByte, stopByte):
+        colonVec = splitLibSVMLines(chunk)
+        n += len(colonVec)
+        nnz += int(numpy.sum(colonVec))
+    return n, nnz
+
+def countLibSVM(inputFileName, chunkBytes=CHUNK_BYTES):
+    '''
+    Number of samples and number of nonzeros of a LibSVM file (see countLibSVMRange)
+    '''
+    return countLibSVMRange((inputFileName, 0, None, chunkBytes))
+
+def tokenizeLibSVMChunk(chunkBytes, colonVec=None):
+    '''
+    Vectorized Tokenizer of LibSVM Lines
+
+    Input
+        chunkBytes: bytes containing complete lines "label index:value index:value ...";
+        colonVec: output of splitLibSVMLines(chunkBytes), if already computed (optional).
+    Output
+        labelVec: n-dim vector of labels (one per nonblank line);
+        colonVec: n-dim vector containing the number of pairs in each line;
+        idxVec: vector of (1-based) feature indices of all the pairs, line by line;
+        valVec: vector of the values of the pairs.
+
+    All the numbers of the chunk are converted by a single call of numpy.fromstring;
+    the line structure is recovered from the number of colons in each line.
+    '''
+    if colonVec is None:
+        colonVec = splitLibSVMLines(chunkBytes)
+    n = len(colonVec)
+    if n == 0:
+        return numpy.zeros(0), colonVec, numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0)
+    try:
+        tokenVec = numpy.fromstring(chunkBytes.replace(b':', b' '), dtype=numpy.float64, sep=' ')
+    except ValueError:
+        raise ValueError('The chunk contains a token that is not a number.')
+    countVec = 1 + 2 * colonVec
+    if len(tokenVec) != numpy.sum(countVec):
+        raise ValueError('The chunk is not in the LibSVM format "label index:value ...".')
+
+    labelPosVec = numpy.zeros(n, dtype=numpy.int64)
+    numpy.cumsum(countVec[0:-1], out=labelPosVec[1:])
+    labelVec = tokenVec[labelPosVec]
+    isPairVec = numpy.ones(len(tokenVec), dtype=bool)
+    isPairVec[labelPosVec] = False
+    pairMat = tokenVec[isPairVec].reshape(-1, 2)
+    idxVec = pairMat[:, 0].astype(numpy.int64)
+    return labelVec, colonVec, idxVec, pairMat[:, 1]
+
+def checkIndices(idxVec, d):
+    if len(idxVec) > 0 and (idxVec.min() < 1 or idxVec.max() > d):
+        raise ValueError('A feature index is out of the range 1, ..., ' + str(d) + '.')
+
+def parseLibSVMChunk(chunkBytes, d, outMat=None, colonVec=None):
+    '''
+    Vectorized Parser of LibSVM Lines
+
+    Input
+        chunkBytes: bytes containing complete lines "label index:value index:value ...",
+                    where the indices are in {1, ..., d};
+        d: number of features;
+        outMat: zero matrix with d+1 columns and as many rows as the nonblank lines (optional);
+                it is filled in place, e.g. a slice of a memory map;
+        colonVec: output of splitLibSVMLines(chunkBytes), if already computed (optional).
+    Output
+        outMat: matrix whose 0-th column contains the labels
+                and whose j-th column contains the j-th feature.
+    '''
+    labelVec, colonVec, idxVec, valVec = tokenizeLibSVMChunk(chunkBytes, colonVec)
+    checkIndices(idxVec, d)
+    n = len(labelVec)
+    if outMat is None:
+        outMat = numpy.zeros((n, d+1))
+    outMat[:, 0] = labelVec
+    rowVec = numpy.repeat(numpy.arange(n), colonVec)
+    outMat[rowVec, idxVec] = valVec
+    return outMat
+
+def countRanges(inputFileName, chunkBytes, processes):
+    '''
+    Split the file into byte ranges and count their rows and nonzeros.
+
+    Output
+        rangeList: list of (startByte, stopByte);
+        rowStartVec, nnzStartVec: the first row and the first nonzero of every range (and the totals at the end).
+    '''
+    numRanges = 1 if processes is None or processes <= 1 else 4 * processes
+    rangeList = splitByteRanges(inputFileName, numRanges)
+    countList = mapRanges(countLibSVMRange, [(inputFileName, r[0], r[1], chunkBytes) for r in rangeList], processes)
+    rowStartVec = numpy.concatenate(([0], numpy.cumsum([c[0] for c in countList], dtype=numpy.int64)))
+    nnzStartVec = numpy.concatenate(([0], numpy.cumsum([c[1] for c in countList], dtype=numpy.int64)))
+    return rangeList, rowStartVec, nnzStartVec
+
+def parseLibSVMRange(argTuple):
+    '''
+    Parse A Byte Range of A LibSVM File into the Dense Output
+
+    Input
+        argTuple: (inputFileName, startByte, stopByte, chunkBytes, outputFileName, d, rowStart);
+                  the rows of the range are written into the rows rowStart, ... of the .npy file outputFileName.
+    '''
+    inputFileName, startByte, stopByte, chunkBytes, outputFileName, d, rowStart = argTuple
+    mat = numpy.load(outputFileName, mmap_mode='r+')
+    i = rowStart
+    for chunk in iterLibSVMChunks(inputFileName, chunkBytes, startByte, stopByte):
+        colonVec = splitLibSVMLines(chunk)
+        k = len(colonVec)
+        parseLibSVMChunk(chunk, d, mat[i:i+k, :], colonVec)
+        i += k
+    mat.flush()
+
+def processLibSVMData(inputFileName, d, outputFileName=None, chunkBytes=CHUNK_BYTES, verbose=True, processes=None):
+    '''
+    Convert A LibSVM File to A .npy File
+
+    Input
+        inputFileName: path of the LibSVM file;
+        d: number of features;
+        outputFileName: path of the .npy file (default: inputFileName + '.npy');
+        chunkBytes: approximate number of bytes parsed at a time;
+        verbose: if True, the number of rows per second is printed;
+        processes: number of worker processes (optional).
+    Output
+        mat: n-by-(d+1) memory map of the .npy file;
+             the 0-th column contains the labels.
+
+    The file is read twice in chunks: once to count the rows and once to parse them.
+    Each chunk is written directly into the memory-mapped output,
+    so the memory does not grow with the size of the file.
+    If processes > 1, the file is split into byte ranges aligned on line breaks (see splitByteRanges),
+    and both passes are done by a pool of processes; every process writes its rows at their offsets.
+    '''
+    if outputFileName is None:
+        outputFileName = inputFileName + '.npy'
+    t0 = time.perf_counter()
+    rangeList, rowStartVec, nnzStartVec = countRanges(inputFileName, chunkBytes, processes)
+    n = int(rowStartVec[-1])
+    mat = numpy.lib.format.open_memmap(outputFileName, mode='w+', dtype=numpy.float64, shape=(n, d+1))
+    del mat
+    argList = [(inputFileName, rangeList[k][0], rangeList[k][1], chunkBytes, outputFileName, d, int(rowStartVec[k]))
+               for k in range(len(rangeList))]
+    mapRanges(parseLibSVMRange, argList, processes)
+    elapsed = time.perf_counter() - t0
+    if verbose:
+        print('Parsed ' + str(n) + ' rows in ' + str(elapsed) + ' seconds (' + str(n / max(elapsed, 1e-12)) + ' rows/s).')
+    return numpy.load(outputFileName, mmap_mode='r+')
+
+def parseLibSVMRangeCSR(argTuple):
+    '''
+    Parse A Byte Range of A LibSVM File into the CSR Arrays
+
+    Input
+        argTuple: (inputFileName, startByte, stopByte, chunkBytes, cacheDirName, d, rowStart, nnzStart);
+                  the range starts at the row rowStart and at the nonzero nnzStart of the arrays in cacheDirName.
+    '''
+    inputFileName, startByte, stopByte, chunkBytes, cacheDirName, d, rowStart, nnzStart = argTuple
+    loadArray = lambda name: numpy.load(os.path.join(cacheDirName, 'csr_' + name + '.npy'), mmap_mode='r+')
+    labelVec, indptrVec, indicesVec, dataVec = [loadArray(name) for name in ['labels', 'indptr', 'indices', 'data']]
+    i, pos = rowStart, nnzStart
+    for chunk in iterLibSVMChunks(inputFileName, chunkBytes, startByte, stopByte):
+        labelChunk, colonVec, idxVec, valVec = tokenizeLibSVMChunk(chunk)
+        checkIndices(idxVec, d)
+        k, l = len(labelChunk), len(idxVec)
+        labelVec[i:i+k] = labelChunk
+        indptrVec[i+1:i+k+1] = pos + numpy.cumsum(colonVec)
+        indicesVec[pos:pos+l] = idxVec - 1
+        dataVec[pos:pos+l] = valVec
+        i, pos = i + k, pos + l
+    for vec in [labelVec, indptrVec, indicesVec, dataVec]:
+        vec.flush()
+
+def processLibSVMDataCSR(inputFileName, d, cacheDirName=None, chunkBytes=CHUNK_BYTES, verbose=True, processes=None):
+    '''
+    Convert A LibSVM File to CSR Arrays
+
+    Input
+        inputFileName: path of the LibSVM file;
+        d: number of features;
+        cacheDirName: directory of the output (default: inputFileName + '.cache');
+        chunkBytes: approximate number of bytes parsed at a time;
+        verbose: if True, the number of rows per second is printed;
+        processes: number of worker processes (optional, see processLibSVMData).
+    Output
+        xMat: n-by-d scipy.sparse CSR matrix of features;
+        labelVec: n-dim vector of labels.
+
+    The directory contains the raw arrays csr_indptr.npy, csr_indices.npy, csr_data.npy and csr_labels.npy,
+    which are filled chunk by chunk as memory maps and returned as memory maps (see loadLibSVMCache),
+    and csr.json, which records the source file (see isCacheValid).
+    The feature indices are 0-based in the CSR matrix.
+    '''
+    if cacheDirName is None:
+        cacheDirName = inputFileName + '.cache'
+    os.makedirs(cacheDirName, exist_ok=True)
+    metaFileName = os.path.join(cacheDirName, 'csr.json')
+    if os.path.exists(metaFileName):
+        os.remove(metaFileName)
+    t0 = time.perf_counter()
+    rangeList, rowStartVec, nnzStartVec = countRanges(inputFileName, chunkBytes, processes)
+    n, nnz = int(rowStartVec[-1]), int(nnzStartVec[-1])
+    idxType = numpy.int32 if max(nnz, d) < 2 ** 31 else numpy.int64
+    for name, dtype, shape in [('labels', numpy.float64, (n,)), ('indptr', idxType, (n+1,)),
+                               ('indices', idxType, (nnz,)), ('data', numpy.float64, (nnz,))]:
+        vec = numpy.lib.format.open_memmap(os.path.join(cacheDirName, 'csr_' + name + '.npy'), mode='w+', dtype=dtype, shape=shape)
+        del vec
+    argList = [(inputFileName, rangeList[k][0], rangeList[k][1], chunkBytes, cacheDirName, d,
+                int(rowStartVec[k]), int(nnzStartVec[k])) for k in range(len(rangeList))]
+    mapRanges(parseLibSVMRangeCSR, argList, processes)
+    writeCacheMeta(inputFileName, metaFileName, {'d': d, 'n': n, 'nnz': nnz})
+    elapsed = time.perf_counter() - t0
+    if verbose:
+        print('Parsed ' + str(n) + ' rows in ' + str(elapsed) + ' seconds (' + str(n / max(elapsed, 1e-12)) + ' rows/s).')
+    return loadLibSVMCache(cacheDirName, sparse=True)
+
+def sourceInfo(inputFileName):
+    '''
+    Size and modification time of the source file, which identify the version a cache was built from
+    '''
+    st = os.stat(inputFileName)
+    return {'sourceSize': st.st_size, 'sourceMtime': st.st_mtime_ns}
+
+def writeCacheMeta(inputFileName, metaFileName, infoDict):
+    infoDict = dict(infoDict)
+    infoDict.update(sourceInfo(inputFileName))
+    with open(metaFileName, 'w') as f:
+        json.dump(infoDict, f)
+
+def isCacheValid(inputFileName, cacheDirName, d, sparse=False):
+    '''
+    Whether the cache was completely built from the current version of the source file
+
+    The meta file is written after the arrays, so an interrupted build is never valid,
+    and a source file whose size or modification time changed invalidates the cache.
+    '''
+    metaFileName = os.path.join(cacheDirName, 'csr.json' if sparse else 'dense.json')
+    if not os.path.exists(metaFileName):
+        return False
+    with open(metaFileName) as f:
+        infoDict = json.load(f)
+    trueDict = sourceInfo(inputFileName)
+    return (infoDict.get('d') == d and infoDict.get('sourceSize') == trueDict['sourceSize']
+            and infoDict.get('sourceMtime') == trueDict['sourceMtime'])
+
+def loadLibSVMCache(cacheDirName, sparse=False, mmapMode='r'):
+    '''
+    Open A Cache Built by loadLibSVMData without Copying
+
+    Output
+        if sparse: (xMat, labelVec), where xMat is a scipy.sparse CSR matrix whose arrays are memory maps;
+        otherwise: n-by-(d+1) memory map whose 0-th column contains the labels.
+    '''
+    if not sparse:
+        return numpy.load(os.path.join(cacheDirName, 'dense.npy'), mmap_mode=mmapMode)
+    with open(os.path.join(cacheDirName, 'csr.json')) as f:
+        infoDict = json.load(f)
+    loadArray = lambda name: numpy.load(os.path.join(cacheDirName, 'csr_' + name + '.npy'), mmap_mode=mmapMode)
+    xMat = scipy.sparse.csr_matrix((loadArray('data'), loadArray('indices'), loadArray('indptr')),
+                                   shape=(infoDict['n'], infoDict['d']), copy=False)
+    return xMat, loadArray('labels')
+
+def loadLibSVMData(inputFileName, d, sparse=False, cacheDirName=None, chunkBytes=CHUNK_BYTES, verbose=True, processes=None):
+    '''
+    Load A LibSVM File through A Binary Cache
+
+    Input
+        inputFileName: path of the LibSVM file;
+        d: number of features;
+        sparse: if True, CSR arrays are built instead of a dense matrix;
+        cacheDirName: directory of the cache (default: inputFileName + '.cache');
+        chunkBytes, verbose, processes: see processLibSVMData.
+    Output
+        if sparse: (xMat, labelVec) (see processLibSVMDataCSR);
+        otherwise: n-by-(d+1) matrix whose 0-th column contains the labels (see processLibSVMData).
+
+    The file is parsed only if the cache is missing or stale (see isCacheValid);
+    otherwise the cached arrays are memory-mapped.
+    '''
+    if cacheDirName is None:
+        cacheDirName = inputFileName + '.cache'
+    if isCacheValid(inputFileName, cacheDirName, d, sparse):
+        return loadLibSVMCache(cacheDirName, sparse)
+    if sparse:
+        return processLibSVMDataCSR(inputFileName, d, cacheDirName, chunkBytes, verbose, processes)
+    os.makedirs(cacheDirName, exist_ok=True)
+    metaFileName = os.path.join(cacheDirName, 'dense.json')
+    if os.path.exists(metaFileName):
+        os.remove(metaFileName)
+    mat = processLibSVMData(inputFileName, d, os.path.join(cacheDirName, 'dense.npy'), chunkBytes, verbose, processes)
+    del mat
+    writeCacheMeta(inputFileName, metaFileName, {'d': d})
+    return loadLibSVMCache(cacheDirName, sparse)
 
 def normalizationTrain(xInputMat, yInputVec):
     yBiasReal = numpy.mean(yInputVec)
@@ -40,6 +408,121 @@ def normalizationTest(xInputMat, yInputVec, yBiasReal, xMaxVec):
     yOutputVec = yInputVec - yBiasReal
     xOutputMat = xInputMat / xMaxVec.reshape(1, len(xMaxVec))
     return xOutputMat, yOutputVec
+
+class StreamingNormalizer(object):
+    '''
+    One-Pass Normalization Statistics over Chunks of Samples
+
+    The statistics of normalizationTrain, i.e. the max-abs of every feature and the mean of the labels,
+    are accumulated chunk by chunk, e.g. over a memory map, so the data are never loaded as a whole.
+    Optionally, the mean and the variance of every feature are accumulated by Welford's (Chan's) update.
+
+    Input
+        useMeanVar: if True, xMeanVec and xVarVec are also computed.
+
+    Attributes (after fit or update)
+        xMaxVec: d-dim vector of max-abs of the features;
+        yBiasReal: mean of the labels;
+        xMeanVec, xVarVec: d-dim vectors of means and (population) variances of the features (if useMeanVar).
+
+    Methods
+        update(xChunk, yChunk): add a chunk (dense or scipy.sparse xChunk);
+        fit(mat, chunkRows): one pass over an n-by-(d+1) matrix whose 0-th column contains the labels;
+        transform(xChunk, yChunk): the normalized chunk, as normalizationTest;
+        normalizeInPlace(mat, chunkRows): normalize an n-by-(d+1) (writable) memory map chunk by chunk;
+        scaleVec(): the diagonal of D, where the normalized features are X * D;
+        asLinearOperator(xMat): X * D as a scipy.sparse.linalg.LinearOperator, without forming it.
+    '''
+    def __init__(self, useMeanVar=False):
+        self.useMeanVar = useMeanVar
+        self.n = 0
+        self.xMaxVec = None
+        self.ySumReal = 0.0
+        self.yBiasReal = 0.0
+        self.xMeanVec = None
+        self.xM2Vec = None
+        self.xVarVec = None
+
+    def update(self, xChunk, yChunk):
+        nChunk = xChunk.shape[0]
+        if nChunk == 0:
+            return self
+        if scipy.sparse.issparse(xChunk):
+            maxVec = numpy.asarray(abs(xChunk).max(axis=0).todense()).ravel()
+        else:
+            maxVec = numpy.max(numpy.abs(xChunk), axis=0)
+        self.xMaxVec = maxVec if self.xMaxVec is None else numpy.maximum(self.xMaxVec, maxVec)
+        self.ySumReal += float(numpy.sum(yChunk))
+        if self.useMeanVar:
+            meanVec = numpy.asarray(xChunk.mean(axis=0)).ravel()
+            if scipy.sparse.issparse(xChunk):
+                sqVec = numpy.asarray(xChunk.multiply(xChunk).sum(axis=0)).ravel()
+                m2Vec = numpy.maximum(sqVec - nChunk * meanVec ** 2, 0)
+            else:
+                m2Vec = numpy.sum((xChunk - meanVec.reshape(1, len(meanVec))) ** 2, axis=0)
+            if self.xMeanVec is None:
+                self.xMeanVec, self.xM2Vec = meanVec, m2Vec
+            else:
+                deltaVec = meanVec - self.xMeanVec
+                total = self.n + nChunk
+                self.xMeanVec = self.xMeanVec + deltaVec * (nChunk / total)
+                self.xM2Vec = self.xM2Vec + m2Vec + deltaVec ** 2 * (self.n * nChunk / total)
+        self.n += nChunk
+        self.yBiasReal = self.ySumReal / self.n
+        if self.useMeanVar:
+            self.xVarVec = self.xM2Vec / self.n
+        return self
+
+    def fit(self, mat, chunkRows=65536):
+        '''
+        One pass over the n-by-(d+1) matrix mat (e.g. the memory map returned by processLibSVMData)
+        '''
+        for i in range(0, mat.shape[0], chunkRows):
+            chunk = numpy.asarray(mat[i:i+chunkRows, :])
+            self.update(chunk[:, 1:], chunk[:, 0])
+        return self
+
+    def scaleVec(self):
+        '''
+        The diagonal of D = diag(1 / xMaxVec); features that are always zero are not scaled.
+        '''
+        maxVec = numpy.where(self.xMaxVec > 0, self.xMaxVec, 1.0)
+        return 1.0 / maxVec
+
+    def transform(self, xChunk, yChunk):
+        '''
+        Output
+            xOutputMat: X * D (dense or scipy.sparse as xChunk);
+            yOutputVec: y - yBiasReal.
+        '''
+        if scipy.sparse.issparse(xChunk):
+            xOutputMat = scipy.sparse.csr_matrix(xChunk.multiply(self.scaleVec().reshape(1, -1)))
+        else:
+            xOutputMat = xChunk * self.scaleVec().reshape(1, -1)
+        return xOutputMat, yChunk - self.yBiasReal
+
+    def normalizeInPlace(self, mat, chunkRows=65536):
+        '''
+        Normalize the n-by-(d+1) matrix mat (labels in the 0-th column) in place, chunk by chunk,
+        e.g. a memory map opened with mmap_mode='r+'; no n-by-d copy is made.
+        '''
+        scaleVec = self.scaleVec().reshape(1, -1)
+        for i in range(0, mat.shape[0], chunkRows):
+            mat[i:i+chunkRows, 1:] *= scaleVec
+            mat[i:i+chunkRows, 0] -= self.yBiasReal
+        if hasattr(mat, 'flush'):
+            mat.flush()
+        return mat
+
+    def asLinearOperator(self, xMat):
+        '''
+        The normalized features X * D as a scipy.sparse.linalg.LinearOperator.
+        Products with X * D cost the same as with X plus O(d), and the normalized copy is never formed;
+        e.g. a sketch S^T * X * D is (S^T * X) * D.
+        '''
+        scaleVec = self.scaleVec()
+        xOperator = scipy.sparse.linalg.aslinearoperator(xMat)
+        return xOperator * scipy.sparse.linalg.aslinearoperator(scipy.sparse.diags(scaleVec))
     
 
 if __name__ == '__main__':
@@ -0,0 +1,169 @@
+import numpy
+import scipy.sparse
+import tempfile
+import unittest
+import os
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir + 'data/')
+
+import processLibSVMData as libsvm
+
+
+def writeLibSVM(fileName, mat):
+    '''
+    Write the n-by-(d+1) matrix mat (labels in the 0-th column) in the LibSVM format, skipping zeros
+    '''
+    with open(fileName, 'w') as f:
+        for row in mat:
+            pairStr = ' '.join(str(j) + ':' + repr(float(row[j])) for j in range(1, len(row)) if row[j] != 0)
+            f.write(repr(float(row[0])) + ' ' + pairStr + '\n')
+
+
+class TestLibSVM(unittest.TestCase):
+    def test_chunk(self):
+        chunkBytes = b'1 1:2 3:4.5\n\n   \n-2\n3 2:1e3\r\n+4 1:-5 3:0.25'
+        mat = libsvm.parseLibSVMChunk(chunkBytes, 3)
+        trueMat = numpy.array([[1, 2, 0, 4.5], [-2, 0, 0, 0], [3, 0, 1000, 0], [4, -5, 0, 0.25]])
+        self.assertTrue(numpy.array_equal(mat, trueMat))
+
+    def test_error(self):
+        with self.assertRaises(ValueError):
+            libsvm.parseLibSVMChunk(b'1 1:2 4:3\n', 3)
+        with self.assertRaises(ValueError):
+            libsvm.parseLibSVMChunk(b'1 1:2 3:x\n', 3)
+        with self.assertRaises(ValueError):
+            libsvm.parseLibSVMChunk(b'1 1:2 3\n', 3)
+
+    def test_file(self):
+        '''
+        The chunks must not depend on where the file is cut.
+        '''
+        d = 20
+        mat = numpy.round(numpy.random.randn(1000, d+1), 3) * (numpy.random.rand(1000, d+1) < 0.5)
+        with tempfile.TemporaryDirectory() as dirName:
+            inputFileName = os.path.join(dirName, 'data.txt')
+            writeLibSVM(inputFileName, mat)
+            for chunkBytes in [100, 1000, 2 ** 20]:
+                outMat = libsvm.processLibSVMData(inputFileName, d, chunkBytes=chunkBytes, verbose=False)
+                self.assertTrue(numpy.array_equal(numpy.array(outMat), mat))
+                del outMat
+            self.assertTrue(numpy.array_equal(numpy.load(inputFileName + '.npy'), mat))
+
+    def test_csr(self):
+        d = 20
+        mat = numpy.round(numpy.random.randn(500, d+1), 3) * (numpy.random.rand(500, d+1) < 0.3)
+        with tempfile.TemporaryDirectory() as dirName:
+            inputFileName = os.path.join(dirName, 'data.txt')
+            writeLibSVM(inputFileName, mat)
+            xMat, labelVec = libsvm.processLibSVMDataCSR(inputFileName, d, chunkBytes=1000, verbose=False)
+            self.assertEqual(xMat.shape, (500, d))
+            self.assertTrue(numpy.array_equal(xMat.toarray(), mat[:, 1:]))
+            self.assertTrue(numpy.array_equal(labelVec, mat[:, 0]))
+            # the arrays are read-only memory maps of the cache, not copies
+            self.assertFalse(xMat.data.flags.writeable)
+            self.assertFalse(xMat.indices.flags.writeable)
+            del xMat, labelVec
+
+    def test_cache(self):
+        d = 20
+        mat = numpy.round(numpy.random.randn(300, d+1), 3)
+        with tempfile.TemporaryDirectory() as dirName:
+            inputFileName = os.path.join(dirName, 'data.txt')
+            writeLibSVM(inputFileName, mat)
+            for sparse in [False, True]:
+                self.assertFalse(libsvm.isCacheValid(inputFileName, inputFileName + '.cache', d, sparse))
+                libsvm.loadLibSVMData(inputFileName, d, sparse, verbose=False)
+                self.assertTrue(libsvm.isCacheValid(inputFileName, inputFileName + '.cache', d, sparse))
+                self.assertFalse(libsvm.isCacheValid(inputFileName, inputFileName + '.cache', d+1, sparse))
+
+            # a changed source file invalidates both caches
+            writeLibSVM(inputFileName, mat[0:200, :])
+            for sparse in [False, True]:
+                self.assertFalse(libsvm.isCacheValid(inputFileName, inputFileName + '.cache', d, sparse))
+            outMat = libsvm.loadLibSVMData(inputFileName, d, verbose=False)
+            self.assertTrue(numpy.array_equal(numpy.array(outMat), mat[0:200, :]))
+            xMat, labelVec = libsvm.loadLibSVMData(inputFileName, d, sparse=True, verbose=False)
+            self.assertTrue(numpy.array_equal(xMat.toarray(), mat[0:200, 1:]))
+            del outMat, xMat, labelVec
+
+    def test_ranges(self):
+        d = 20
+        mat = numpy.round(numpy.random.randn(400, d+1), 3) * (numpy.random.rand(400, d+1) < 0.5)
+        with tempfile.TemporaryDirectory() as dirName:
+            inputFileName = os.path.join(dirName, 'data.txt')
+            writeLibSVM(inputFileName, mat)
+            with open(inputFileName, 'rb') as f:
+                fileBytes = f.read()
+            rangeList = libsvm.splitByteRanges(inputFileName, 7)
+            self.assertEqual(rangeList[0][0], 0)
+            self.assertEqual(rangeList[-1][1], len(fileBytes))
+            for k in range(len(rangeList)):
+                self.assertTrue(rangeList[k][0] == 0 or fileBytes[rangeList[k][0]-1:rangeList[k][0]] == b'\n')
+                if k > 0:
+                    self.assertEqual(rangeList[k][0], rangeList[k-1][1])
+
+    def test_processes(self):
+        d = 20
+        mat = numpy.round(numpy.random.randn(2000, d+1), 3) * (numpy.random.rand(2000, d+1) < 0.5)
+        with tempfile.TemporaryDirectory() as dirName:
+            inputFileName = os.path.join(dirName, 'data.txt')
+            writeLibSVM(inputFileName, mat)
+            outMat = libsvm.processLibSVMData(inputFileName, d, chunkBytes=5000, verbose=False, processes=3)
+            self.assertTrue(numpy.array_equal(numpy.array(outMat), mat))
+            xMat, labelVec = libsvm.processLibSVMDataCSR(inputFileName, d, chunkBytes=5000, verbose=False, processes=3)
+            self.assertTrue(numpy.array_equal(xMat.toarray(), mat[:, 1:]))
+            self.assertTrue(numpy.array_equal(labelVec, mat[:, 0]))
+            del outMat, xMat, labelVec
+
+    def test_normalizer(self):
+        mat = numpy.random.randn(1000, 11) * numpy.arange(1, 12)
+        mat[:, 5] = 0
+        xMat, yVec = mat[:, 1:], mat[:, 0]
+        normalizer = libsvm.StreamingNormalizer(useMeanVar=True)
+        for i in range(0, 1000, 300):
+            normalizer.update(xMat[i:i+300, :], yVec[i:i+300])
+        self.assertEqual(normalizer.n, 1000)
+        self.assertTrue(numpy.allclose(normalizer.xMaxVec, numpy.max(numpy.abs(xMat), axis=0)))
+        self.assertTrue(numpy.allclose(normalizer.yBiasReal, numpy.mean(yVec)))
+        self.assertTrue(numpy.allclose(normalizer.xMeanVec, numpy.mean(xMat, axis=0)))
+        self.assertTrue(numpy.allclose(normalizer.xVarVec, numpy.var(xMat, axis=0)))
+
+        # sparse chunks
+        normalizer2 = libsvm.StreamingNormalizer(useMeanVar=True)
+        for i in range(0, 1000, 300):
+            normalizer2.update(scipy.sparse.csr_matrix(xMat[i:i+300, :]), yVec[i:i+300])
+        self.assertTrue(numpy.allclose(normalizer.xMaxVec, normalizer2.xMaxVec))
+        self.assertTrue(numpy.allclose(normalizer.xVarVec, normalizer2.xVarVec))
+
+        # the same normalization as normalizationTest, except for the zero feature
+        xOutputMat, yOutputVec = normalizer.transform(xMat, yVec)
+        xTrueMat, yTrueVec = libsvm.normalizationTest(xMat, yVec, numpy.mean(yVec), normalizer.scaleVec() ** -1)
+        self.assertTrue(numpy.allclose(xOutputMat, xTrueMat))
+        self.assertTrue(numpy.allclose(yOutputVec, yTrueVec))
+        self.assertTrue(numpy.all(xOutputMat[:, 4] == 0))
+
+        # lazy scaling
+        wVec = numpy.random.randn(10)
+        xOperator = normalizer.asLinearOperator(xMat)
+        self.assertTrue(numpy.allclose(xOperator.matvec(wVec), xOutputMat.dot(wVec)))
+        self.assertTrue(numpy.allclose(xOperator.rmatvec(yVec), xOutputMat.T.dot(yVec)))
+
+    def test_normalize_in_place(self):
+        mat = numpy.random.randn(1000, 11)
+        with tempfile.TemporaryDirectory() as dirName:
+            fileName = os.path.join(dirName, 'mat.npy')
+            numpy.save(fileName, mat)
+            mmapMat = numpy.load(fileName, mmap_mode='r+')
+            normalizer = libsvm.StreamingNormalizer().fit(mmapMat, chunkRows=128)
+            normalizer.normalizeInPlace(mmapMat, chunkRows=128)
+            del mmapMat
+            xTrueMat, yTrueVec, yBiasReal, xMaxVec = libsvm.normalizationTrain(mat[:, 1:], mat[:, 0])
+            outMat = numpy.load(fileName)
+            self.assertTrue(numpy.allclose(outMat[:, 1:], xTrueMat))
+            self.assertTrue(numpy.allclose(outMat[:, 0], yTrueVec))
+        
+        
+if __name__ == '__main__':
+    unittest.main()
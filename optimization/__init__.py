@@ -1 +1 @@
-__all__ = ['cg', 'cg_cond']
+__all__ = ['cg', 'cg_cond', 'lsqr', 'lsmr', 'linop', 'cache', 'ridge']
@@ -0,0 +1,160 @@
+import collections
+import hashlib
+import os
+import numpy
+import scipy.sparse
+
+import optimization.linop as linop
+
+
+def fingerprint(x_mat, num_rows=64):
+    '''
+    Cheap Fingerprint of A Matrix
+
+    Input
+        x_mat: n-by-d NumPy matrix, scipy.sparse matrix, or LinearOperator X;
+        num_rows: number of rows of X that are hashed.
+    Output
+        a hex string determined by the shape, the dtype, and a sample of the entries of X.
+
+    Dense X: num_rows evenly spaced rows (including the first and the last) are hashed.
+    Sparse X: the number of nonzeros and the same rows are hashed; the rows are read in the format of X
+              (a binary search in each column for CSC, see csc_rows), so X is not converted.
+    Operator X: the product of X with a fixed random vector is hashed (one matvec).
+    The cost does not grow with n (up to a factor log(n) for CSC), except for operators
+    and for the sparse formats other than CSR, CSC, and LIL, which are converted to CSR in O(nnz) time
+    (as is a CSC matrix whose binary searches would cost more than that).
+    Changes to rows that are not sampled are not detected;
+    if X is modified in place, the cache must be cleared.
+    '''
+    n_int, d_int = x_mat.shape
+    hash_obj = hashlib.blake2b(digest_size=16)
+    hash_obj.update(repr((n_int, d_int, str(getattr(x_mat, 'dtype', None)))).encode())
+    if linop.is_explicit(x_mat):
+        idx_vec = numpy.unique(numpy.linspace(0, n_int - 1, num_rows).astype(numpy.int64))
+        if scipy.sparse.issparse(x_mat):
+            if x_mat.format == 'csc' and len(idx_vec) * d_int * numpy.log2(n_int + 1) < x_mat.nnz and x_mat.has_canonical_format:
+                rows_mat = csc_rows(x_mat, idx_vec)
+            else:
+                if x_mat.format not in ('csr', 'lil'):
+                    x_mat = x_mat.tocsr()
+                rows_mat = x_mat[idx_vec, :].toarray()
+            hash_obj.update(repr(x_mat.nnz).encode())
+        else:
+            rows_mat = x_mat[idx_vec, :]
+        hash_obj.update(numpy.ascontiguousarray(rows_mat, dtype=numpy.float64).tobytes())
+    else:
+        v_vec = numpy.random.default_rng(0).standard_normal(d_int)
+        hash_obj.update(numpy.asarray(linop.as_operator(x_mat).dot(v_vec), dtype=numpy.float64).tobytes())
+    return hash_obj.hexdigest()
+
+
+def csc_rows(x_mat, idx_vec):
+    '''
+    Rows of A CSC Matrix without Converting It
+
+    Input
+        x_mat: n-by-d scipy.sparse CSC matrix in canonical format (sorted row indices, no duplicates);
+        idx_vec: sorted indices of the rows.
+    Output
+        len(idx_vec)-by-d NumPy matrix of the rows.
+
+    Every entry is found by a binary search in its column, all at once,
+    so the cost is O(len(idx_vec) * d * log(n)) instead of the O(nnz) of x_mat.tocsr().
+    '''
+    n_int, d_int = x_mat.shape
+    m_int = len(idx_vec)
+    if x_mat.nnz == 0:
+        return numpy.zeros((m_int, d_int))
+    row_vec = numpy.tile(idx_vec, d_int)
+    lo_vec = numpy.repeat(x_mat.indptr[:-1], m_int).astype(numpy.int64)
+    hi_vec = numpy.repeat(x_mat.indptr[1:], m_int).astype(numpy.int64)
+    end_vec = hi_vec.copy()
+    while True:
+        active_vec = (lo_vec < hi_vec)
+        if not active_vec.any():
+            break
+        mid_vec = numpy.minimum((lo_vec + hi_vec) // 2, x_mat.nnz - 1)
+        right_vec = active_vec & (x_mat.indices[mid_vec] < row_vec)
+        left_vec = active_vec & ~right_vec
+        lo_vec[right_vec] = mid_vec[right_vec] + 1
+        hi_vec[left_vec] = mid_vec[left_vec]
+    pos_vec = numpy.minimum(lo_vec, x_mat.nnz - 1)
+    found_vec = (lo_vec < end_vec) & (x_mat.indices[pos_vec] == row_vec)
+    rows_vec = numpy.where(found_vec, x_mat.data[pos_vec], 0)
+    return rows_vec.reshape(d_int, m_int).T
+
+
+class PreconditionerCache(object):
+    '''
+    Cache of Preconditioners for Repeated Solves with the Same X
+
+    Input
+        max_size: number of preconditioners kept in memory (least recently used ones are evicted);
+        cache_dir: directory of the on-disk store (optional); every preconditioner is also saved there
+                   as a .npz file, and it is read from there when it is not in memory.
+
+    The cache stores d-by-d NumPy matrices: T, or the triangular factor R for method='qr' of cg_cond.precondition.
+    The key of a preconditioner is the fingerprint of X, the method, and the sketch parameters,
+    e.g. cg_cond.precondition(x_mat, 'count', 3, cache=cache) sketches X and factorizes the sketch only once;
+    later calls with the same X and parameters return the stored preconditioner.
+    The stored matrices are shared by all the callers, so they are read-only;
+    a caller that modifies a preconditioner must copy it first.
+    '''
+    def __init__(self, max_size=16, cache_dir=None):
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.mem_dict = collections.OrderedDict()
+        self.num_hits = 0
+        self.num_misses = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, x_mat, *params):
+        '''
+        Key of the preconditioner of X computed with the parameters params
+        '''
+        return '-'.join([str(p) for p in params] + [fingerprint(x_mat)])
+
+    def file_name(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def get(self, key):
+        '''
+        Output
+            the stored d-by-d matrix, or None if key is neither in memory nor on disk.
+        '''
+        if key in self.mem_dict:
+            self.mem_dict.move_to_end(key)
+            self.num_hits += 1
+            return self.mem_dict[key]
+        if self.cache_dir is not None and os.path.exists(self.file_name(key)):
+            with numpy.load(self.file_name(key)) as npz:
+                t_mat = npz['t_mat']
+            self.put(key, t_mat, save=False)
+            self.num_hits += 1
+            return t_mat
+        self.num_misses += 1
+        return None
+
+    def put(self, key, t_mat, save=True):
+        '''
+        Store the preconditioner t_mat in memory (and on disk if cache_dir is set and save is True).
+        t_mat is made read-only, since every later get of key returns this very matrix.
+        '''
+        t_mat.setflags(write=False)
+        self.mem_dict[key] = t_mat
+        self.mem_dict.move_to_end(key)
+        while len(self.mem_dict) > self.max_size:
+            self.mem_dict.popitem(last=False)
+        if save and self.cache_dir is not None:
+            # write to a temporary file first, so an interrupted write never leaves a truncated file
+            tmp_file_name = self.file_name(key) + '.tmp.npz'
+            numpy.savez(tmp_file_name, t_mat=t_mat)
+            os.replace(tmp_file_name, self.file_name(key))
+
+    def clear(self):
+        '''
+        Remove every preconditioner from memory (the on-disk store is kept).
+        '''
+        self.mem_dict.clear()
@@ -1,55 +1,72 @@
 import numpy
 
-def cg(x_mat, y_vec, tol=1e-12, max_iter_int=10000):
+import optimization.linop as linop
+
+def cg(x_mat, y_vec, tol=1e-12, max_iter_int=10000, gram_func=None):
     '''
     Conjugate Gradient (CG) Algorithm for Least Squares Regression: argmin_w || X * w - y ||_2^2
     
     Input
-        x_mat: n-by-d NumPy matrix X;
-        y_vec: n-dim vector y;
+        x_mat: n-by-d NumPy matrix, scipy.sparse matrix, or LinearOperator X (see linop.as_operator);
+        y_vec: n-dim vector y, or n-by-k matrix Y of k responses;
         tol: convergence tolerance (optional);
-        max_iter_int: (>0) maximum number of iterations.
+        max_iter_int: (>0) maximum number of iterations;
+        gram_func: function that returns X^T * X * P for a d-by-k matrix P (optional, see linop.gram_dot).
         
     Output
-        w_vec: solution to the LSR problem;
-        is_converged_bool: whether CG attains convergence tolerance.
+        w_vec: d-by-k solution to the LSR problem (d-by-1 if y is a vector);
+        is_converged_bool: whether CG attains convergence tolerance (for all the k responses).
+    
+    The k responses are solved by k CG recurrences that run simultaneously:
+    in each iteration, the k products with X and X^T are computed as matrix-matrix products,
+    so X is read twice per iteration rather than 2k times.
+    A response is removed from the recurrences once it converges.
     '''
         
+    x_mat = linop.as_operator(x_mat)
     n_int, d_int = x_mat.shape
-    y_vec = numpy.dot(x_mat.T, y_vec.reshape(n_int, 1))
+    y_mat = numpy.asarray(x_mat.T.dot(y_vec.reshape(n_int, -1)))
+    k_int = y_mat.shape[1]
     
-    w_vec = numpy.zeros((d_int, 1))
+    w_mat = numpy.zeros((d_int, k_int))
 
-    xw_vec = numpy.dot(x_mat, w_vec)
-    r_vec = y_vec - numpy.dot(x_mat.T, xw_vec)
-    p_vec = r_vec
-    rsold_real = numpy.sum(r_vec ** 2)
-    
-    is_converged_bool = False
+    r_mat = y_mat - linop.gram_dot(x_mat, w_mat, gram_func)
+    p_mat = r_mat
+    rsold_vec = numpy.sum(r_mat ** 2, axis=0)
+    # the responses that have not converged (e.g. a zero response is solved by w = 0)
+    active_vec = (rsold_vec >= tol)
+    idx_vec = numpy.arange(k_int)[active_vec]
+    r_mat, p_mat, rsold_vec = r_mat[:, active_vec], p_mat[:, active_vec], rsold_vec[active_vec]
+    
+    is_converged_bool = (len(idx_vec) == 0)
     i = -1
     
-    for i in range(max_iter_int):
-        xp_vec = numpy.dot(x_mat.T, numpy.dot(x_mat, p_vec))
-        alp_real = rsold_real / numpy.sum(p_vec * xp_vec)
-        w_vec += alp_real * p_vec
-        r_vec -= alp_real * xp_vec
-        rsnew_real = numpy.sum(r_vec ** 2)
+    for i in range(0 if is_converged_bool else max_iter_int):
+        xp_mat = linop.gram_dot(x_mat, p_mat, gram_func)
+        alp_vec = rsold_vec / numpy.sum(p_mat * xp_mat, axis=0)
+        w_mat[:, idx_vec] += alp_vec * p_mat
+        r_mat = r_mat - alp_vec * xp_mat
+        rsnew_vec = numpy.sum(r_mat ** 2, axis=0)
         
         if i % 100 == 0:
-            print('Iteration ' + str(i) + ': residual=' + str(rsnew_real))
+            print('Iteration ' + str(i) + ': residual=' + str(numpy.max(rsnew_vec)))
         
-        if rsnew_real < tol:
+        active_vec = (rsnew_vec >= tol)
+        if not numpy.any(active_vec):
             is_converged_bool = True
-            print('Iteration ' + str(i) + ': residual=' + str(rsnew_real))
+            print('Iteration ' + str(i) + ': residual=' + str(numpy.max(rsnew_vec)))
             break
             
-        p_vec = r_vec + (rsnew_real / rsold_real) * p_vec
-        rsold_real = rsnew_real
+        p_mat = r_mat + (rsnew_vec / rsold_vec) * p_mat
+        rsold_vec = rsnew_vec
+        if not numpy.all(active_vec):
+            idx_vec = idx_vec[active_vec]
+            r_mat, p_mat, rsold_vec = r_mat[:, active_vec], p_mat[:, active_vec], rsold_vec[active_vec]
     
     if not is_converged_bool:
         print('Warn: CG did not converge after ' + str(i+1) + ' iterations!')
         
-    return w_vec, is_converged_bool
+    return w_mat, is_converged_bool
     
     
 def demo_cg(x_mat, y_vec, w_opt_vec, tol=1e-12, max_iter_int=10000):
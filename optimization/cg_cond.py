@@ -1,6 +1,7 @@
 import numpy
 
 import numpy
+import scipy.linalg
 import matplotlib.pyplot as plt
 import sys
 
@@ -8,92 +9,460 @@ PyRLA_dir = '../../'
 sys.path.append(PyRLA_dir)
 
 import sketch.srft as srft
+import sketch.srht as srht
 import sketch.countsketch as cs
+import sketch.osnap as osnap
+import sketch.operators as operators
+import optimization.linop as linop
 
 
-def precondition(x_mat, sketch_type='srft', sketch_size=3):
+def sketch_x(x_mat, sketch_type, s_int, osnap_k=2):
+    '''
+    Draw A New Sketching Matrix S and Return the d-by-s Sketch X^T * S
+    
+    X can be a matrix or an operator (see linop.sketch_columns).
+    '''
+    n_int, d_int = x_mat.shape
+    if not linop.is_explicit(x_mat):
+        if sketch_type == 'srft':
+            sketch_op = operators.SRFTOperator(n_int, s_int)
+        elif sketch_type == 'srht':
+            sketch_op = operators.SRHTOperator(n_int, s_int)
+        elif sketch_type == 'count':
+            sketch_op = operators.CountSketchOperator(n_int, s_int)
+        elif sketch_type == 'osnap':
+            sketch_op = operators.OSNAPOperator(n_int, s_int, k_int=osnap_k)
+        b_mat = linop.sketch_columns(linop.as_operator(x_mat), sketch_op).T
+    elif sketch_type == 'srft':
+        b_mat = srft.srft(x_mat.T, s_int)
+    elif sketch_type == 'srht':
+        b_mat = srht.srht(x_mat.T, s_int)
+    elif sketch_type == 'count':
+        b_mat = cs.countsketch(x_mat.T, s_int)
+    elif sketch_type == 'osnap':
+        b_mat = osnap.osnap(x_mat.T, s_int, osnap_k)
+    return b_mat
+    
+    
+def sketch_factor(x_mat, sketch_type='srft', sketch_size=3, osnap_k=2, method='svd'):
+    '''
+    Sketch X and Factorize the Sketch (see precondition)
+    
+    Output
+        t_mat: d-by-d matrix T = V * Sig^{-1} if method='svd';
+        r_mat: d-by-d upper triangular R if method='qr', where S^T * X = Q * R.
+    '''
+    n_int, d_int = x_mat.shape
+    if sketch_size == 'auto':
+        r_mat = adaptive_factor(x_mat, sketch_type, osnap_k=osnap_k)[0]
+        if method == 'qr':
+            return r_mat
+        return scipy.linalg.solve_triangular(r_mat, numpy.eye(d_int))
+    
+    s_int = int(sketch_size * d_int)
+    b_mat = sketch_x(x_mat, sketch_type, s_int, osnap_k)
+    if method == 'qr':
+        r_mat = numpy.linalg.qr(b_mat.T, mode='r')
+        return r_mat
+    u_mat, sig_vec, _ = numpy.linalg.svd(b_mat, full_matrices=False)
+    t_mat = u_mat / sig_vec.reshape(1, len(sig_vec))
+    return t_mat
+    
+    
+def cond_estimate(x_mat, cond_mat, num_iter=10, seed=0):
+    '''
+    Estimate the Condition Number of X * T
+    
+    Input
+        x_mat: n-by-d matrix or operator X;
+        cond_mat: d-by-d matrix or operator T (with dot and T.dot);
+        num_iter: number of steps of the Golub-Kahan bidiagonalization;
+        seed: seed of the random starting vector.
+    Output
+        cond_real: estimate of cond(X * T); it is a lower bound (typically within 25% for num_iter = 6 and 10% for num_iter = 10).
+    
+    The extreme singular values of the num_iter-by-num_iter bidiagonal matrix of the Golub-Kahan process
+    (the one LSQR runs) converge to those of X * T from inside.
+    The cost is num_iter products with X and with X^T.
+    '''
+    x_mat = linop.as_operator(x_mat)
+    d_int = x_mat.shape[1]
+    v_vec = numpy.random.default_rng(seed).standard_normal(d_int)
+    v_vec /= numpy.linalg.norm(v_vec)
+    u_vec = 0
+    alpha_list, beta_list = [], []
+    beta_real = 0.0
+    for i in range(min(num_iter, d_int)):
+        u_vec = numpy.asarray(x_mat.dot(cond_mat.dot(v_vec))).ravel() - beta_real * u_vec
+        alpha_real = numpy.linalg.norm(u_vec)
+        if not alpha_real > 0:
+            return numpy.inf
+        u_vec /= alpha_real
+        v_vec = numpy.asarray(cond_mat.T.dot(x_mat.T.dot(u_vec))).ravel() - alpha_real * v_vec
+        beta_real = numpy.linalg.norm(v_vec)
+        alpha_list.append(alpha_real)
+        beta_list.append(beta_real)
+        if not beta_real > 1e-14 * alpha_real:
+            break
+        v_vec /= beta_real
+    k_int = len(alpha_list)
+    b_mat = numpy.diag(alpha_list) + numpy.diag(beta_list[0:k_int-1], 1)
+    sig_vec = numpy.linalg.svd(b_mat, compute_uv=False)
+    return sig_vec[0] / sig_vec[-1]
+    
+    
+def mp_cond(rho_real):
+    '''
+    Condition number (1 + sqrt(rho)) / (1 - sqrt(rho)) of X * T for a sketch of size s = d / rho
+    (Marchenko-Pastur law; count sketch and SRFT follow it closely)
+    '''
+    return (1 + numpy.sqrt(rho_real)) / (1 - numpy.sqrt(rho_real))
+    
+    
+def num_iter_cond(cond_real, tol=1e-10):
+    '''
+    Number of iterations of CG / LSQR that reduce the error by tol if cond(X * T) = cond_real
+    '''
+    if cond_real <= 1:
+        return 1.0
+    return numpy.log(2 / tol) / numpy.log((cond_real + 1) / (cond_real - 1))
+    
+    
+def sketch_cost(sketch_type, n_int, osnap_k=2):
+    '''
+    Rough cost of sketching X, in CG / LSQR iterations (each reads X twice)
+    '''
+    if sketch_type == 'count':
+        return 1.0
+    if sketch_type == 'osnap':
+        return float(osnap_k)
+    # the FFT / Hadamard transforms cost O(n * log(n)) per column of X
+    return numpy.log2(n_int) / 2
+    
+    
+def adaptive_factor(x_mat, sketch_type='count', target_cond=None, max_sketch_size=20, osnap_k=2, tol=1e-10, num_lanczos=6):
+    '''
+    Choose the Sketch Size from An A Posteriori Estimate of the Condition Number
+    
+    Input
+        x_mat: n-by-d matrix or operator X;
+        sketch_type: 'srft', 'srht', 'count', or 'osnap';
+        target_cond: if given, the sketch grows until the estimate of cond(X * R^{-1}) is at most target_cond;
+                     otherwise, the sketch size minimizes the predicted time to solution;
+        max_sketch_size: the sketch size s never exceeds max_sketch_size * d (nor n);
+        osnap_k: see precondition;
+        tol: accuracy of the solve that follows (used by the cost model);
+        num_lanczos: number of steps of cond_estimate.
+    Output
+        r_mat: d-by-d upper triangular R, where S^T * X = Q * R for the final s-by-n sketch S^T;
+        s_int: the final sketch size;
+        cond_real: estimate of cond(X * R^{-1}) (predicted, if target_cond is None and the sketch grew).
+    
+    The sketch starts with s = 2d, and cond(X * R^{-1}) is estimated by cond_estimate.
+    The sketch grows by appending independent sketches of X, so the rows already sketched are kept,
+    and R is updated by a QR decomposition of R stacked on the new rows.
+    A block of b rows is weighted by sqrt(b / s), so the stacked sketch is an embedding of size s.
+    
+    target_cond is None: the condition number of a larger sketch is predicted from the estimate
+    by the ratio mp_cond(d / s) / mp_cond(d / 2d), and the size s (2d, 4d, 8d, ...) that minimizes
+    the cost of the new sketch (sketch_cost), of its QR, and of the iterations (num_iter_cond) is drawn at once.
+    Otherwise: the sketch doubles until the estimate meets target_cond.
+    The cost model counts iterations that read X (lsqr, lsmr, and cg_cond in the modes 'unfused' and 'xt');
+    in the mode 'gram' an iteration costs O(d^2), and the sketch size hardly matters.
+    The estimate costs num_lanczos such iterations, so when cond(X * R^{-1}) follows the Marchenko-Pastur law,
+    the best fixed sketch_size is about as fast; 'auto' saves the guess of sketch_size.
+    '''
+    n_int, d_int = x_mat.shape
+    s_max = min(int(max_sketch_size * d_int), n_int)
+    r_mat = None
+    s_int = 0
+    
+    def grow(r_mat, s_int, b_int, estimate_bool=True):
+        c_mat = sketch_x(x_mat, sketch_type, b_int, osnap_k).T * numpy.sqrt(b_int)
+        if r_mat is not None:
+            c_mat = numpy.concatenate((r_mat, c_mat), axis=0)
+        r_mat = numpy.linalg.qr(c_mat, mode='r')
+        diag_vec = numpy.abs(numpy.diag(r_mat))
+        if r_mat.shape[0] < d_int or numpy.min(diag_vec) <= 1e-13 * numpy.max(diag_vec):
+            cond_real = numpy.inf
+        elif not estimate_bool:
+            cond_real = None
+        else:
+            cond_real = cond_estimate(x_mat, linop.triangular_inverse(r_mat), num_lanczos)
+        return r_mat, s_int + b_int, cond_real
+    
+    r_mat, s_int, cond_real = grow(r_mat, s_int, min(2 * d_int, s_max))
+    # a rank deficient start, or a condition number above the target: double
+    while s_int < s_max and (not numpy.isfinite(cond_real) or (target_cond is not None and cond_real > target_cond)):
+        r_mat, s_int, cond_real = grow(r_mat, s_int, min(s_int, s_max - s_int))
+    
+    if target_cond is None and numpy.isfinite(cond_real) and s_int < s_max:
+        best_s, best_cost, best_cond = s_int, num_iter_cond(cond_real, tol), cond_real
+        new_s = 2 * s_int
+        while new_s <= s_max:
+            new_cond = max(1.0, cond_real * mp_cond(d_int / new_s) / mp_cond(d_int / s_int))
+            new_cost = (sketch_cost(sketch_type, n_int, osnap_k) + new_s * d_int / (2 * GEMM_SPEEDUP * n_int)
+                        + num_iter_cond(new_cond, tol))
+            if new_cost < best_cost:
+                best_s, best_cost, best_cond = new_s, new_cost, new_cond
+            new_s *= 2
+        if best_s > s_int:
+            r_mat, s_int = grow(r_mat, s_int, best_s - s_int, False)[0:2]
+            cond_real = best_cond
+    r_mat = r_mat / numpy.sqrt(s_int)
+    return r_mat, s_int, cond_real
+    
+    
+def precondition(x_mat, sketch_type='srft', sketch_size=3, osnap_k=2, cache=None, method='svd'):
     '''
     Compute A Preconditioning Matrix
     
     Input
-        x_mat: n-by-d NumPy matrix X;
-        sketch_type: 'srft' or 'count';
+        x_mat: n-by-d NumPy matrix, scipy.sparse matrix, or LinearOperator X (see linop.as_operator);
+        sketch_type: 'srft', 'srht', 'count', or 'osnap';
         sketch_size: real number larger than 1;
                     it should be set as a small number, e.g. 3;
-                    big sketch_size leads to good condition number, but costs more time to compute.
+                    big sketch_size leads to good condition number, but costs more time to compute;
+                    'auto' grows the sketch until it pays off (see adaptive_factor);
+        osnap_k: number of nonzeros in each column of the s-by-n sparse embedding (only for 'osnap');
+        cache: cache.PreconditionerCache (optional); if it contains a preconditioner
+               of the same X with the same parameters, the sketch and the factorization are skipped;
+        method: 'svd' or 'qr'.
     
     Output
-        t_mat: d-by-d Numpy matrix T such that X * T is well-conditioned.
+        t_mat: d-by-d Numpy matrix T such that X * T is well-conditioned (method='svd'),
+               or the d-by-d operator T = R^{-1}, where S^T * X = Q * R (method='qr', see linop.triangular_inverse).
+    
+    Both preconditioners make X * T equally well-conditioned (S^T * X * T has orthonormal columns),
+    but a Householder QR costs a fraction of the SVD,
+    and R^{-1} is applied by triangular solves instead of being formed.
+    If X is only available through its products, the sketch is computed
+    from blocks of columns of X (see linop.sketch_columns).
+    '''
+    if method not in ('svd', 'qr'):
+        raise ValueError('Unknown method: ' + str(method))
+    if cache is None:
+        factor_mat = sketch_factor(x_mat, sketch_type, sketch_size, osnap_k, method)
+    else:
+        key = cache.key(x_mat, method, sketch_type, sketch_size, osnap_k)
+        factor_mat = cache.get(key)
+        if factor_mat is None:
+            factor_mat = sketch_factor(x_mat, sketch_type, sketch_size, osnap_k, method)
+            cache.put(key, factor_mat)
+    if method == 'qr':
+        return linop.triangular_inverse(factor_mat)
+    return factor_mat
+    
+    
+# ratio of the speed (flops per second) of matrix-matrix products to that of matrix-vector products;
+# forming X^T X runs at GEMM speed, while each CG iteration is memory-bound
+GEMM_SPEEDUP = 20
+
+# typical number of iterations of cg_cond with a sketched preconditioner (sketch_size >= 2)
+EXPECTED_ITER = 30
+
+# bytes of work memory that a mode may allocate on top of X (an n-by-d float64 X * T needs 8*n*d);
+# 'gram' accumulates G over blocks of rows of X of at most this size
+MEMORY_BUDGET = 2 ** 28
+
+
+def choose_mode(x_mat, k_int=1, max_iter_int=EXPECTED_ITER, gram_func=None, memory_budget=MEMORY_BUDGET, mode_list=('unfused', 'xt', 'gram')):
     '''
+    Cheapest Way to Apply the Preconditioned Normal Operator T^T * X^T * X * T (mode='auto' of cg_cond)
+    
+    Input
+        x_mat: n-by-d matrix or operator X;
+        k_int: number of responses;
+        max_iter_int: maximum number of CG iterations;
+        gram_func: see cg_cond;
+        memory_budget: bytes of work memory (see NormalOperator);
+        mode_list: the modes to choose from ('unfused' must be one of them).
+    Output
+        'gram', 'xt', or 'unfused' (see NormalOperator).
+    
+    Cost model in units of a matrix-vector flop, with t = min(max_iter_int, EXPECTED_ITER) iterations:
+        unfused: t * k * (2*n*d + 2*d^2);
+        xt:      n*d^2 / GEMM_SPEEDUP + t * k * 2*n*d;
+        gram:    2*n*d^2 / GEMM_SPEEDUP + t * k * d^2.
+    Only a dense X is precomputed; sparse matrices and operators are applied as they are.
+    'xt' stores the n-by-d X * T, so it is only considered if 8*n*d bytes fit in memory_budget;
+    'gram' and 'unfused' need O(d^2) and O(n * k) extra memory.
+    '''
+    if gram_func is not None or not isinstance(x_mat, numpy.ndarray):
+        return 'unfused'
     n_int, d_int = x_mat.shape
-    s_int = int(sketch_size * d_int)
+    t_int = min(max_iter_int, EXPECTED_ITER)
+    cost_dict = {'unfused': t_int * k_int * (2*n_int*d_int + 2*d_int**2)}
+    if 'gram' in mode_list:
+        cost_dict['gram'] = 2 * n_int * d_int**2 / GEMM_SPEEDUP + t_int * k_int * d_int**2
+    if 'xt' in mode_list and 8 * n_int * d_int <= memory_budget:
+        cost_dict['xt'] = n_int * d_int**2 / GEMM_SPEEDUP + t_int * k_int * 2*n_int*d_int
+    return min(cost_dict, key=cost_dict.get)
+
+
+class NormalOperator(object):
+    '''
+    The Preconditioned Normal Operator P -> T^T * X^T * X * T * P
     
-    if sketch_type == 'srft':
-        b_mat = srft.srft(x_mat.T, s_int)
-    elif sketch_type == 'count':
-        b_mat = cs.countsketch(x_mat.T, s_int)
+    Input
+        x_mat: n-by-d matrix or operator X (see linop.as_operator);
+        cond_mat: d-by-d preconditioned matrix T, or an operator with dot and T.dot (see precondition);
+        mode: 'unfused': four products with T, X, X^T, and T^T in each call;
+              'xt': X * T is formed once (n-by-d), then two products in each call;
+              'gram': G = T^T * X^T * X * T is formed once (d-by-d), then one d-by-d product in each call;
+        gram_func: function that returns X^T * X * P (optional, see linop.gram_dot);
+        memory_budget: bytes of the blocks of rows of X * T whose products are summed up to G (mode 'gram').
+    
+    Methods
+        dot(p_mat): T^T * X^T * X * T * P for a d-by-k matrix P.
         
-    u_mat, sig_vec, _ = numpy.linalg.svd(b_mat, full_matrices=False)
-    t_mat = u_mat / sig_vec.reshape(1, len(sig_vec))
-    return t_mat
+    The result of dot and the intermediate products are written with out= into work buffers,
+    which are allocated once and reused by every call (until the number of columns of P changes),
+    so the returned matrix is overwritten by the next call.
+    Since X * T is well conditioned, forming G does not lose the accuracy
+    that forming X^T * X would.
+    G = sum_b (X_b * T)^T * (X_b * T) is accumulated over blocks X_b of rows of X,
+    so 'gram' never holds the n-by-d X * T; only 'xt' does.
+    '''
+    def __init__(self, x_mat, cond_mat, mode='unfused', gram_func=None, memory_budget=MEMORY_BUDGET):
+        self.x_mat = linop.as_operator(x_mat)
+        self.cond_mat = cond_mat
+        self.mode = mode
+        self.gram_func = gram_func
+        # out= needs float64 NumPy arrays on both sides
+        self.x_dense_bool = isinstance(self.x_mat, numpy.ndarray) and self.x_mat.dtype == numpy.float64
+        self.cond_dense_bool = isinstance(cond_mat, numpy.ndarray) and cond_mat.dtype == numpy.float64
+        self.buffer_dict = {}
+        if mode in ('xt', 'gram'):
+            # an operator T (e.g. a triangular inverse) is formed once: O(d^3), against O(n * d^2) for X * T
+            d_int = self.x_mat.shape[1]
+            t_mat = cond_mat if isinstance(cond_mat, numpy.ndarray) else cond_mat.dot(numpy.eye(d_int))
+        if mode == 'xt':
+            self.xt_mat = numpy.asarray(self.x_mat.dot(t_mat))
+        elif mode == 'gram':
+            if isinstance(self.x_mat, numpy.ndarray) and gram_func is None:
+                n_int = self.x_mat.shape[0]
+                blk_int = max(1, memory_budget // (8 * d_int))
+                self.g_mat = numpy.zeros((d_int, d_int))
+                for i in range(0, n_int, blk_int):
+                    xt_mat = numpy.dot(self.x_mat[i:i+blk_int, :], t_mat)
+                    self.g_mat += numpy.dot(xt_mat.T, xt_mat)
+            else:
+                self.g_mat = numpy.dot(t_mat.T, linop.gram_dot(self.x_mat, t_mat, gram_func))
+        elif mode != 'unfused':
+            raise ValueError('Unknown mode: ' + str(mode))
+        
+    def buffer(self, name, shape):
+        '''
+        The work buffer name of the given shape
+        '''
+        buf_mat = self.buffer_dict.get(name)
+        if buf_mat is None or buf_mat.shape != shape:
+            buf_mat = numpy.empty(shape)
+            self.buffer_dict[name] = buf_mat
+        return buf_mat
+        
+    def cond_dot(self, p_mat, name, trans=False):
+        '''
+        T * P (or T^T * P if trans), written into the work buffer name if T is a NumPy matrix
+        '''
+        cond_mat = self.cond_mat.T if trans else self.cond_mat
+        if self.cond_dense_bool:
+            return numpy.dot(cond_mat, p_mat, out=self.buffer(name, (cond_mat.shape[0], p_mat.shape[1])))
+        return cond_mat.dot(p_mat)
+        
+    def dot(self, p_mat):
+        n_int, d_int = self.x_mat.shape
+        k_int = p_mat.shape[1]
+        if self.mode == 'gram':
+            return numpy.dot(self.g_mat, p_mat, out=self.buffer('out', (d_int, k_int)))
+        if self.mode == 'xt':
+            q_mat = numpy.dot(self.xt_mat, p_mat, out=self.buffer('n', (n_int, k_int)))
+            return numpy.dot(self.xt_mat.T, q_mat, out=self.buffer('out', (d_int, k_int)))
+        tp_mat = self.cond_dot(p_mat, 'tp')
+        if self.gram_func is not None:
+            xp_mat = self.gram_func(tp_mat)
+        elif self.x_dense_bool:
+            q_mat = numpy.dot(self.x_mat, tp_mat, out=self.buffer('n', (n_int, k_int)))
+            xp_mat = numpy.dot(self.x_mat.T, q_mat, out=self.buffer('xp', (d_int, k_int)))
+        else:
+            xp_mat = linop.gram_dot(self.x_mat, tp_mat)
+        return self.cond_dot(xp_mat, 'out', trans=True)
     
     
-def cg_cond(x_mat, y_vec, cond_mat, tol=1e-16, max_iter_int=10000):
+def cg_cond(x_mat, y_vec, cond_mat, tol=1e-16, max_iter_int=10000, gram_func=None, mode='auto'):
     '''
     Preconditioned Conjugate Gradient (CG) Algorithm for Least Squares Regression: argmin_w || X * w - y ||_2^2
     
     Input
-        x_mat: n-by-d NumPy matrix X;
-        y_vec: n-dim vector y;
-        cond_mat: d-by-d preconditioned matrix T such that X * T is well-conditioned;
+        x_mat: n-by-d NumPy matrix, scipy.sparse matrix, or LinearOperator X (see linop.as_operator);
+        y_vec: n-dim vector y, or n-by-k matrix Y of k responses;
+        cond_mat: d-by-d preconditioned matrix T such that X * T is well-conditioned,
+                  or an operator with dot and T.dot, e.g. precondition(x_mat, method='qr');
         tol: convergence tolerance (optional);
-        max_iter_int: (>0) maximum number of iterations.
+        max_iter_int: (>0) maximum number of iterations;
+        gram_func: function that returns X^T * X * P for a d-by-k matrix P (optional, see linop.gram_dot);
+        mode: 'unfused', 'xt', 'gram' (see NormalOperator), or 'auto' (see choose_mode).
         
     Output
-        w_vec: solution to the LSR problem;
-        is_converged_bool: whether CG attains convergence tolerance.
+        w_vec: d-by-k solution to the LSR problem (d-by-1 if y is a vector);
+        is_converged_bool: whether CG attains convergence tolerance (for all the k responses).
+    
+    The k responses are solved by simultaneous CG recurrences, as in cg.cg.
     '''
     
+    x_mat = linop.as_operator(x_mat)
     n_int, d_int = x_mat.shape
-    y_vec = numpy.dot(x_mat.T, y_vec.reshape(n_int, 1))
-    y_vec = numpy.dot(cond_mat.T, y_vec)
+    y_mat = numpy.asarray(x_mat.T.dot(y_vec.reshape(n_int, -1)))
+    y_mat = numpy.asarray(cond_mat.T.dot(y_mat))
+    k_int = y_mat.shape[1]
+    if mode == 'auto':
+        mode = choose_mode(x_mat, k_int, max_iter_int, gram_func)
+    normal_op = NormalOperator(x_mat, cond_mat, mode, gram_func)
     
-    z_vec = numpy.zeros((d_int, 1))
-    w_vec = numpy.dot(cond_mat, z_vec)
-        
-    xw_vec = numpy.dot(x_mat, w_vec)
-    r_vec = y_vec - numpy.dot(cond_mat.T, numpy.dot(x_mat.T, xw_vec))
-    p_vec = r_vec
-    rsold_real = numpy.sum(r_vec ** 2)
+    # z = 0, so the residual T^T X^T (y - X T z) is T^T X^T y
+    z_mat = numpy.zeros((d_int, k_int))
+    r_mat = y_mat
+    p_mat = r_mat.copy()
+    rsold_vec = numpy.einsum('ij,ij->j', r_mat, r_mat)
+    # the responses that have not converged (e.g. a zero response is solved by z = 0)
+    active_vec = (rsold_vec >= tol)
+    idx_vec = numpy.arange(k_int)[active_vec]
+    r_mat, p_mat, rsold_vec = r_mat[:, active_vec], p_mat[:, active_vec], rsold_vec[active_vec]
     
-    is_converged_bool = False
+    is_converged_bool = (len(idx_vec) == 0)
     i = -1
     
-    for i in range(max_iter_int):
-        xp_vec = numpy.dot(x_mat, numpy.dot(cond_mat, p_vec))
-        xp_vec = numpy.dot(cond_mat.T, numpy.dot(x_mat.T, xp_vec))
-        alp_real = rsold_real / numpy.sum(p_vec * xp_vec)
-        z_vec += alp_real * p_vec
-        r_vec -= alp_real * xp_vec
-        rsnew_real = numpy.sum(r_vec ** 2)
+    for i in range(0 if is_converged_bool else max_iter_int):
+        xp_mat = normal_op.dot(p_mat)
+        alp_vec = rsold_vec / numpy.einsum('ij,ij->j', p_mat, xp_mat)
+        z_mat[:, idx_vec] += alp_vec * p_mat
+        xp_mat *= alp_vec
+        r_mat -= xp_mat
+        rsnew_vec = numpy.einsum('ij,ij->j', r_mat, r_mat)
         
         if i % 100 == 0:
-            print('Iteration ' + str(i) + ': residual=' + str(rsnew_real))
+            print('Iteration ' + str(i) + ': residual=' + str(numpy.max(rsnew_vec)))
         
-        if rsnew_real < tol:
+        active_vec = (rsnew_vec >= tol)
+        if not numpy.any(active_vec):
             is_converged_bool = True
-            print('Iteration ' + str(i) + ': residual=' + str(rsnew_real))
+            print('Iteration ' + str(i) + ': residual=' + str(numpy.max(rsnew_vec)))
             break
             
-        p_vec = r_vec + (rsnew_real / rsold_real) * p_vec
-        rsold_real = rsnew_real
+        p_mat *= rsnew_vec / rsold_vec
+        p_mat += r_mat
+        rsold_vec = rsnew_vec
+        if not numpy.all(active_vec):
+            idx_vec = idx_vec[active_vec]
+            r_mat, p_mat, rsold_vec = r_mat[:, active_vec], p_mat[:, active_vec], rsold_vec[active_vec]
         
-    w_vec = numpy.dot(cond_mat, z_vec)
+    w_mat = numpy.asarray(cond_mat.dot(z_mat))
     
     if not is_converged_bool:
         print('Warn: CG did not converge after ' + str(i+1) + ' iterations!')
     
-    return w_vec, is_converged_bool
+    return w_mat, is_converged_bool
     
     
     
@@ -107,7 +476,7 @@ def demo_cg_cond(x_mat, y_vec, cond_mat, w_opt_vec, tol=1e-16, max_iter_int=1000
         x_mat: n-by-d NumPy matrix X;
         y_vec: n-dim vector y;
         w_opt_vec: optimal solution;
-        cond_mat: d-by-d preconditioned matrix T such that X * T is well-conditioned;
+        cond_mat: d-by-d preconditioned matrix T such that X * T is well-conditioned (or an operator, see cg_cond);
         tol: convergence tolerance (optional);
         max_iter_int: (>0) maximum number of iterations.
         
@@ -121,13 +490,13 @@ def demo_cg_cond(x_mat, y_vec, cond_mat, w_opt_vec, tol=1e-16, max_iter_int=1000
     
     n_int, d_int = x_mat.shape
     y_vec = numpy.dot(x_mat.T, y_vec.reshape(n_int, 1))
-    y_vec = numpy.dot(cond_mat.T, y_vec)
+    y_vec = cond_mat.T.dot(y_vec)
     
     z_vec = numpy.zeros((d_int, 1))
-    w_vec = numpy.dot(cond_mat, z_vec)
+    w_vec = cond_mat.dot(z_vec)
         
     xw_vec = numpy.dot(x_mat, w_vec)
-    r_vec = y_vec - numpy.dot(cond_mat.T, numpy.dot(x_mat.T, xw_vec))
+    r_vec = y_vec - cond_mat.T.dot(numpy.dot(x_mat.T, xw_vec))
     p_vec = r_vec
     rsold_real = numpy.sum(r_vec ** 2)
     
@@ -137,8 +506,8 @@ def demo_cg_cond(x_mat, y_vec, cond_mat, w_opt_vec, tol=1e-16, max_iter_int=1000
     tmp_err_vec = numpy.zeros(max_iter_int) # for test only
     
     for i in range(max_iter_int):
-        xp_vec = numpy.dot(x_mat, numpy.dot(cond_mat, p_vec))
-        xp_vec = numpy.dot(cond_mat.T, numpy.dot(x_mat.T, xp_vec))
+        xp_vec = numpy.dot(x_mat, cond_mat.dot(p_vec))
+        xp_vec = cond_mat.T.dot(numpy.dot(x_mat.T, xp_vec))
         alp_real = rsold_real / numpy.sum(p_vec * xp_vec)
         z_vec += alp_real * p_vec
         r_vec -= alp_real * xp_vec
@@ -147,7 +516,7 @@ def demo_cg_cond(x_mat, y_vec, cond_mat, w_opt_vec, tol=1e-16, max_iter_int=1000
         if i % 100 == 0:
             print('Iteration ' + str(i) + ': residual=' + str(rsnew_real))
         
-        tmp_dist_vec = numpy.dot(x_mat, numpy.dot(cond_mat, z_vec)) - tmp_xw_opt_vec # for test only 
+        tmp_dist_vec = numpy.dot(x_mat, cond_mat.dot(z_vec)) - tmp_xw_opt_vec # for test only 
         tmp_err_vec[i] = numpy.sum(tmp_dist_vec ** 2) # for test only 
         
         if rsnew_real < tol:
@@ -158,7 +527,7 @@ def demo_cg_cond(x_mat, y_vec, cond_mat, w_opt_vec, tol=1e-16, max_iter_int=1000
         p_vec = r_vec + (rsnew_real / rsold_real) * p_vec
         rsold_real = rsnew_real
         
-    w_vec = numpy.dot(cond_mat, z_vec)
+    w_vec = cond_mat.dot(z_vec)
     
     if not is_converged_bool:
         print('Warn: CG did not converge after ' + str(i+1) + ' iterations!')
@@ -0,0 +1,66 @@
+# Demo of the Speed of the QR and SVD Preconditioners
+#
+# "cg_cond.precondition" factorizes the s-by-d sketch S^T * X.
+# We compare the SVD route (method='svd', the dense T = V * Sig^{-1})
+# with the Householder QR route (method='qr', the operator R^{-1} applied by triangular solves)
+# for d = 100, ..., 5000 and s = 3d:
+#   factorization: the time to compute T or R from the sketch;
+#   apply: the time of T * p and T^T * p (one CG iteration needs both).
+# The sketch itself costs the same for both routes, so a random s-by-d sketch is used.
+# Both preconditioners make the sketch well conditioned (cond(S^T * X * T) = 1).
+
+import numpy
+import time
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from optimization import linop
+
+
+def factor_svd(b_mat):
+    u_mat, sig_vec, _ = numpy.linalg.svd(b_mat.T, full_matrices=False)
+    return u_mat / sig_vec.reshape(1, len(sig_vec))
+
+
+def factor_qr(b_mat):
+    return linop.triangular_inverse(numpy.linalg.qr(b_mat, mode='r'))
+
+
+def timing(func, arg, repeat_int):
+    t0 = time.perf_counter()
+    for i in range(repeat_int):
+        result = func(arg)
+    return (time.perf_counter() - t0) / repeat_int, result
+
+
+def demo_speed(d_vec, sketch_size=3, repeat_int=3):
+    '''
+    Input
+        d_vec: numbers of columns of X;
+        sketch_size: s/d;
+        repeat_int: number of repeats (a single run for d > 2000).
+    '''
+    for d_int in d_vec:
+        s_int = sketch_size * d_int
+        b_mat = numpy.random.randn(s_int, d_int) * numpy.logspace(0, 6, d_int).reshape(1, d_int)
+        p_vec = numpy.random.randn(d_int)
+        r_int = repeat_int if d_int <= 2000 else 1
+
+        time_svd, t_mat = timing(factor_svd, b_mat, r_int)
+        time_qr, t_op = timing(factor_qr, b_mat, r_int)
+        apply_svd = timing(lambda p: t_mat.T.dot(t_mat.dot(p)), p_vec, 10)[0]
+        apply_qr = timing(lambda p: t_op.T.dot(t_op.dot(p)), p_vec, 10)[0]
+
+        cond_svd = numpy.linalg.cond(numpy.dot(b_mat, t_mat))
+        cond_qr = numpy.linalg.cond(t_op.T.dot(b_mat.T).T)
+        print('d = ' + str(d_int) + ':  factorization svd ' + str(time_svd) + 's,  qr ' + str(time_qr)
+              + 's,  speedup ' + str(time_svd / time_qr))
+        print('        apply svd ' + str(apply_svd) + 's,  qr ' + str(apply_qr)
+              + 's,  cond svd ' + str(cond_svd) + ',  cond qr ' + str(cond_qr))
+
+
+if __name__ == '__main__':
+    d_vec = [100, 200, 500, 1000, 2000, 5000]
+    demo_speed(d_vec)
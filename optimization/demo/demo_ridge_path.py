@@ -0,0 +1,57 @@
+# Demo of the Speed of the Sketched Ridge Regularization Path
+#
+# "ridge.ridge_path" solves ridge regression for a whole path of lams.
+# The sketch of X and its SVD, X^T * y (and the preconditioned Gram matrix in the mode 'gram') are computed once,
+# and the preconditioner of each lam costs O(d^2).
+# We compare the path with independent preconditioned solves, one for each lam
+# (each of them sketches X, factorizes the sketch, and starts CG from zero),
+# and with the sketch-and-solve path "ridge.sketched_ridge".
+
+import numpy
+import time
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from optimization import ridge
+
+
+def independent(x_mat, y_vec, lam_vec, mode):
+    w_list = []
+    for lam_real in lam_vec:
+        w_list.append(ridge.ridge_path(x_mat, y_vec, [lam_real], mode=mode)[0][0])
+    return w_list
+
+
+def demo_path(x_mat, y_vec, lam_vec):
+    n_int, d_int = x_mat.shape
+    g_mat = numpy.dot(x_mat.T, x_mat)
+    w_opt_list = [numpy.linalg.solve(g_mat + n_int * lam_real * numpy.eye(d_int), numpy.dot(x_mat.T, y_vec)) for lam_real in lam_vec]
+    opt_obj_vec = ridge.objective(x_mat, y_vec, w_opt_list, lam_vec)
+
+    for mode in ['unfused', 'gram']:
+        t0 = time.perf_counter()
+        w_list = ridge.ridge_path(x_mat, y_vec, lam_vec, mode=mode)[0]
+        time_path = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        independent(x_mat, y_vec, lam_vec, mode)
+        time_indep = time.perf_counter() - t0
+        err_real = max([numpy.linalg.norm(x_mat.dot(w_vec - w_opt_vec)) / numpy.linalg.norm(x_mat.dot(w_opt_vec))
+                        for w_vec, w_opt_vec in zip(w_list, w_opt_list)])
+        print(mode + ':  path ' + str(time_path) + 's,  independent solves ' + str(time_indep)
+              + 's,  speedup ' + str(time_indep / time_path) + ',  relative error ' + str(err_real))
+
+    t0 = time.perf_counter()
+    obj_vec = ridge.sketched_ridge(x_mat, y_vec, lam_vec)[1]
+    print('sketch-and-solve:  path ' + str(time.perf_counter() - t0) + 's,  largest relative objective gap '
+          + str(numpy.max(obj_vec / opt_obj_vec - 1)))
+
+
+if __name__ == '__main__':
+    rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
+    x_mat = numpy.array(rawdata_mat[:, 1:])
+    y_vec = numpy.array(rawdata_mat[:, 0])
+    lam_vec = numpy.logspace(-6, 2, 20) * numpy.mean(x_mat ** 2)
+    print('YearPredictionMSD, ' + str(len(lam_vec)) + ' lams:')
+    demo_path(x_mat, y_vec, lam_vec)
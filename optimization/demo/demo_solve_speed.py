@@ -0,0 +1,59 @@
+# Demo of the Speed of the Sketch-and-Precondition Least Squares Solver
+#
+# We compare "lsr.solve" (Blendenpik: sketch, QR of the sketch, LSQR on X * R^{-1})
+# with numpy.linalg.lstsq on tall matrices with various numbers of columns and condition numbers.
+# The number of LSQR iterations does not depend on the condition number,
+# and the cost O(n * d * #iterations) beats the O(n * d^2) of lstsq for large d.
+
+import numpy
+import time
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from optimization import lsr
+
+
+def ill_conditioned(n_int, d_int, cond_real):
+    '''
+    n-by-d matrix with singular values evenly spaced on the log scale from 1 to 1/cond_real
+    '''
+    u_mat = numpy.linalg.qr(numpy.random.randn(n_int, d_int))[0]
+    v_mat = numpy.linalg.qr(numpy.random.randn(d_int, d_int))[0]
+    sigma_vec = numpy.logspace(0, -numpy.log10(cond_real), d_int)
+    return numpy.dot(u_mat * sigma_vec.reshape(1, d_int), v_mat.T)
+
+
+def demo_speed(x_mat, y_vec, repeat_int=3):
+    t0 = time.perf_counter()
+    for i in range(repeat_int):
+        w_opt_vec = numpy.linalg.lstsq(x_mat, y_vec, rcond=None)[0]
+    time_lstsq = (time.perf_counter() - t0) / repeat_int
+
+    t0 = time.perf_counter()
+    for i in range(repeat_int):
+        w_vec = lsr.solve(x_mat, y_vec)[0]
+    time_solve = (time.perf_counter() - t0) / repeat_int
+    
+    err_real = numpy.linalg.norm(x_mat.dot(w_vec - w_opt_vec)) / numpy.linalg.norm(x_mat.dot(w_opt_vec))
+    print('n = ' + str(x_mat.shape[0]) + ', d = ' + str(x_mat.shape[1]) + ':  lstsq ' + str(time_lstsq)
+          + 's,  solve ' + str(time_solve) + 's,  speedup ' + str(time_lstsq / time_solve)
+          + ',  relative error ' + str(err_real))
+
+
+if __name__ == '__main__':
+    rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
+    rawdata_mat = rawdata_mat[0:100000, :]
+    x_mat = numpy.array(rawdata_mat[:, 1:])
+    y_vec = numpy.array(rawdata_mat[:, 0])
+    print('YearPredictionMSD:')
+    demo_speed(x_mat, y_vec)
+
+    n_int = 100000
+    for d_int in [100, 200, 400]:
+        for cond_real in [1e2, 1e8]:
+            print('Condition number ' + str(cond_real) + ':')
+            x_mat = ill_conditioned(n_int, d_int, cond_real)
+            y_vec = x_mat.dot(numpy.random.randn(d_int)) + 0.1 * numpy.random.randn(n_int)
+            demo_speed(x_mat, y_vec)
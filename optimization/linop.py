@@ -0,0 +1,134 @@
+import numpy
+import scipy.linalg
+import scipy.sparse
+import scipy.sparse.linalg
+
+
+def as_operator(x_mat):
+    '''
+    Wrap X So That the Solvers Can Use x_mat.dot and x_mat.T.dot
+
+    Input
+        x_mat: n-by-d NumPy matrix, scipy.sparse matrix, scipy.sparse.linalg.LinearOperator,
+               or any object with the attributes shape, matvec and rmatvec (and optionally matmat and rmatmat).
+    Output
+        x_mat itself if it is a NumPy matrix or a scipy.sparse matrix;
+        otherwise a scipy.sparse.linalg.LinearOperator.
+
+    X is never formed: only its products with vectors and blocks of vectors are used.
+    '''
+    if is_explicit(x_mat):
+        return x_mat
+    return scipy.sparse.linalg.aslinearoperator(x_mat)
+
+
+def is_explicit(x_mat):
+    '''
+    Whether X is stored explicitly (NumPy matrix or scipy.sparse matrix)
+    '''
+    return isinstance(x_mat, numpy.ndarray) or scipy.sparse.issparse(x_mat)
+
+
+def gram_dot(x_mat, p_mat, gram_func=None):
+    '''
+    Product X^T * X * P
+
+    Input
+        x_mat: the output of as_operator;
+        p_mat: d-by-k matrix P;
+        gram_func: function that returns X^T * X * P (optional);
+                   e.g. a fused kernel that reads X once, or X^T X itself if it is cheap to form.
+    Output
+        d-by-k matrix X^T * X * P.
+    '''
+    if gram_func is not None:
+        return gram_func(p_mat)
+    return x_mat.T.dot(x_mat.dot(p_mat))
+
+
+def center_scale(x_mat, mean_vec=None, scale_vec=None):
+    '''
+    Implicitly Centered and Scaled Matrix (X - 1 * mu^T) * D
+
+    Input
+        x_mat: n-by-d NumPy matrix or scipy.sparse matrix X;
+        mean_vec: d-dim vector mu of column means (optional);
+        scale_vec: d-dim vector of the diagonal of D, e.g. 1 / std (optional).
+    Output
+        n-by-d scipy.sparse.linalg.LinearOperator.
+
+    Neither the centered nor the scaled matrix is formed, so a sparse X stays sparse
+    and no n-by-d copy is made:
+        (X - 1 * mu^T) * D * P = X * (D * P) - 1 * (mu^T * D * P),
+        D * (X - 1 * mu^T)^T * R = D * (X^T * R - mu * (1^T * R)).
+    '''
+    n_int, d_int = x_mat.shape
+    if mean_vec is not None:
+        mean_vec = numpy.asarray(mean_vec, dtype=numpy.float64).reshape(d_int, 1)
+    if scale_vec is not None:
+        scale_vec = numpy.asarray(scale_vec, dtype=numpy.float64).reshape(d_int, 1)
+
+    def matmat(p_mat):
+        if scale_vec is not None:
+            p_mat = scale_vec * p_mat
+        c_mat = numpy.asarray(x_mat.dot(p_mat))
+        if mean_vec is not None:
+            c_mat = c_mat - numpy.dot(mean_vec.T, p_mat)
+        return c_mat
+
+    def rmatmat(r_mat):
+        c_mat = numpy.asarray(x_mat.T.dot(r_mat))
+        if mean_vec is not None:
+            c_mat = c_mat - mean_vec * numpy.sum(r_mat, axis=0).reshape(1, -1)
+        if scale_vec is not None:
+            c_mat = scale_vec * c_mat
+        return c_mat
+
+    matvec = lambda p_vec: matmat(p_vec.reshape(d_int, 1)).ravel()
+    rmatvec = lambda r_vec: rmatmat(r_vec.reshape(n_int, 1)).ravel()
+    return scipy.sparse.linalg.LinearOperator((n_int, d_int), matvec=matvec, rmatvec=rmatvec,
+                                              matmat=matmat, rmatmat=rmatmat, dtype=numpy.float64)
+
+
+def sketch_columns(x_mat, sketch_op, block_int=64):
+    '''
+    Sketch S^T * X of An Implicit Matrix, Block of Columns by Block of Columns
+
+    Input
+        x_mat: the output of as_operator;
+        sketch_op: sketch.operators.SketchOperator representing the n-by-s matrix S;
+        block_int: number of columns of X formed at a time.
+    Output
+        c_mat: s-by-d sketch S^T * X.
+
+    The columns J of X are formed as X * E_J (E_J contains the columns J of the identity),
+    and the same S is applied to every block,
+    so the memory is O(n * block_int) plus the s-by-d sketch.
+    '''
+    n_int, d_int = x_mat.shape
+    c_mat = numpy.zeros((sketch_op.s_int, d_int))
+    for j in range(0, d_int, block_int):
+        k_int = min(block_int, d_int - j)
+        e_mat = numpy.zeros((d_int, k_int))
+        e_mat[j + numpy.arange(k_int), numpy.arange(k_int)] = 1
+        c_mat[:, j:j+k_int] = sketch_op.apply_left(numpy.asarray(x_mat.dot(e_mat)))
+    return c_mat
+
+
+def triangular_inverse(r_mat):
+    '''
+    The Inverse of An Upper Triangular Matrix as An Operator
+
+    Input
+        r_mat: d-by-d upper triangular matrix R, e.g. from a QR decomposition.
+    Output
+        d-by-d scipy.sparse.linalg.LinearOperator T = R^{-1};
+        T.dot(P) and T.T.dot(P) are computed by triangular solves with R and R^T,
+        which take the same number of flops as a product with a dense d-by-d matrix
+        (though a triangular solve runs somewhat slower), and R^{-1} is never formed.
+    '''
+    d_int = r_mat.shape[0]
+    matmat = lambda p_mat: scipy.linalg.solve_triangular(r_mat, p_mat)
+    rmatmat = lambda p_mat: scipy.linalg.solve_triangular(r_mat, p_mat, trans='T')
+    return scipy.sparse.linalg.LinearOperator((d_int, d_int), matvec=matmat, rmatvec=rmatmat,
+                                              matmat=matmat, rmatmat=rmatmat, dtype=numpy.float64)
@@ -0,0 +1,141 @@
+import numpy
+
+import optimization.linop as linop
+
+def lsmr(x_mat, y_vec, tol=1e-12, max_iter_int=10000, cond_mat=None, w0_vec=None, verbose=True):
+    '''
+    LSMR Algorithm for Least Squares Regression: argmin_w || X * w - y ||_2^2
+    
+    Input
+        x_mat: n-by-d NumPy matrix, scipy.sparse matrix, or LinearOperator X (see linop.as_operator);
+        y_vec: n-dim vector y;
+        tol: convergence tolerance (optional);
+             LSMR stops if || (X T)^T r || <= tol * ||X T||_F * ||r||  (r = y - X w is the residual)
+             or if ||r|| <= tol * (||y|| + ||X T||_F * ||z||), i.e. the system is consistent;
+        max_iter_int: (>0) maximum number of iterations;
+        cond_mat: d-by-d preconditioning matrix T such that X * T is well-conditioned (optional),
+                  e.g. the output of cg_cond.precondition; anything with dot and T.dot can be used;
+        w0_vec: d-dim initial solution (optional);
+        verbose: if True, the progress is printed as in cg.cg.
+        
+    Output
+        w_vec: d-by-1 solution to the LSR problem;
+        is_converged_bool: whether LSMR attains convergence tolerance.
+    
+    LSMR (Fong and Saunders, 2011) is mathematically equivalent to MINRES on the normal equations:
+    || (X T)^T r || decreases monotonically, so it is safe to stop early with a loose tolerance.
+    Like LSQR, it costs one product with X and one with X^T per iteration.
+    With a preconditioner, LSMR solves argmin_z || X * T * z - y || and returns w = T * z.
+    '''
+    x_mat = linop.as_operator(x_mat)
+    n_int, d_int = x_mat.shape
+    y_vec = numpy.asarray(y_vec, dtype=numpy.float64).reshape(n_int)
+    if cond_mat is None:
+        a_func = lambda z_vec: x_mat.dot(z_vec)
+        at_func = lambda r_vec: x_mat.T.dot(r_vec)
+    else:
+        a_func = lambda z_vec: x_mat.dot(cond_mat.dot(z_vec))
+        at_func = lambda r_vec: cond_mat.T.dot(x_mat.T.dot(r_vec))
+    
+    w0_vec = numpy.zeros(d_int) if w0_vec is None else numpy.asarray(w0_vec, dtype=numpy.float64).reshape(d_int)
+    z_vec = numpy.zeros(d_int)
+    
+    # Golub-Kahan bidiagonalization of X * T started with the residual of w0
+    u_vec = y_vec - x_mat.dot(w0_vec)
+    bnorm_real = beta_real = numpy.linalg.norm(u_vec)
+    if beta_real > 0:
+        u_vec = u_vec / beta_real
+    v_vec = at_func(u_vec)
+    alpha_real = numpy.linalg.norm(v_vec)
+    if alpha_real > 0:
+        v_vec = v_vec / alpha_real
+    
+    # variables of the two QR factorizations
+    alphabar_real = alpha_real
+    zetabar_real = alpha_real * beta_real
+    rho_real = rhobar_real = cbar_real = 1.0
+    sbar_real = 0.0
+    h_vec = v_vec.copy()
+    hbar_vec = numpy.zeros(d_int)
+    
+    # variables for estimating ||r||
+    betadd_real = beta_real
+    betad_real = 0.0
+    rhodold_real = 1.0
+    tautildeold_real = thetatilde_real = zeta_real = 0.0
+    anorm2_real = alpha_real ** 2
+    
+    is_converged_bool = (alpha_real * beta_real == 0)
+    i = -1
+    
+    for i in range(max_iter_int):
+        if is_converged_bool:
+            break
+        u_vec = a_func(v_vec) - alpha_real * u_vec
+        beta_real = numpy.linalg.norm(u_vec)
+        if beta_real > 0:
+            u_vec /= beta_real
+        v_vec = at_func(u_vec) - beta_real * v_vec
+        alpha_real = numpy.linalg.norm(v_vec)
+        if alpha_real > 0:
+            v_vec /= alpha_real
+        
+        # rotation that eliminates beta
+        rhoold_real = rho_real
+        rho_real = numpy.hypot(alphabar_real, beta_real)
+        c_real = alphabar_real / rho_real
+        s_real = beta_real / rho_real
+        thetanew_real = s_real * alpha_real
+        alphabar_real = c_real * alpha_real
+        
+        # rotation that eliminates thetanew
+        rhobarold_real = rhobar_real
+        zetaold_real = zeta_real
+        thetabar_real = sbar_real * rho_real
+        rhotemp_real = cbar_real * rho_real
+        rhobar_real = numpy.hypot(rhotemp_real, thetanew_real)
+        cbar_real = rhotemp_real / rhobar_real
+        sbar_real = thetanew_real / rhobar_real
+        zeta_real = cbar_real * zetabar_real
+        zetabar_real = - sbar_real * zetabar_real
+        
+        hbar_vec = h_vec - (thetabar_real * rho_real / (rhoold_real * rhobarold_real)) * hbar_vec
+        z_vec += (zeta_real / (rho_real * rhobar_real)) * hbar_vec
+        h_vec = v_vec - (thetanew_real / rho_real) * h_vec
+        
+        # estimate of ||r||
+        betahat_real = c_real * betadd_real
+        betadd_real = - s_real * betadd_real
+        thetatildeold_real = thetatilde_real
+        rhotildeold_real = numpy.hypot(rhodold_real, thetabar_real)
+        ctildeold_real = rhodold_real / rhotildeold_real
+        stildeold_real = thetabar_real / rhotildeold_real
+        thetatilde_real = stildeold_real * rhobar_real
+        rhodold_real = ctildeold_real * rhobar_real
+        betad_real = - stildeold_real * betad_real + ctildeold_real * betahat_real
+        tautildeold_real = (zetaold_real - thetatildeold_real * tautildeold_real) / rhotildeold_real
+        taud_real = (zeta_real - thetatilde_real * tautildeold_real) / rhodold_real
+        rnorm_real = numpy.sqrt((betad_real - taud_real) ** 2 + betadd_real ** 2)
+        
+        anorm2_real += beta_real ** 2
+        anorm_real = numpy.sqrt(anorm2_real)
+        anorm2_real += alpha_real ** 2
+        arnorm_real = abs(zetabar_real)
+        
+        if i % 100 == 0 and verbose:
+            print('Iteration ' + str(i) + ': residual=' + str(rnorm_real) + ', normal residual=' + str(arnorm_real))
+        
+        if (arnorm_real <= tol * anorm_real * rnorm_real
+                or rnorm_real <= tol * (bnorm_real + anorm_real * numpy.linalg.norm(z_vec))):
+            is_converged_bool = True
+            if verbose:
+                print('Iteration ' + str(i) + ': residual=' + str(rnorm_real) + ', normal residual=' + str(arnorm_real))
+            break
+    
+    if not is_converged_bool and verbose:
+        print('Warn: LSMR did not converge after ' + str(i+1) + ' iterations!')
+    
+    if cond_mat is not None:
+        z_vec = cond_mat.dot(z_vec)
+    w_vec = (w0_vec + z_vec).reshape(d_int, 1)
+    return w_vec, is_converged_bool
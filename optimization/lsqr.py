@@ -0,0 +1,107 @@
+import numpy
+
+import optimization.linop as linop
+
+def lsqr(x_mat, y_vec, tol=1e-12, max_iter_int=10000, cond_mat=None, w0_vec=None, verbose=True):
+    '''
+    LSQR Algorithm for Least Squares Regression: argmin_w || X * w - y ||_2^2
+    
+    Input
+        x_mat: n-by-d NumPy matrix, scipy.sparse matrix, or LinearOperator X (see linop.as_operator);
+        y_vec: n-dim vector y;
+        tol: convergence tolerance (optional);
+             LSQR stops if || (X T)^T r || <= tol * ||X T||_F * ||r||  (r = y - X w is the residual)
+             or if ||r|| <= tol * (||y|| + ||X T||_F * ||z||), i.e. the system is consistent;
+        max_iter_int: (>0) maximum number of iterations;
+        cond_mat: d-by-d preconditioning matrix T such that X * T is well-conditioned (optional),
+                  e.g. the output of cg_cond.precondition; anything with dot and T.dot can be used;
+        w0_vec: d-dim initial solution (optional);
+        verbose: if True, the progress is printed as in cg.cg.
+        
+    Output
+        w_vec: d-by-1 solution to the LSR problem;
+        is_converged_bool: whether LSQR attains convergence tolerance.
+    
+    LSQR (Paige and Saunders, 1982) is mathematically equivalent to CG on the normal equations,
+    but works with X (or X * T) directly, so the condition number is not squared
+    and it stays accurate at small tolerances.
+    Each iteration costs one product with X and one with X^T.
+    With a preconditioner, LSQR solves argmin_z || X * T * z - y || and returns w = T * z.
+    '''
+    x_mat = linop.as_operator(x_mat)
+    n_int, d_int = x_mat.shape
+    y_vec = numpy.asarray(y_vec, dtype=numpy.float64).reshape(n_int)
+    if cond_mat is None:
+        a_func = lambda z_vec: x_mat.dot(z_vec)
+        at_func = lambda r_vec: x_mat.T.dot(r_vec)
+    else:
+        a_func = lambda z_vec: x_mat.dot(cond_mat.dot(z_vec))
+        at_func = lambda r_vec: cond_mat.T.dot(x_mat.T.dot(r_vec))
+    
+    w0_vec = numpy.zeros(d_int) if w0_vec is None else numpy.asarray(w0_vec, dtype=numpy.float64).reshape(d_int)
+    z_vec = numpy.zeros(d_int)
+    
+    # Golub-Kahan bidiagonalization of X * T started with the residual of w0
+    u_vec = y_vec - x_mat.dot(w0_vec)
+    bnorm_real = beta_real = numpy.linalg.norm(u_vec)
+    if beta_real > 0:
+        u_vec = u_vec / beta_real
+    v_vec = at_func(u_vec)
+    alpha_real = numpy.linalg.norm(v_vec)
+    if alpha_real > 0:
+        v_vec = v_vec / alpha_real
+    p_vec = v_vec.copy()
+    phibar_real = beta_real
+    rhobar_real = alpha_real
+    anorm2_real = 0.0
+    
+    is_converged_bool = (alpha_real * beta_real == 0)
+    i = -1
+    
+    for i in range(max_iter_int):
+        if is_converged_bool:
+            break
+        u_vec = a_func(v_vec) - alpha_real * u_vec
+        beta_real = numpy.linalg.norm(u_vec)
+        if beta_real > 0:
+            u_vec /= beta_real
+        anorm2_real += alpha_real ** 2 + beta_real ** 2
+        v_vec = at_func(u_vec) - beta_real * v_vec
+        alpha_real = numpy.linalg.norm(v_vec)
+        if alpha_real > 0:
+            v_vec /= alpha_real
+        
+        # plane rotation that eliminates beta
+        rho_real = numpy.hypot(rhobar_real, beta_real)
+        c_real = rhobar_real / rho_real
+        s_real = beta_real / rho_real
+        theta_real = s_real * alpha_real
+        rhobar_real = - c_real * alpha_real
+        phi_real = c_real * phibar_real
+        phibar_real = s_real * phibar_real
+        
+        z_vec += (phi_real / rho_real) * p_vec
+        p_vec = v_vec - (theta_real / rho_real) * p_vec
+        
+        # ||r|| and ||(X T)^T r|| are available from the recurrences
+        anorm_real = numpy.sqrt(anorm2_real)
+        rnorm_real = phibar_real
+        arnorm_real = phibar_real * alpha_real * abs(c_real)
+        
+        if i % 100 == 0 and verbose:
+            print('Iteration ' + str(i) + ': residual=' + str(rnorm_real) + ', normal residual=' + str(arnorm_real))
+        
+        if (arnorm_real <= tol * anorm_real * rnorm_real
+                or rnorm_real <= tol * (bnorm_real + anorm_real * numpy.linalg.norm(z_vec))):
+            is_converged_bool = True
+            if verbose:
+                print('Iteration ' + str(i) + ': residual=' + str(rnorm_real) + ', normal residual=' + str(arnorm_real))
+            break
+    
+    if not is_converged_bool and verbose:
+        print('Warn: LSQR did not converge after ' + str(i+1) + ' iterations!')
+    
+    if cond_mat is not None:
+        z_vec = cond_mat.dot(z_vec)
+    w_vec = (w0_vec + z_vec).reshape(d_int, 1)
+    return w_vec, is_converged_bool
@@ -1,12 +1,53 @@
 import numpy
+import scipy.linalg
 import sys
 
 PyRLA_dir = '../../'
 sys.path.append(PyRLA_dir)
 
 from sketch import *
+import optimization.linop as linop
+import optimization.lsqr as lsqr
+import optimization.lsmr as lsmr
 
-def sketched_lsr(x_mat, y_mat, sketch_size=None, sketch_type='count'):
+
+def sketch_xy(x_mat, y_mat, s_int, sketch_type='srft', osnap_k=2):
+    '''
+    Sketch X and Y with the Same Random Projection
+    
+    Input
+        x_mat: n-by-d feature matrix;
+        y_mat: n-by-m response matrix (or None);
+        s_int: sketch size;
+        sketch_type: can be 'srft', 'srht', 'count', 'osnap', or 'gaussian';
+        osnap_k: number of nonzeros in each column of the s-by-n sparse embedding (only for 'osnap').
+        
+    Output
+        sx_mat: s-by-d sketch S^T * X;
+        sy_mat: s-by-m sketch S^T * Y (None if y_mat is None).
+    '''
+    # the sketch of A = X^T alone, and of A = X^T and B = Y^T with the same S
+    if sketch_type == 'srft':
+        sketch_func, sketch2_func = srft.srft, srft.srft2
+    elif sketch_type == 'srht':
+        sketch_func, sketch2_func = srht.srht, srht.srht2
+    elif sketch_type == 'count':
+        sketch_func, sketch2_func = countsketch.countsketch, countsketch.countsketch2
+    elif sketch_type == 'osnap':
+        sketch_func = lambda a_mat, s_int: osnap.osnap(a_mat, s_int, osnap_k)
+        sketch2_func = lambda a_mat, b_mat, s_int: osnap.osnap2(a_mat, b_mat, s_int, osnap_k)
+    elif sketch_type == 'gaussian':
+        sketch_func, sketch2_func = gaussian.gaussian_proj, gaussian.gaussian_proj2
+    else:
+        raise ValueError('Unknown sketch_type: ' + str(sketch_type))
+    
+    if y_mat is None:
+        return sketch_func(x_mat.T, s_int).T, None
+    sx_mat, sy_mat = sketch2_func(x_mat.T, y_mat.T, s_int)
+    return sx_mat.T, sy_mat.T
+
+
+def sketched_lsr(x_mat, y_mat, sketch_size=None, sketch_type='count', osnap_k=2):
     '''
     Sketched Least Squares Regression
     Alternative of numpy.linalg.lstsq(x_mat, y_mat)
@@ -14,8 +55,10 @@ def sketched_lsr(x_mat, y_mat, sketch_size=None, sketch_type='count'):
     Input
         x_mat: n-by-d feature matrix;
         y_mat: n-by-m response matrix;
-        sketch_size: s/d (real number greater than 1), where s is the sketch size;
-        sketch_type: can be 'srft' or 'count'.
+        sketch_size: s/d (real number greater than 1), where s is the sketch size,
+                     or 'auto' (see adaptive_lsr; only for 'srft', 'srht', 'count', and 'osnap');
+        sketch_type: can be 'srft', 'srht', 'count', 'osnap', 'gaussian', 'leverage', or 'shrink';
+        osnap_k: number of nonzeros in each column of the s-by-n sparse embedding (only for 'osnap').
         
     Output
         w_mat: d-by-m solution;
@@ -24,17 +67,16 @@ def sketched_lsr(x_mat, y_mat, sketch_size=None, sketch_type='count'):
     
     n_int, d_int = x_mat.shape
     
+    if sketch_size == 'auto':
+        return adaptive_lsr(x_mat, y_mat, sketch_type, osnap_k=osnap_k)[0:2]
     if sketch_size is None:
         s_int = int(5 * d_int)
     else:
         s_int = int(sketch_size * d_int)
         
-    if sketch_type == 'srft':
-        sx_mat, sy_mat = srft.srft2(x_mat.T, y_mat.T, s_int)
-        w_mat = numpy.linalg.lstsq(sx_mat.T, sy_mat.T)[0]
-    elif sketch_type == 'count':
-        sx_mat, sy_mat = countsketch.countsketch2(x_mat.T, y_mat.T, s_int)
-        w_mat = numpy.linalg.lstsq(sx_mat.T, sy_mat.T)[0]
+    if sketch_type in ['srft', 'srht', 'count', 'osnap', 'gaussian']:
+        sx_mat, sy_mat = sketch_xy(x_mat, y_mat, s_int, sketch_type, osnap_k)
+        w_mat = numpy.linalg.lstsq(sx_mat, sy_mat)[0]
     elif sketch_type == 'leverage':
         lev_approx_vec = leverage.lev_approx(x_mat.T)
         prob_vec = lev_approx_vec / sum(lev_approx_vec)
@@ -52,9 +94,219 @@ def sketched_lsr(x_mat, y_mat, sketch_size=None, sketch_type='count'):
         sx_mat = x_mat[idx_vec, :] / scaling_vec.reshape(len(scaling_vec), 1)
         sy_mat = y_mat[idx_vec, :] / scaling_vec.reshape(len(scaling_vec), 1)
         w_mat = numpy.linalg.lstsq(sx_mat, sy_mat)[0]
+    else:
+        raise ValueError('Unknown sketch_type: ' + str(sketch_type))
     
     residual = numpy.dot(x_mat, w_mat) - y_mat
     obj_val = numpy.sum(residual ** 2) / n_int
     return w_mat, obj_val
+
+
+def adaptive_lsr(x_mat, y_mat, sketch_type='count', obj_tol=0.05, max_sketch_size=50, osnap_k=2):
+    '''
+    Sketched Least Squares Regression with An Adaptive Sketch Size
+    
+    Input
+        x_mat: n-by-d feature matrix X;
+        y_mat: n-by-m response matrix Y (or n-dim vector);
+        sketch_type: can be 'srft', 'srht', 'count', or 'osnap';
+        obj_tol: the sketch grows until the estimated relative gap (f(W) - f(W_opt)) / f(W) is at most obj_tol;
+        max_sketch_size: the sketch size s never exceeds max_sketch_size * d (nor n);
+        osnap_k: see sketch_xy.
+        
+    Output
+        w_mat: d-by-m solution (d-dim if y_mat is a vector);
+        obj_val: objective function value f(W) = (1/n) * ||X W - Y||_F^2;
+        s_int: the final sketch size.
+    
+    The sketch starts with s = 2d and doubles by appending independent sketches of [X, Y],
+    so the rows already sketched are kept: R of the QR decomposition of the sketch of [X, Y]
+    is updated by a QR decomposition of R stacked on the new rows,
+    and W = R11^{-1} * R12 solves the sketched problem.
+    A block of b rows is weighted by sqrt(b), so the stacked sketch is an embedding of size s.
     
-    
\ No newline at end of file
+    The gap f(W) - f(W_opt) = (1/n) * ||X (W - W_opt)||_F^2 is estimated a posteriori
+    by (1/n) * ||R^{-T} X^T (X W - Y)||_F^2, where R is scaled such that ||R v|| is about ||X v||:
+    X R^{-1} is well conditioned, so the estimate is within a factor (1 +- sqrt(d/s))^2 of the gap.
+    Each size costs one product with X and one with X^T, and the sketch stops growing
+    once the estimated relative gap (f(W) - f(W_opt)) / f(W) is at most obj_tol.
+    The solution with the smallest objective is returned.
+    '''
+    if sketch_type not in ['srft', 'srht', 'count', 'osnap']:
+        raise ValueError("sketch_size='auto' needs sketch_type 'srft', 'srht', 'count', or 'osnap', not " + str(sketch_type))
+    n_int, d_int = x_mat.shape
+    is_vec_bool = (y_mat.ndim == 1)
+    y_mat = y_mat.reshape(n_int, -1)
+    s_max = min(int(max_sketch_size * d_int), n_int)
+    
+    r_mat = None
+    s_int = 0
+    b_int = min(2 * d_int, s_max)
+    best_w_mat, best_obj, best_s = None, numpy.inf, 0
+    while b_int > 0:
+        sx_mat, sy_mat = sketch_xy(x_mat, y_mat, b_int, sketch_type, osnap_k)
+        c_mat = numpy.concatenate((sx_mat, sy_mat), axis=1) * numpy.sqrt(b_int)
+        if r_mat is not None:
+            c_mat = numpy.concatenate((r_mat, c_mat), axis=0)
+        r_mat = numpy.linalg.qr(c_mat, mode='r')
+        s_int += b_int
+        b_int = min(s_int, s_max - s_int)
+        
+        diag_vec = numpy.abs(numpy.diag(r_mat[0:d_int, 0:d_int]))
+        if r_mat.shape[0] < d_int or numpy.min(diag_vec) <= 1e-13 * numpy.max(diag_vec):
+            continue
+        w_mat = scipy.linalg.solve_triangular(r_mat[0:d_int, 0:d_int], r_mat[0:d_int, d_int:])
+        residual = x_mat.dot(w_mat) - y_mat
+        obj_val = numpy.sum(residual ** 2) / n_int
+        if obj_val < best_obj:
+            best_w_mat, best_obj, best_s = w_mat, obj_val, s_int
+        
+        # || R^{-T} X^T (X W - Y) || estimates || X (W - W_opt) ||, since X R^{-1} is well conditioned
+        u_mat = scipy.linalg.solve_triangular(r_mat[0:d_int, 0:d_int] / numpy.sqrt(s_int), x_mat.T.dot(residual), trans='T')
+        if numpy.sum(u_mat ** 2) / n_int <= obj_tol * obj_val:
+            break
+    
+    if best_w_mat is None:
+        raise numpy.linalg.LinAlgError('The sketch of X is rank deficient; X must have full column rank.')
+    if is_vec_bool:
+        best_w_mat = best_w_mat.ravel()
+    return best_w_mat, best_obj, best_s
+
+
+def solve(x_mat, y_mat, method='blendenpik', sketch_type='count', sketch_size=10, tol=1e-14, max_iter_int=1000, osnap_k=2, solver='lsqr'):
+    '''
+    High-Accuracy Least Squares Regression
+    Alternative of numpy.linalg.lstsq(x_mat, y_mat)
+    
+    Input
+        x_mat: n-by-d feature matrix X (n >> d) with full column rank;
+        y_mat: n-by-m response matrix Y (or n-dim vector);
+        method: 'blendenpik' (sketch-and-precondition) or 'ihs' (iterative Hessian sketch, see ihs_lsr);
+        sketch_type: see sketch_xy; count sketch is the cheapest,
+                    and a worse preconditioner only costs a few more iterations;
+        sketch_size: s/d (real number greater than 1), where s is the sketch size;
+                     a larger sketch gives fewer iterations (about 25 for s=10d and tol=1e-14);
+        tol: convergence tolerance of LSQR (see lsqr.lsqr) or of IHS;
+        max_iter_int: maximum number of LSQR or IHS iterations;
+        osnap_k: see sketch_xy;
+        solver: 'lsqr' (lsqr.lsqr) or 'lsmr' (lsmr.lsmr).
+        
+    Output
+        w_mat: d-by-m solution (d-dim if y_mat is a vector);
+        obj_val: objective function value (1/n) * ||X W - Y||_F^2.
+    
+    Blendenpik: the QR decomposition of the sketch S^T * X = Q * R makes X * R^{-1} well conditioned,
+    so LSQR on argmin_z ||X * R^{-1} * z - y||_2 converges in a few dozen iterations, independently of cond(X);
+    then w = R^{-1} * z.
+    LSQR starts from the sketch-and-solve solution z0 = Q^T * S^T * y.
+    Each iteration costs one product with X and one with X^T, plus two O(d^2) products with R^{-1}.
+    '''
+    n_int, d_int = x_mat.shape
+    is_vec_bool = (y_mat.ndim == 1)
+    y_mat = y_mat.reshape(n_int, -1)
+    if method == 'ihs':
+        w_mat, obj_val = ihs_lsr(x_mat, y_mat, sketch_size, sketch_type, max_iter_int, False, tol, osnap_k)
+        return (w_mat.ravel() if is_vec_bool else w_mat), obj_val
+    if method != 'blendenpik':
+        raise ValueError('Unknown method: ' + str(method))
+    if solver == 'lsqr':
+        solver_func = lsqr.lsqr
+    elif solver == 'lsmr':
+        solver_func = lsmr.lsmr
+    else:
+        raise ValueError('Unknown solver: ' + str(solver))
+    
+    s_int = min(int(sketch_size * d_int), n_int)
+    sx_mat, sy_mat = sketch_xy(x_mat, y_mat, s_int, sketch_type, osnap_k)
+    q_mat, r_mat = numpy.linalg.qr(sx_mat)
+    diag_vec = numpy.abs(numpy.diag(r_mat))
+    if numpy.min(diag_vec) <= 1e-13 * numpy.max(diag_vec):
+        raise numpy.linalg.LinAlgError('The sketch of X is rank deficient; X must have full column rank.')
+    t_op = linop.triangular_inverse(r_mat)
+    w0_mat = t_op.dot(numpy.dot(q_mat.T, sy_mat))
+    
+    w_mat = numpy.zeros((d_int, y_mat.shape[1]))
+    for j in range(y_mat.shape[1]):
+        w_vec = solver_func(x_mat, y_mat[:, j], tol=tol, max_iter_int=max_iter_int, cond_mat=t_op, w0_vec=w0_mat[:, j], verbose=False)[0]
+        w_mat[:, j] = w_vec.ravel()
+    
+    residual = x_mat.dot(w_mat) - y_mat
+    obj_val = numpy.sum(residual ** 2) / n_int
+    if is_vec_bool:
+        w_mat = w_mat.ravel()
+    return w_mat, obj_val
+
+
+def ihs_lsr(x_mat, y_mat, sketch_size=None, sketch_type='count', num_iter=10, fresh_sketch=False, tol=0, osnap_k=2):
+    '''
+    Iterative Hessian Sketch (IHS) for Least Squares Regression
+    Alternative of numpy.linalg.lstsq(x_mat, y_mat)
+    
+    Input
+        x_mat: n-by-d feature matrix X (n >> d) with full column rank;
+        y_mat: n-by-m response matrix Y (or n-dim vector);
+        sketch_size: s/d (real number greater than 1), where s is the sketch size (default 10);
+        sketch_type: see sketch_xy;
+        num_iter: maximum number of iterations;
+        fresh_sketch: if True, a new sketch of X is drawn and factorized in every iteration;
+                      otherwise the sketch of the first iteration is reused;
+        tol: the iterations stop once || R^{-T} X^T (Y - X W) ||_F <= tol * || R W ||_F,
+             where S^T X = Q R (optional);
+        osnap_k: see sketch_xy.
+        
+    Output
+        w_mat: d-by-m solution (d-dim if y_mat is a vector);
+        obj_val: objective function value (1/n) * ||X W - Y||_F^2.
+    
+    IHS (Pilanci and Wainwright, 2016) replaces the Hessian X^T X by the sketched Hessian X^T S S^T X
+    but keeps the exact gradient:
+        W <- W + (X^T S S^T X)^{-1} X^T (Y - X W).
+    With S^T X = Q R, the step costs one product with X, one with X^T, and two O(d^2) triangular solves.
+    The error || X (W - W_opt) || decays geometrically (roughly by a factor sqrt(d / s) per iteration),
+    so a few iterations give a near-exact solution.
+    Fresh sketches make the errors of different iterations independent,
+    which gives the guarantees of the analysis, at the price of a sketch and a QR per iteration.
+    A reused sketch costs one sketch and one QR in total,
+    but the plain step above may then diverge: the eigenvalues of (X^T S S^T X)^{-1} X^T X
+    spread up to about 1 / (1 - sqrt(d/s))^2 > 2.
+    The reused sketch is therefore combined with Polyak's heavy-ball momentum (Lacotte and Pilanci, 2020):
+        W_new <- W + mu * (X^T S S^T X)^{-1} X^T (Y - X W) + beta * (W - W_old),
+    with rho = d / s, mu = (1 - rho)^2 and beta = rho,
+    which contracts the error by a factor about sqrt(rho) per iteration.
+    '''
+    n_int, d_int = x_mat.shape
+    is_vec_bool = (y_mat.ndim == 1)
+    y_mat = y_mat.reshape(n_int, -1)
+    if sketch_size is None:
+        sketch_size = 10
+    s_int = min(int(sketch_size * d_int), n_int)
+    
+    if fresh_sketch:
+        mu_real, beta_real = 1, 0
+    else:
+        rho_real = d_int / s_int
+        mu_real, beta_real = (1 - rho_real) ** 2, rho_real
+    
+    w_mat = numpy.zeros((d_int, y_mat.shape[1]))
+    w_old_mat = w_mat.copy()
+    res_mat = y_mat.copy()
+    r_mat = None
+    for t in range(num_iter):
+        if r_mat is None or fresh_sketch:
+            sx_mat = sketch_xy(x_mat, None, s_int, sketch_type, osnap_k)[0]
+            r_mat = numpy.linalg.qr(sx_mat, mode='r')
+        g_mat = x_mat.T.dot(res_mat)
+        u_mat = scipy.linalg.solve_triangular(r_mat, g_mat, trans='T')
+        delta_mat = mu_real * scipy.linalg.solve_triangular(r_mat, u_mat) + beta_real * (w_mat - w_old_mat)
+        w_old_mat = w_mat
+        w_mat = w_mat + delta_mat
+        res_mat = y_mat - x_mat.dot(w_mat)
+        # || u || = || R^{-T} X^T (Y - X W) || measures the distance to the solution in the norm of S^T X
+        if numpy.linalg.norm(u_mat) <= tol * numpy.linalg.norm(numpy.dot(r_mat, w_mat)):
+            break
+    
+    obj_val = numpy.sum(res_mat ** 2) / n_int
+    if is_vec_bool:
+        w_mat = w_mat.ravel()
+    return w_mat, obj_val
+
@@ -0,0 +1,244 @@
+import numpy
+
+import optimization.linop as linop
+import optimization.cg_cond as cg_cond
+import optimization.lsr as lsr
+
+
+def sketch_svd(x_mat, sketch_type='count', sketch_size=3, osnap_k=2):
+    '''
+    Sketch X and Compute the SVD of the Sketch Once for A Whole Path of Ridge Problems
+
+    Input
+        x_mat: n-by-d NumPy matrix, scipy.sparse matrix, or LinearOperator X (see linop.as_operator);
+        sketch_type: 'srft', 'srht', 'count', or 'osnap';
+        sketch_size: s/d (real number greater than 1), where s is the sketch size;
+        osnap_k: see cg_cond.precondition.
+    Output
+        v_mat: d-by-d right singular vectors V of the s-by-d sketch S^T * X;
+        sig_vec: d-dim singular values of S^T * X.
+
+    The sketches are scaled such that ||S^T * X * w|| is about ||X * w||,
+    so X^T * S * S^T * X = V * Sig^2 * V^T approximates X^T * X.
+    '''
+    n_int, d_int = x_mat.shape
+    s_int = min(int(sketch_size * d_int), n_int)
+    b_mat = cg_cond.sketch_x(x_mat, sketch_type, s_int, osnap_k)
+    v_mat, sig_vec, _ = numpy.linalg.svd(b_mat, full_matrices=False)
+    return v_mat, sig_vec
+
+
+def ridge_cond(v_mat, sig_vec, lam_real, n_int):
+    '''
+    Preconditioner of Ridge Regression from the SVD of the Sketch (see sketch_svd)
+
+    Output
+        t_mat: d-by-d matrix T = V * (Sig^2 + n * lam * I)^{-1/2}, such that
+               T^T * (X^T * X + n * lam * I) * T is well-conditioned; the cost is O(d^2).
+    '''
+    return v_mat / numpy.sqrt(sig_vec ** 2 + n_int * lam_real).reshape(1, len(sig_vec))
+
+
+def objective(x_mat, y_mat, w_list, lam_vec):
+    '''
+    Objective function values (1/n) * ||X W - Y||_F^2 + lam * ||W||_F^2 of the solutions of a path
+    (the products with X are computed as one matrix-matrix product)
+    '''
+    n_int = x_mat.shape[0]
+    y_mat = y_mat.reshape(n_int, -1)
+    k_int = y_mat.shape[1]
+    w_all_mat = numpy.concatenate([w_mat.reshape(-1, k_int) for w_mat in w_list], axis=1)
+    res_mat = numpy.asarray(linop.as_operator(x_mat).dot(w_all_mat)) - numpy.tile(y_mat, (1, len(w_list)))
+    res_vec = numpy.sum(res_mat.reshape(n_int, len(w_list), k_int) ** 2, axis=(0, 2)) / n_int
+    return res_vec + numpy.asarray(lam_vec) * numpy.sum(w_all_mat.reshape(-1, len(w_list), k_int) ** 2, axis=(0, 2))
+
+
+def sketched_ridge(x_mat, y_mat, lam_vec, sketch_size=5, sketch_type='count', osnap_k=2):
+    '''
+    Sketched Ridge Regression for A Path of Regularization Parameters:
+        argmin_w (1/n) * || X * w - y ||_2^2 + lam * || w ||_2^2
+
+    Input
+        x_mat: n-by-d feature matrix X;
+        y_mat: n-by-m response matrix Y (or n-dim vector);
+        lam_vec: regularization parameters lam (> 0) of the path;
+        sketch_size: s/d (real number greater than 1), where s is the sketch size;
+        sketch_type: can be 'srft', 'srht', 'count', or 'osnap';
+        osnap_k: see lsr.sketch_xy.
+
+    Output
+        w_list: list of the d-by-m solutions (d-dim if y_mat is a vector), one for each lam;
+        obj_vec: objective function values of the solutions.
+
+    X and Y are sketched once, and the SVD S^T * X = U * Sig * V^T is computed once;
+    then the solution of the sketched problem
+        W = V * Sig * (Sig^2 + n * lam * I)^{-1} * U^T * S^T * Y
+    costs O(d^2 * m) for each lam.
+    '''
+    n_int, d_int = x_mat.shape
+    is_vec_bool = (y_mat.ndim == 1)
+    y_mat = y_mat.reshape(n_int, -1)
+    s_int = min(int(sketch_size * d_int), n_int)
+
+    sx_mat, sy_mat = lsr.sketch_xy(x_mat, y_mat, s_int, sketch_type, osnap_k)
+    u_mat, sig_vec, vt_mat = numpy.linalg.svd(sx_mat, full_matrices=False)
+    c_mat = numpy.dot(u_mat.T, sy_mat)
+
+    w_list = []
+    for lam_real in lam_vec:
+        scale_vec = sig_vec / (sig_vec ** 2 + n_int * lam_real)
+        w_mat = numpy.dot(vt_mat.T, scale_vec.reshape(d_int, 1) * c_mat)
+        w_list.append(w_mat.ravel() if is_vec_bool else w_mat)
+    obj_vec = objective(x_mat, y_mat, w_list, lam_vec)
+    return w_list, obj_vec
+
+
+def ridge_cg(x_mat, y_vec, lam_real, cond_mat=None, w0_vec=None, tol=1e-10, max_iter_int=1000, gram_func=None, xty_mat=None):
+    '''
+    Preconditioned CG for Ridge Regression: argmin_w (1/n) * || X * w - y ||_2^2 + lam * || w ||_2^2
+
+    Input
+        x_mat: n-by-d NumPy matrix, scipy.sparse matrix, or LinearOperator X (see linop.as_operator);
+        y_vec: n-dim vector y, or n-by-k matrix Y of k responses (not used if xty_mat is given);
+        lam_real: regularization parameter lam (>= 0), or k-dim vector of one lam for each response;
+        cond_mat: d-by-d preconditioner T, or an operator with dot and T.dot (optional), e.g. ridge_cond;
+                  or a list of k preconditioners, one for each response;
+        w0_vec: d-by-k initial solution (optional), e.g. the solution of a nearby lam;
+        tol: CG stops once || T^T * r || <= tol * || T^T * X^T * y || for every response,
+             where r = X^T * y - (X^T * X + n * lam * I) * w;
+        max_iter_int: maximum number of iterations;
+        gram_func: function that returns X^T * X * P for a d-by-k matrix P (optional, see linop.gram_dot);
+        xty_mat: d-by-k matrix X^T * Y if it is already computed (optional).
+
+    Output
+        w_vec: d-by-k solution (d-by-1 if y is a vector);
+        is_converged_bool: whether CG attains convergence tolerance (for all the k responses).
+
+    CG solves the normal equations (X^T * X + n * lam * I) * w = X^T * y with the preconditioner T * T^T.
+    The tolerance is relative, so it does not depend on the scale of y nor on how good w0 is.
+    The k responses run simultaneously, as in cg.cg, so the products with X are shared,
+    also when the responses have different lams (e.g. the columns of a regularization path).
+    '''
+    x_mat = linop.as_operator(x_mat)
+    n_int, d_int = x_mat.shape
+    if xty_mat is None:
+        xty_mat = numpy.asarray(x_mat.T.dot(y_vec.reshape(n_int, -1)))
+    k_int = xty_mat.shape[1]
+    nlam_vec = n_int * numpy.broadcast_to(numpy.asarray(lam_real, dtype=numpy.float64), (k_int,))
+
+    def precond(r_mat, idx_vec):
+        if cond_mat is None:
+            return r_mat
+        if isinstance(cond_mat, list):
+            return numpy.stack([numpy.asarray(cond_mat[j].dot(cond_mat[j].T.dot(r_mat[:, i]))).ravel()
+                                for i, j in enumerate(idx_vec)], axis=1)
+        return numpy.asarray(cond_mat.dot(cond_mat.T.dot(r_mat)))
+
+    idx_vec = numpy.arange(k_int) # the responses that have not converged
+    if w0_vec is None:
+        w_mat = numpy.zeros((d_int, k_int))
+        r_mat = xty_mat.copy()
+    else:
+        w_mat = numpy.array(w0_vec, dtype=numpy.float64).reshape(d_int, k_int)
+        r_mat = xty_mat - linop.gram_dot(x_mat, w_mat, gram_func) - nlam_vec * w_mat
+    z_mat = precond(r_mat, idx_vec)
+    rz_vec = numpy.einsum('ij,ij->j', r_mat, z_mat)
+    thresh_vec = tol ** 2 * numpy.einsum('ij,ij->j', xty_mat, precond(xty_mat, idx_vec))
+
+    active_vec = (rz_vec > thresh_vec)
+    idx_vec = idx_vec[active_vec]
+    r_mat, p_mat, rz_vec = r_mat[:, active_vec], z_mat[:, active_vec], rz_vec[active_vec]
+    is_converged_bool = (len(idx_vec) == 0)
+
+    for i in range(0 if is_converged_bool else max_iter_int):
+        q_mat = linop.gram_dot(x_mat, p_mat, gram_func) + nlam_vec[idx_vec] * p_mat
+        alp_vec = rz_vec / numpy.einsum('ij,ij->j', p_mat, q_mat)
+        w_mat[:, idx_vec] += alp_vec * p_mat
+        r_mat -= alp_vec * q_mat
+        z_mat = precond(r_mat, idx_vec)
+        rznew_vec = numpy.einsum('ij,ij->j', r_mat, z_mat)
+
+        active_vec = (rznew_vec > thresh_vec[idx_vec])
+        if not numpy.any(active_vec):
+            is_converged_bool = True
+            break
+
+        p_mat = z_mat + (rznew_vec / rz_vec) * p_mat
+        rz_vec = rznew_vec
+        if not numpy.all(active_vec):
+            idx_vec = idx_vec[active_vec]
+            r_mat, p_mat, rz_vec = r_mat[:, active_vec], p_mat[:, active_vec], rz_vec[active_vec]
+
+    return w_mat, is_converged_bool
+
+
+def ridge_path(x_mat, y_mat, lam_vec, sketch_type='count', sketch_size=3, tol=1e-10, max_iter_int=1000, osnap_k=2, gram_func=None, mode='auto'):
+    '''
+    High-Accuracy Ridge Regression for A Path of Regularization Parameters:
+        argmin_w (1/n) * || X * w - y ||_2^2 + lam * || w ||_2^2
+
+    Input
+        x_mat: n-by-d NumPy matrix, scipy.sparse matrix, or LinearOperator X (see linop.as_operator);
+        y_mat: n-by-m response matrix Y (or n-dim vector);
+        lam_vec: regularization parameters lam (>= 0) of the path;
+        sketch_type, sketch_size, osnap_k: see sketch_svd;
+        tol, max_iter_int, gram_func: see ridge_cg;
+        mode: 'unfused' (each iteration reads X twice), 'gram' (G0 below is formed once,
+              and then an iteration costs O(d^2)), or 'auto' (the cheaper of the two, see cg_cond.choose_mode).
+
+    Output
+        w_list: list of the d-by-m solutions (d-dim if y_mat is a vector), one for each lam;
+        obj_vec: objective function values of the solutions;
+        is_converged_bool: whether CG attains convergence tolerance for every lam.
+
+    The parts that do not depend on lam are computed once for the whole path:
+    the sketch of X and its SVD (sketch_svd), X^T * Y, and in the mode 'gram'
+    the Gram matrix G0 = (X * T0)^T * (X * T0) in the basis of T0 = V * Sig^{-1}, so that
+    X^T * X = V * Sig * G0 * Sig * V^T; unlike X^T * X, G0 is well conditioned,
+    so the mode 'gram' is as accurate as 'unfused' also for lam = 0 and an ill-conditioned X.
+    The preconditioner of each lam costs O(d^2) (ridge_cond).
+    'gram': the lams are solved from the largest to the smallest, and the CG of each lam (ridge_cg)
+    starts from the solution of the previous one, which is close for a fine path.
+    'unfused': all the lams are solved by one run of ridge_cg whose columns are the pairs (lam, response),
+    so an iteration reads X twice for the whole path (as the k responses of cg.cg),
+    whereas a warm start only saves a fraction of the iterations of each lam.
+    Either way, the whole path costs about as much as a single solve.
+    '''
+    n_int, d_int = x_mat.shape
+    is_vec_bool = (y_mat.ndim == 1)
+    y_mat = y_mat.reshape(n_int, -1)
+    k_int = y_mat.shape[1]
+    lam_vec = numpy.asarray(lam_vec, dtype=numpy.float64).ravel()
+
+    if mode == 'auto':
+        mode = cg_cond.choose_mode(x_mat, k_int * len(lam_vec), max_iter_int, gram_func, mode_list=('unfused', 'gram'))
+    elif mode not in ('unfused', 'gram'):
+        raise ValueError('Unknown mode: ' + str(mode))
+    v_mat, sig_vec = sketch_svd(x_mat, sketch_type, sketch_size, osnap_k)
+    if mode == 'gram' and gram_func is None:
+        # X^T * X = V * Sig * G0 * Sig * V^T with G0 = (X * T0)^T * (X * T0) and T0 = V * Sig^{-1};
+        # X * T0 is well conditioned, so G0 keeps the accuracy that forming X^T * X would lose
+        g_mat = cg_cond.NormalOperator(x_mat, v_mat / sig_vec.reshape(1, d_int), 'gram').g_mat
+        sig_mat = sig_vec.reshape(d_int, 1)
+        gram_func = lambda p_mat: numpy.dot(v_mat, sig_mat * numpy.dot(g_mat, sig_mat * numpy.dot(v_mat.T, p_mat)))
+    xty_mat = numpy.asarray(linop.as_operator(x_mat).T.dot(y_mat))
+
+    cond_list = [ridge_cond(v_mat, sig_vec, lam_real, n_int) for lam_real in lam_vec]
+    w_list = [None] * len(lam_vec)
+    if mode == 'gram':
+        w_mat = None
+        is_converged_bool = True
+        for j in numpy.argsort(-lam_vec, kind='stable'):
+            w_mat, is_converged_j = ridge_cg(x_mat, None, lam_vec[j], cond_list[j], w_mat, tol, max_iter_int, gram_func, xty_mat)
+            is_converged_bool = is_converged_bool and is_converged_j
+            w_list[j] = w_mat
+    else:
+        # the columns are the pairs (lam, response), so each iteration reads X twice for the whole path
+        w_all_mat, is_converged_bool = ridge_cg(x_mat, None, numpy.repeat(lam_vec, k_int),
+                                                [t_mat for t_mat in cond_list for i in range(k_int)], None,
+                                                tol, max_iter_int, gram_func, numpy.tile(xty_mat, (1, len(lam_vec))))
+        w_list = [w_all_mat[:, j*k_int:(j+1)*k_int] for j in range(len(lam_vec))]
+    if is_vec_bool:
+        w_list = [w_mat.ravel() for w_mat in w_list]
+    obj_vec = objective(x_mat, y_mat, w_list, lam_vec)
+    return w_list, obj_vec, is_converged_bool
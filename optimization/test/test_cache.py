@@ -0,0 +1,74 @@
+import numpy
+import scipy.sparse
+import shutil
+import tempfile
+import unittest
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from optimization import cache, cg_cond
+
+
+class TestCache(unittest.TestCase):
+    def test_fingerprint(self):
+        key = cache.fingerprint(x_mat)
+        self.assertEqual(key, cache.fingerprint(x_mat.copy()))
+        self.assertNotEqual(key, cache.fingerprint(x_mat[:-1, :]))
+        self.assertNotEqual(key, cache.fingerprint(x_mat.astype(numpy.float32)))
+        x2_mat = x_mat.copy()
+        x2_mat[0, 0] += 1
+        self.assertNotEqual(key, cache.fingerprint(x2_mat))
+        self.assertEqual(cache.fingerprint(scipy.sparse.csr_matrix(x_mat)), cache.fingerprint(scipy.sparse.csc_matrix(x_mat)))
+        # the rows of a CSC matrix are found by binary searches, without converting it to CSR
+        xs_mat = scipy.sparse.random(2000, 30, density=0.1, format='csr', random_state=0)
+        idx_vec = numpy.unique(numpy.linspace(0, 1999, 64).astype(numpy.int64))
+        self.assertTrue(numpy.array_equal(cache.csc_rows(xs_mat.tocsc(), idx_vec), xs_mat[idx_vec, :].toarray()))
+        self.assertEqual(cache.fingerprint(xs_mat), cache.fingerprint(xs_mat.tocsc()))
+        self.assertEqual(cache.fingerprint(xs_mat), cache.fingerprint(xs_mat.tocoo()))
+
+    def test_memory(self):
+        precond_cache = cache.PreconditionerCache(max_size=2)
+        t1_mat = cg_cond.precondition(x_mat, 'count', 3, cache=precond_cache)
+        t2_mat = cg_cond.precondition(x_mat, 'count', 3, cache=precond_cache)
+        self.assertTrue(t1_mat is t2_mat)
+        # the shared preconditioner cannot be modified in place by a caller
+        with self.assertRaises(ValueError):
+            t2_mat *= 2
+        self.assertEqual((precond_cache.num_hits, precond_cache.num_misses), (1, 1))
+        # other parameters give another preconditioner
+        t3_mat = cg_cond.precondition(x_mat, 'count', 4, cache=precond_cache)
+        self.assertFalse(numpy.allclose(t1_mat, t3_mat))
+        # the least recently used preconditioner is evicted
+        cg_cond.precondition(x_mat, 'srft', 3, cache=precond_cache)
+        self.assertEqual(len(precond_cache.mem_dict), 2)
+        cg_cond.precondition(x_mat, 'count', 3, cache=precond_cache)
+        self.assertEqual(precond_cache.num_misses, 4)
+        
+    def test_qr(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            t1_op = cg_cond.precondition(x_mat, 'count', 3, cache=cache.PreconditionerCache(cache_dir=cache_dir), method='qr')
+            t2_op = cg_cond.precondition(x_mat, 'count', 3, cache=cache.PreconditionerCache(cache_dir=cache_dir), method='qr')
+            p_mat = numpy.random.randn(x_mat.shape[1], 2)
+            self.assertTrue(numpy.array_equal(t1_op.dot(p_mat), t2_op.dot(p_mat)))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_disk(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            t1_mat = cg_cond.precondition(x_mat, 'count', 3, cache=cache.PreconditionerCache(cache_dir=cache_dir))
+            precond_cache = cache.PreconditionerCache(cache_dir=cache_dir)
+            t2_mat = cg_cond.precondition(x_mat, 'count', 3, cache=precond_cache)
+            self.assertTrue(numpy.array_equal(t1_mat, t2_mat))
+            self.assertEqual((precond_cache.num_hits, precond_cache.num_misses), (1, 0))
+        finally:
+            shutil.rmtree(cache_dir)
+
+if __name__ == '__main__':
+    rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
+    rawdata_mat = rawdata_mat[0:20000, :]
+    x_mat = numpy.array(rawdata_mat[:, 1:])
+    unittest.main()
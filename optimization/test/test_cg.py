@@ -40,6 +40,21 @@ class TestCG(unittest.TestCase):
         w_solved_vec, is_converged_bool = cg.cg(x_mat, y_vec, tol=1e-10, max_iter_int=2)
         self.assertTrue(not is_converged_bool)
         
+    def test_multi(self):
+        y_mat = numpy.concatenate((y_vec, 2 * y_vec, numpy.random.RandomState(0).randn(n_int, 1), numpy.zeros((n_int, 1))), axis=1)
+        w_solved_mat, is_converged_bool = cg.cg(x_mat, y_mat, tol=1e-3)
+        self.assertEqual(w_solved_mat.shape, (d_int, 4))
+        self.assertTrue(is_converged_bool)
+        # a zero response is solved by w = 0 (and does not give 0/0 in the recurrences)
+        self.assertTrue(numpy.all(w_solved_mat[:, 3] == 0))
+        # each response is solved exactly as if it were solved alone
+        for j in range(3):
+            w_solved_vec = cg.cg(x_mat, y_mat[:, j], tol=1e-3)[0]
+            dist_vec = numpy.dot(x_mat, w_solved_mat[:, j:j+1] - w_solved_vec)
+            self.assertTrue(numpy.sum(dist_vec ** 2) < 1e-8 * numpy.sum(numpy.dot(x_mat, w_solved_vec) ** 2))
+        # a vector response gives a d-by-1 solution as before
+        self.assertEqual(cg.cg(x_mat, y_vec.ravel(), tol=1e-3)[0].shape, (d_int, 1))
+        
 if __name__ == '__main__':
     rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
     rawdata_mat = rawdata_mat[0:50000, :]
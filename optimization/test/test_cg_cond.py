@@ -1,4 +1,5 @@
 import numpy
+import scipy.linalg
 import unittest
 import sys
 
@@ -72,6 +73,80 @@ class TestCgCondCountSketch(unittest.TestCase):
         w_solved_vec, is_converged_bool = cg_cond.cg_cond(x_mat, y_vec, t3_mat, tol=1e-10, max_iter_int=2)
         self.assertTrue(not is_converged_bool)
         
+    def test_multi(self):
+        y_mat = numpy.concatenate((y_vec, 2 * y_vec, numpy.random.RandomState(0).randn(n_int, 1), numpy.zeros((n_int, 1))), axis=1)
+        w_solved_mat, is_converged_bool = cg_cond.cg_cond(x_mat, y_mat, t3_mat, tol=1e-10)
+        self.assertEqual(w_solved_mat.shape, (d_int, 4))
+        self.assertTrue(is_converged_bool)
+        # a zero response is solved by w = 0 (and does not give 0/0 in the recurrences)
+        self.assertTrue(numpy.all(w_solved_mat[:, 3] == 0))
+        # each response is solved exactly as if it were solved alone
+        for j in range(3):
+            w_solved_vec = cg_cond.cg_cond(x_mat, y_mat[:, j], t3_mat, tol=1e-10)[0]
+            dist_vec = numpy.dot(x_mat, w_solved_mat[:, j:j+1] - w_solved_vec)
+            self.assertTrue(numpy.sum(dist_vec ** 2) < 1e-8 * numpy.sum(numpy.dot(x_mat, w_solved_vec) ** 2))
+        # a vector response gives a d-by-1 solution as before
+        self.assertEqual(cg_cond.cg_cond(x_mat, y_vec.ravel(), t3_mat, tol=1e-10)[0].shape, (d_int, 1))
+        
+    def test_multi_mode(self):
+        # a zero response in every mode
+        y_mat = numpy.concatenate((y_vec, numpy.zeros((n_int, 1))), axis=1)
+        for mode in ['unfused', 'xt', 'gram']:
+            w_solved_mat, is_converged_bool = cg_cond.cg_cond(x_mat, y_mat, t3_mat, tol=1e-10, mode=mode)
+            self.assertTrue(is_converged_bool)
+            self.assertTrue(numpy.all(numpy.isfinite(w_solved_mat)))
+            self.assertTrue(numpy.all(w_solved_mat[:, 1] == 0))
+        
+    def test_mode(self):
+        p_mat = numpy.random.randn(d_int, 2)
+        xp_mat = numpy.dot(t3_mat.T, numpy.dot(x_mat.T, numpy.dot(x_mat, numpy.dot(t3_mat, p_mat))))
+        for mode in ['unfused', 'xt', 'gram']:
+            normal_op = cg_cond.NormalOperator(x_mat, t3_mat, mode)
+            self.assertTrue(numpy.allclose(normal_op.dot(p_mat), xp_mat))
+            w_solved_vec, is_converged_bool = cg_cond.cg_cond(x_mat, y_vec, t3_mat, mode=mode)
+            dist_vec = numpy.dot(x_mat, w_opt_vec - w_solved_vec)
+            err = numpy.sum(dist_vec ** 2)
+            print('Squared norm error of CG (mode=' + mode + '):' + str(err))
+            self.assertTrue(err < 1e-10)
+        # X^T X is formed only when it is amortized over the iterations
+        self.assertEqual(cg_cond.choose_mode(x_mat), 'gram')
+        self.assertEqual(cg_cond.choose_mode(x_mat, max_iter_int=1), 'unfused')
+        # X * T is stored only if it fits in the memory budget
+        self.assertEqual(cg_cond.choose_mode(numpy.empty((100, 100)), max_iter_int=3), 'xt')
+        self.assertNotEqual(cg_cond.choose_mode(numpy.empty((100, 100)), max_iter_int=3, memory_budget=8*100*100-1), 'xt')
+        self.assertNotEqual(cg_cond.choose_mode(numpy.empty((100, 100)), max_iter_int=3, mode_list=('unfused', 'gram')), 'xt')
+        # G is the same when it is accumulated over small blocks of rows
+        normal_op = cg_cond.NormalOperator(x_mat, t3_mat, 'gram', memory_budget=8*d_int*997)
+        self.assertTrue(numpy.allclose(normal_op.dot(p_mat), xp_mat))
+        
+    def test_qr(self):
+        t_op = cg_cond.precondition(x_mat, sketch_type='count', sketch_size=3.11, method='qr')
+        xt_mat = numpy.dot(x_mat, t_op.dot(numpy.eye(d_int)))
+        print('Condition number of X * R^{-1}: ' + str(numpy.linalg.cond(xt_mat)))
+        self.assertTrue(numpy.linalg.cond(xt_mat) < 10)
+        for mode in ['unfused', 'gram']:
+            w_solved_vec, is_converged_bool = cg_cond.cg_cond(x_mat, y_vec, t_op, mode=mode)
+            dist_vec = numpy.dot(x_mat, w_opt_vec - w_solved_vec)
+            err = numpy.sum(dist_vec ** 2)
+            print('Squared norm error of CG (QR preconditioner, mode=' + mode + '):' + str(err))
+            self.assertTrue(err < 1e-10)
+        
+    def test_adaptive(self):
+        r_mat, s_int, cond_real = cg_cond.adaptive_factor(x_mat, 'count', max_sketch_size=2, num_lanczos=10)
+        true_cond = numpy.linalg.cond(scipy.linalg.solve_triangular(r_mat, x_mat.T, trans='T').T)
+        print('Condition number of X * R^{-1}: ' + str(true_cond) + ', estimate: ' + str(cond_real))
+        self.assertEqual(s_int, 2 * d_int)
+        self.assertTrue(0.75 * true_cond < cond_real <= true_cond * (1 + 1e-8))
+        
+        r_mat, s_int, cond_real = cg_cond.adaptive_factor(x_mat, 'count', target_cond=2)
+        self.assertTrue(s_int > 2 * d_int and cond_real <= 2)
+        
+        t_op = cg_cond.precondition(x_mat, sketch_type='count', sketch_size='auto', method='qr')
+        w_solved_vec, is_converged_bool = cg_cond.cg_cond(x_mat, y_vec, t_op, tol=1e-10)
+        dist_vec = numpy.dot(x_mat, w_opt_vec - w_solved_vec.reshape(d_int, 1))
+        self.assertTrue(is_converged_bool)
+        self.assertTrue(numpy.sum(dist_vec ** 2) / numpy.sum(numpy.dot(x_mat, w_opt_vec) ** 2) < 1e-10)
+        
 if __name__ == '__main__':
     rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
     rawdata_mat = rawdata_mat[0:50000, :]
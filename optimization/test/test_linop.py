@@ -0,0 +1,80 @@
+import numpy
+import scipy.sparse
+import scipy.sparse.linalg
+import unittest
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from optimization import linop, cg, cg_cond, lsqr
+from sketch import operators
+
+
+class MatvecOnly(object):
+    '''
+    An implicit X that only exposes shape, matvec and rmatvec
+    '''
+    def __init__(self, x_mat):
+        self.x_mat = x_mat
+        self.shape = x_mat.shape
+        self.dtype = numpy.dtype(numpy.float64)
+
+    def matvec(self, p_vec):
+        return numpy.dot(self.x_mat, p_vec)
+
+    def rmatvec(self, r_vec):
+        return numpy.dot(self.x_mat.T, r_vec)
+
+
+class TestLinop(unittest.TestCase):
+    def test_center_scale(self):
+        mean_vec = numpy.mean(x_mat, axis=0)
+        scale_vec = 1 / numpy.std(x_mat, axis=0)
+        z_mat = (x_mat - mean_vec) * scale_vec
+        z_op = linop.center_scale(scipy.sparse.csr_matrix(x_mat), mean_vec, scale_vec)
+        p_mat = numpy.random.randn(d_int, 3)
+        r_mat = numpy.random.randn(n_int, 3)
+        self.assertTrue(numpy.allclose(z_op.dot(p_mat), numpy.dot(z_mat, p_mat)))
+        self.assertTrue(numpy.allclose(z_op.T.dot(r_mat), numpy.dot(z_mat.T, r_mat)))
+        self.assertTrue(numpy.allclose(z_op.dot(p_mat[:, 0]), numpy.dot(z_mat, p_mat[:, 0])))
+
+    def test_sketch_columns(self):
+        sketch_op = operators.CountSketchOperator(n_int, 3 * d_int, seed=0)
+        c_mat = linop.sketch_columns(linop.as_operator(MatvecOnly(x_mat)), sketch_op, block_int=7)
+        self.assertTrue(numpy.allclose(c_mat, sketch_op.apply_left(x_mat)))
+
+    def test_solvers(self):
+        x_op = MatvecOnly(x_mat)
+        t_mat = cg_cond.precondition(x_op, sketch_type='count', sketch_size=4)
+        for w_solved_vec in [cg_cond.cg_cond(x_op, y_vec, t_mat, tol=1e-10)[0],
+                             cg_cond.cg_cond(x_mat, y_vec, t_mat, tol=1e-10, gram_func=lambda p_mat: numpy.dot(g_mat, p_mat))[0],
+                             lsqr.lsqr(x_op, y_vec, cond_mat=t_mat, verbose=False)[0],
+                             cg.cg(scipy.sparse.linalg.aslinearoperator(x_mat), y_vec, tol=1e-3)[0]]:
+            dist_vec = numpy.dot(x_mat, w_opt_vec - w_solved_vec.reshape(d_int, 1))
+            err = numpy.sum(dist_vec ** 2) / numpy.sum(numpy.dot(x_mat, w_opt_vec) ** 2)
+            print('Relative squared norm error: ' + str(err))
+            self.assertTrue(err < 1e-8)
+
+    def test_centered(self):
+        # least squares on the standardized features, without forming them
+        mean_vec = numpy.mean(x_mat, axis=0)
+        scale_vec = 1 / numpy.std(x_mat, axis=0)
+        z_mat = (x_mat - mean_vec) * scale_vec
+        z_op = linop.center_scale(x_mat, mean_vec, scale_vec)
+        t_mat = cg_cond.precondition(z_op, sketch_type='srft', sketch_size=3)
+        w_solved_vec, is_converged_bool = cg_cond.cg_cond(z_op, y_vec, t_mat, tol=1e-10)
+        w_opt_z_vec = numpy.linalg.lstsq(z_mat, y_vec, rcond=None)[0]
+        self.assertTrue(is_converged_bool)
+        self.assertTrue(numpy.allclose(w_solved_vec, w_opt_z_vec))
+
+if __name__ == '__main__':
+    rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
+    rawdata_mat = rawdata_mat[0:20000, :]
+    x_mat = numpy.array(rawdata_mat[:, 1:])
+    n_int, d_int = x_mat.shape
+    y_vec = rawdata_mat[:, 0].reshape((n_int, 1))
+
+    w_opt_vec = numpy.dot(numpy.linalg.pinv(x_mat), y_vec)
+    g_mat = numpy.dot(x_mat.T, x_mat)
+    unittest.main()
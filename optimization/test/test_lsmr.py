@@ -0,0 +1,18 @@
+import unittest
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from optimization import lsmr
+import test_lsqr
+
+
+class TestLSMR(test_lsqr.SolverTest, unittest.TestCase):
+    solver_func = lsmr.lsmr
+    name = 'LSMR'
+        
+        
+if __name__ == '__main__':
+    test_lsqr.load_data()
+    unittest.main()
@@ -0,0 +1,84 @@
+import numpy
+import unittest
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from optimization import lsqr, cg_cond
+
+
+class SolverTest(object):
+    '''
+    Tests shared by lsqr.lsqr and lsmr.lsmr (see test_lsmr.py);
+    a subclass sets solver_func and name, and load_data sets the problem.
+    '''
+    def solve(self, *args, **kwargs):
+        return type(self).solver_func(*args, **kwargs)
+        
+    def test_converge1(self):
+        w_solved_vec, is_converged_bool = self.solve(x_mat, y_vec, tol=1e-6)
+        dist_vec = numpy.dot(x_mat, w_opt_vec - w_solved_vec.reshape(len(w_solved_vec), 1))
+        err = numpy.sum(dist_vec ** 2) / numpy.sum(numpy.dot(x_mat, w_opt_vec) ** 2)
+        print('Relative squared norm error of ' + self.name + ' (tolerance=1e-6):' + str(err))
+        self.assertTrue(err < 1e-3)
+        self.assertTrue(is_converged_bool)
+        
+    def test_converge2(self):
+        w_solved_vec, is_converged_bool = self.solve(x_mat, y_vec, tol=1e-10, max_iter_int=123)
+        dist_vec = numpy.dot(x_mat, w_opt_vec - w_solved_vec.reshape(len(w_solved_vec), 1))
+        err = numpy.sum(dist_vec ** 2)
+        print('Squared norm error of ' + self.name + ' (tolerance=1e-3):' + str(err))
+        self.assertTrue(err > 1e-10)
+        self.assertTrue(not is_converged_bool)
+        
+    def test_converge3(self):
+        w_solved_vec, is_converged_bool = self.solve(x_mat, y_vec)
+        dist_vec = numpy.dot(x_mat, w_opt_vec - w_solved_vec.reshape(len(w_solved_vec), 1))
+        err = numpy.sum(dist_vec ** 2) / numpy.sum(numpy.dot(x_mat, w_opt_vec) ** 2)
+        print('Relative squared norm error of ' + self.name + ' (tolerance=1e-12):' + str(err))
+        self.assertTrue(err < 1e-16)
+        self.assertTrue(is_converged_bool)
+        
+    def test_margin(self):
+        w_solved_vec, is_converged_bool = self.solve(x_mat, y_vec, tol=1e-10, max_iter_int=0)
+        self.assertTrue(not is_converged_bool)
+        w_solved_vec, is_converged_bool = self.solve(x_mat, y_vec, tol=1e-10, max_iter_int=1)
+        self.assertTrue(not is_converged_bool)
+        w_solved_vec, is_converged_bool = self.solve(x_mat, y_vec, tol=1e-10, max_iter_int=2)
+        self.assertTrue(not is_converged_bool)
+    def test_precondition(self):
+        t_mat = cg_cond.precondition(x_mat, sketch_type='count', sketch_size=5)
+        w1_vec, is_converged_bool = self.solve(x_mat, y_vec, tol=1e-14, max_iter_int=100)
+        w2_vec, is_converged_bool = self.solve(x_mat, y_vec, tol=1e-14, max_iter_int=100, cond_mat=t_mat)
+        self.assertTrue(is_converged_bool)
+        err1 = numpy.sum(numpy.dot(x_mat, w_opt_vec - w1_vec) ** 2)
+        err2 = numpy.sum(numpy.dot(x_mat, w_opt_vec - w2_vec) ** 2)
+        print('Squared norm error after 100 iterations (without/with preconditioning): ' + str(err1) + ', ' + str(err2))
+        self.assertTrue(err2 < err1)
+        self.assertTrue(err2 < 1e-10)
+        
+    def test_initial(self):
+        w_vec, is_converged_bool = self.solve(x_mat, y_vec, max_iter_int=0, w0_vec=w_opt_vec)
+        self.assertTrue(numpy.allclose(w_vec, w_opt_vec))
+        w_vec, is_converged_bool = self.solve(x_mat, y_vec, tol=1e-14, w0_vec=w_opt_vec)
+        self.assertTrue(numpy.sum(numpy.dot(x_mat, w_opt_vec - w_vec) ** 2) < 1e-10)
+        
+class TestLSQR(SolverTest, unittest.TestCase):
+    solver_func = lsqr.lsqr
+    name = 'LSQR'
+        
+        
+def load_data():
+    global x_mat, y_vec, w_opt_vec
+    rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
+    rawdata_mat = rawdata_mat[0:50000, :]
+    x_mat = rawdata_mat[:, 1:]
+    n_int, d_int = x_mat.shape
+    y_vec = rawdata_mat[:, 0].reshape((n_int, 1))
+
+    w_opt_vec = numpy.dot(numpy.linalg.pinv(x_mat), y_vec)
+    
+if __name__ == '__main__':
+    load_data()
+    unittest.main()
\ No newline at end of file
@@ -35,6 +35,26 @@ class TestLSR(unittest.TestCase):
         
         self.assertTrue(dist3 < dist1)
         
+    def test_srht(self):
+        print('######## SRHT ########')
+        
+        sketch_size = 3
+        obj_val1, dist1 = approx_lsr(sketch_size, 'srht')
+        print('Objective function value (s=' + str(sketch_size) + 'd): ' + str(obj_val1))
+        print('Distance to optimal (s=' + str(sketch_size) + 'd): ' + str(dist1))
+        
+        sketch_size = 5
+        obj_val2, dist2 = approx_lsr(sketch_size, 'srht')
+        print('Objective function value (s=' + str(sketch_size) + 'd): ' + str(obj_val2))
+        print('Distance to optimal (s=' + str(sketch_size) + 'd): ' + str(dist2))
+        
+        sketch_size = 10
+        obj_val3, dist3 = approx_lsr(sketch_size, 'srht')
+        print('Objective function value (s=' + str(sketch_size) + 'd): ' + str(obj_val3))
+        print('Distance to optimal (s=' + str(sketch_size) + 'd): ' + str(dist3))
+        
+        self.assertTrue(dist3 < dist1)
+        
     def test_count(self):
         print('######## Count Sketch ########')
         
@@ -55,6 +75,47 @@ class TestLSR(unittest.TestCase):
         
         self.assertTrue(dist3 < dist1)
         
+    def test_osnap(self):
+        print('######## OSNAP ########')
+        
+        sketch_size = 3
+        obj_val1, dist1 = approx_lsr(sketch_size, 'osnap')
+        print('Objective function value (s=' + str(sketch_size) + 'd): ' + str(obj_val1))
+        print('Distance to optimal (s=' + str(sketch_size) + 'd): ' + str(dist1))
+        
+        sketch_size = 5
+        obj_val2, dist2 = approx_lsr(sketch_size, 'osnap')
+        print('Objective function value (s=' + str(sketch_size) + 'd): ' + str(obj_val2))
+        print('Distance to optimal (s=' + str(sketch_size) + 'd): ' + str(dist2))
+        
+        sketch_size = 10
+        obj_val3, dist3 = approx_lsr(sketch_size, 'osnap')
+        print('Objective function value (s=' + str(sketch_size) + 'd): ' + str(obj_val3))
+        print('Distance to optimal (s=' + str(sketch_size) + 'd): ' + str(dist3))
+        
+        self.assertTrue(dist3 < dist1)
+        
+    def test_gaussian(self):
+        print('######## Gaussian Projection ########')
+        
+        sketch_size = 3
+        obj_val1, dist1 = approx_lsr(sketch_size, 'gaussian')
+        print('Objective function value (s=' + str(sketch_size) + 'd): ' + str(obj_val1))
+        print('Distance to optimal (s=' + str(sketch_size) + 'd): ' + str(dist1))
+        
+        sketch_size = 5
+        obj_val2, dist2 = approx_lsr(sketch_size, 'gaussian')
+        print('Objective function value (s=' + str(sketch_size) + 'd): ' + str(obj_val2))
+        print('Distance to optimal (s=' + str(sketch_size) + 'd): ' + str(dist2))
+        
+        sketch_size = 10
+        obj_val3, dist3 = approx_lsr(sketch_size, 'gaussian')
+        print('Objective function value (s=' + str(sketch_size) + 'd): ' + str(obj_val3))
+        print('Distance to optimal (s=' + str(sketch_size) + 'd): ' + str(dist3))
+        
+        self.assertTrue(dist3 < dist1)
+        self.assertRaises(ValueError, lsr.sketched_lsr, x_mat, y_vec, 5, 'gausian')
+        
     def test_leverage(self):
         print('######## Leverage Score Sampling ########')
         
@@ -94,6 +155,49 @@ class TestLSR(unittest.TestCase):
         print('Distance to optimal (s=' + str(sketch_size) + 'd): ' + str(dist3))
         
         self.assertTrue(dist3 < dist1)
+    def test_solve(self):
+        print('######## Blendenpik ########')
+        for sketch_type in ['count', 'srft']:
+            w_vec, obj_val = lsr.solve(x_mat, y_vec, sketch_type=sketch_type)
+            dist = numpy.sum((w_vec - w_opt_vec) ** 2) / numpy.sum(w_opt_vec ** 2)
+            print('Relative squared distance to optimal (' + sketch_type + '): ' + str(dist))
+            self.assertEqual(w_vec.shape, w_opt_vec.shape)
+            self.assertTrue(dist < 1e-16)
+        
+        # vector response and several responses
+        w_vec = lsr.solve(x_mat, y_vec.ravel())[0]
+        self.assertEqual(w_vec.shape, (d_int,))
+        w_mat = lsr.solve(x_mat, numpy.concatenate((y_vec, 2 * y_vec), axis=1))[0]
+        self.assertTrue(numpy.allclose(w_mat[:, 1], 2 * w_opt_vec.ravel()))
+        
+    def test_ihs(self):
+        print('######## Iterative Hessian Sketch ########')
+        for fresh_sketch in [False, True]:
+            dist_list = []
+            for num_iter in [2, 5, 20]:
+                w_vec, obj_val = lsr.ihs_lsr(x_mat, y_vec, num_iter=num_iter, fresh_sketch=fresh_sketch)
+                dist_list.append(numpy.sum((w_vec - w_opt_vec) ** 2) / numpy.sum(w_opt_vec ** 2))
+            print('Relative squared distance to optimal (fresh_sketch=' + str(fresh_sketch) + '): ' + str(dist_list))
+            self.assertEqual(w_vec.shape, w_opt_vec.shape)
+            self.assertTrue(dist_list[0] > dist_list[1] > dist_list[2])
+            self.assertTrue(dist_list[2] < 1e-12)
+        
+        w_vec, obj_val = lsr.solve(x_mat, y_vec, method='ihs')
+        self.assertTrue(numpy.sum((w_vec - w_opt_vec) ** 2) / numpy.sum(w_opt_vec ** 2) < 1e-16)
+        self.assertTrue(abs(obj_val - opt_obj_val) < 1e-10 * opt_obj_val)
+        
+    def test_adaptive(self):
+        print('######## Adaptive Sketch Size ########')
+        for sketch_type in ['count', 'osnap']:
+            w_vec, obj_val, s_int = lsr.adaptive_lsr(x_mat, y_vec, sketch_type, obj_tol=0.05)
+            gap = (obj_val - opt_obj_val) / obj_val
+            print('Relative objective gap (' + sketch_type + ', s=' + str(s_int / d_int) + 'd): ' + str(gap))
+            self.assertEqual(w_vec.shape, w_opt_vec.shape)
+            self.assertTrue(gap < 0.1)
+        
+        w_vec, obj_val = lsr.sketched_lsr(x_mat, y_vec, sketch_size='auto')
+        self.assertTrue(obj_val < 1.1 * opt_obj_val)
+        self.assertRaises(ValueError, lsr.sketched_lsr, x_mat, y_vec, 'auto', 'leverage')
         
 if __name__ == '__main__':
     rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
@@ -0,0 +1,92 @@
+import numpy
+import scipy.sparse.linalg
+import unittest
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from optimization import ridge
+
+
+def ridge_error(w_list, w_ref_list):
+    # largest relative error || X (w - w_opt) || / || X w_opt || on the path
+    err_list = []
+    for w_vec, w_opt_vec in zip(w_list, w_ref_list):
+        dist_vec = numpy.dot(x_mat, w_vec.reshape(w_opt_vec.shape) - w_opt_vec)
+        err_list.append(numpy.linalg.norm(dist_vec) / numpy.linalg.norm(numpy.dot(x_mat, w_opt_vec)))
+    return max(err_list)
+
+
+class TestRidge(unittest.TestCase):
+    def test_sketched(self):
+        w_list, obj_vec = ridge.sketched_ridge(x_mat, y_vec, lam_vec, sketch_size=10)
+        print('Objective function values (sketched): ' + str(obj_vec / opt_obj_vec))
+        self.assertEqual(len(w_list), len(lam_vec))
+        self.assertTrue(numpy.all(obj_vec >= opt_obj_vec * (1 - 1e-10)))
+        self.assertTrue(numpy.all(obj_vec < 1.5 * opt_obj_vec))
+        self.assertTrue(numpy.allclose(obj_vec, ridge.objective(x_mat, y_vec, w_list, lam_vec)))
+
+    def test_cg(self):
+        v_mat, sig_vec = ridge.sketch_svd(x_mat, 'srft', 3)
+        t_mat = ridge.ridge_cond(v_mat, sig_vec, lam_vec[3], n_int)
+        w_vec, is_converged_bool = ridge.ridge_cg(x_mat, y_vec, lam_vec[3], t_mat, max_iter_int=100)
+        self.assertTrue(is_converged_bool)
+        self.assertTrue(numpy.allclose(w_vec, w_opt_list[3]))
+        # a warm start at the solution needs no iteration
+        w_vec, is_converged_bool = ridge.ridge_cg(x_mat, y_vec, lam_vec[3], t_mat, w0_vec=w_opt_list[3], tol=1e-6, max_iter_int=0)
+        self.assertTrue(is_converged_bool)
+        # a warm start at a nearby lam takes fewer iterations than a cold start
+        w0_vec = w_opt_list[2]
+        err_cold = ridge_error([ridge.ridge_cg(x_mat, y_vec, lam_vec[3], t_mat, max_iter_int=5)[0]], w_opt_list[3:4])
+        err_warm = ridge_error([ridge.ridge_cg(x_mat, y_vec, lam_vec[3], t_mat, w0_vec=w0_vec, max_iter_int=5)[0]], w_opt_list[3:4])
+        self.assertTrue(err_warm < err_cold)
+
+    def test_path(self):
+        for mode in ['unfused', 'gram', 'auto']:
+            w_list, obj_vec, is_converged_bool = ridge.ridge_path(x_mat, y_vec, lam_vec, mode=mode)
+            err = ridge_error(w_list, w_opt_list)
+            print('Relative error (' + mode + '): ' + str(err))
+            self.assertTrue(is_converged_bool)
+            self.assertTrue(err < 1e-8)
+            self.assertTrue(numpy.allclose(obj_vec, opt_obj_vec))
+
+        # vector response and several responses
+        w_list = ridge.ridge_path(x_mat, y_vec.ravel(), lam_vec)[0]
+        self.assertEqual(w_list[0].shape, (d_int,))
+        w_list = ridge.ridge_path(x_mat, numpy.concatenate((y_vec, 2 * y_vec), axis=1), lam_vec, mode='unfused')[0]
+        self.assertTrue(numpy.allclose(w_list[-1][:, 1], 2 * w_opt_list[-1].ravel()))
+        for mode in ['xt', 'gramm']:
+            self.assertRaises(ValueError, ridge.ridge_path, x_mat, y_vec, lam_vec, mode=mode)
+
+    def test_operator(self):
+        w_list = ridge.ridge_path(scipy.sparse.linalg.aslinearoperator(x_mat), y_vec, lam_vec[::3])[0]
+        self.assertTrue(ridge_error(w_list, w_opt_list[::3]) < 1e-8)
+
+    def test_ill_conditioned(self):
+        # lam = 0 and cond(X) = 1e7: forming X^T X would lose about 7 digits in the mode 'gram'
+        rng = numpy.random.RandomState(0)
+        u_mat = numpy.linalg.qr(rng.randn(20000, 50))[0]
+        v_mat = numpy.linalg.qr(rng.randn(50, 50))[0]
+        x_ill_mat = numpy.dot(u_mat * numpy.logspace(0, -7, 50).reshape(1, 50), v_mat.T)
+        y_ill_vec = numpy.dot(x_ill_mat, rng.randn(50)) + 0.1 * rng.randn(20000)
+        w_ill_vec = numpy.linalg.lstsq(x_ill_mat, y_ill_vec, rcond=None)[0]
+        for mode in ['unfused', 'gram']:
+            w_list, obj_vec, is_converged_bool = ridge.ridge_path(x_ill_mat, y_ill_vec, [0.0], mode=mode)
+            err = numpy.linalg.norm(numpy.dot(x_ill_mat, w_list[0] - w_ill_vec)) / numpy.linalg.norm(numpy.dot(x_ill_mat, w_ill_vec))
+            print('Relative error (cond=1e7, ' + mode + '): ' + str(err))
+            self.assertTrue(is_converged_bool)
+            self.assertTrue(err < 1e-7)
+
+if __name__ == '__main__':
+    rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
+    rawdata_mat = rawdata_mat[0:20000, :]
+    x_mat = numpy.array(rawdata_mat[:, 1:])
+    n_int, d_int = x_mat.shape
+    y_vec = rawdata_mat[:, 0].reshape((n_int, 1))
+
+    lam_vec = numpy.logspace(-6, 1, 8) * numpy.mean(x_mat ** 2)
+    g_mat = numpy.dot(x_mat.T, x_mat)
+    w_opt_list = [numpy.linalg.solve(g_mat + n_int * lam_real * numpy.eye(d_int), numpy.dot(x_mat.T, y_vec)) for lam_real in lam_vec]
+    opt_obj_vec = ridge.objective(x_mat, y_vec, w_opt_list, lam_vec)
+    unittest.main()
@@ -1 +1 @@
-__all__ = ['countsketch', 'gaussian', 'leverage', 'srft']
\ No newline at end of file
+__all__ = ['countsketch', 'gaussian', 'leverage', 'srft', 'srht', 'osnap', 'operators', 'parallel', 'stream', 'merge']
\ No newline at end of file
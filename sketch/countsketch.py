@@ -1,12 +1,68 @@
 import numpy
+import scipy.sparse
 
-def countsketch(a_mat, s_int):
+import sketch.parallel as parallel
+
+
+def countsketch_mat(hash_vec, sign_vec, s_int):
     '''
-    Count Sketch for Dense Matrix
-    
+    Sparse Count Sketch Matrix
+
     Input
-        a_mat: m-by-n dense matrix A;
+        hash_vec: n-dim vector containing the bucket (in {0, ..., s-1}) of each row of S;
+        sign_vec: n-dim vector containing the sign (+1 or -1) of each row of S;
         s_int: sketch size.
+    Output
+        s_mat: n-by-s scipy.sparse CSR matrix S with one nonzero in each row.
+    '''
+    n_int = len(hash_vec)
+    s_mat = scipy.sparse.csr_matrix((sign_vec.astype(numpy.float64), hash_vec, numpy.arange(n_int+1)), shape=(n_int, s_int))
+    return s_mat
+
+
+def countsketch_apply(a_mat, s_mat, workers=None):
+    '''
+    Apply A Sparse Sketching Matrix to A Dense or Sparse Matrix
+
+    Input
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A;
+        s_mat: n-by-s scipy.sparse sketching matrix S;
+        workers: number of threads (optional, see parallel.num_workers);
+                the rows of A are split into blocks that are sketched in parallel.
+    Output
+        sketch_a_mat: m-by-s dense matrix A * S.
+
+    The product is computed as (S^T * A^T)^T in a single sparse-dense product,
+    so the cost is O(m * n) instead of n column updates in a Python loop.
+    If A is sparse, the product is sparse-sparse and costs O(nnz(A)).
+    '''
+    workers = parallel.num_workers(workers)
+    m_int = a_mat.shape[0]
+    if workers > 1 and m_int > 1:
+        if scipy.sparse.issparse(a_mat):
+            a_mat = scipy.sparse.csr_matrix(a_mat)
+        sketch_a_mat = numpy.zeros((m_int, s_mat.shape[1]))
+        blk_int = -(-m_int // workers)
+        def sketch_block(i):
+            sketch_a_mat[i:i+blk_int, :] = countsketch_apply(a_mat[i:i+blk_int, :], s_mat)
+        parallel.map_blocks(sketch_block, list(range(0, m_int, blk_int)), workers)
+        return sketch_a_mat
+    
+    sketch_a_mat = s_mat.T.dot(a_mat.T)
+    if scipy.sparse.issparse(sketch_a_mat):
+        sketch_a_mat = sketch_a_mat.toarray()
+    sketch_a_mat = numpy.asarray(sketch_a_mat).T
+    return sketch_a_mat
+
+
+def countsketch(a_mat, s_int, workers=None):
+    '''
+    Count Sketch for Dense or Sparse Matrix
+
+    Input
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A;
+        s_int: sketch size;
+        workers: number of threads (optional, see parallel.num_workers).
     Output
         sketch_a_mat: m-by-s matrix A * S.
         Here S is n-by-s sketching matrix.
@@ -14,47 +70,34 @@ def countsketch(a_mat, s_int):
     m_int, n_int = a_mat.shape
     hash_vec = numpy.random.choice(s_int, n_int, replace=True)
     sign_vec = numpy.random.choice(2, n_int, replace=True) * 2 - 1
-    sketch_a_mat = numpy.zeros((m_int, s_int))
-    for j in range(n_int):
-        h = hash_vec[j]
-        g = sign_vec[j]
-        sketch_a_mat[:, h] += g * a_mat[:, j]
+    s_mat = countsketch_mat(hash_vec, sign_vec, s_int)
+    sketch_a_mat = countsketch_apply(a_mat, s_mat, workers)
     return sketch_a_mat
-    
 
-def countsketch2(a_mat, b_mat, s_int):
+
+def countsketch2(a_mat, b_mat, s_int, workers=None):
     '''
-    Count Sketch for 2 Dense Matrices
-    
+    Count Sketch for 2 Dense or Sparse Matrices
+
     Input
-        a_mat: m-by-n dense matrix A;
-        b_mat: d-by-n dense matrix B;
-        s_int: sketch size.
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A;
+        b_mat: d-by-n dense matrix or scipy.sparse matrix B;
+        s_int: sketch size;
+        workers: number of threads (optional, see parallel.num_workers).
     Output
         sketch_a_mat: m-by-s matrix A * S;
         sketch_b_mat: d-by-s matrix B * S.
         Here S is n-by-s sketching matrix
     '''
     m_int, n_int = a_mat.shape
-    d_int = b_mat.shape[0]
     hash_vec = numpy.random.choice(s_int, n_int, replace=True)
     sign_vec = numpy.random.choice(2, n_int, replace=True) * 2 - 1
-    
-    sketch_a_mat = numpy.zeros((m_int, s_int))
-    for j in range(n_int):
-        h = hash_vec[j]
-        g = sign_vec[j]
-        sketch_a_mat[:, h] += g * a_mat[:, j]
-    
-    sketch_b_mat = numpy.zeros((d_int, s_int))
-    for j in range(n_int):
-        h = hash_vec[j]
-        g = sign_vec[j]
-        sketch_b_mat[:, h] += g * b_mat[:, j]
-        
+    s_mat = countsketch_mat(hash_vec, sign_vec, s_int)
+    sketch_a_mat = countsketch_apply(a_mat, s_mat, workers)
+    sketch_b_mat = countsketch_apply(b_mat, s_mat, workers)
     return sketch_a_mat, sketch_b_mat
-    
 
-    
-    
-    
+
+
+
+
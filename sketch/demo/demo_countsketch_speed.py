@@ -0,0 +1,88 @@
+# Demo of the Speed of Count Sketch
+#
+# We compare the vectorized count sketch in "sketch/countsketch.py"
+# (a single sparse-dense product A * S)
+# with the original implementation that adds one column of A per Python loop iteration.
+# Both draw the hash and sign vectors in the same way,
+# so the two sketches follow exactly the same distribution.
+
+import numpy
+import time
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from sketch import countsketch
+
+
+def countsketch_loop(a_mat, hash_vec, sign_vec, s_int):
+    '''
+    The Original Count Sketch (one column update per iteration)
+
+    Input
+        a_mat: m-by-n dense matrix A;
+        hash_vec: n-dim vector of buckets;
+        sign_vec: n-dim vector of signs;
+        s_int: sketch size.
+    Output
+        sketch_a_mat: m-by-s matrix A * S.
+    '''
+    m_int, n_int = a_mat.shape
+    sketch_a_mat = numpy.zeros((m_int, s_int))
+    for j in range(n_int):
+        h = hash_vec[j]
+        g = sign_vec[j]
+        sketch_a_mat[:, h] += g * a_mat[:, j]
+    return sketch_a_mat
+
+
+def demo_speed(m_int, n_vec, s_int, repeat_int):
+    '''
+    Input
+        m_int: number of rows of A;
+        n_vec: numbers of columns of A;
+        s_int: sketch size;
+        repeat_int: number of repeats.
+
+    Output
+        loop_time_vec: averaged time (seconds) of the loop implementation;
+        vec_time_vec: averaged time (seconds) of the vectorized implementation.
+    '''
+    num_n_int = len(n_vec)
+    loop_time_vec = numpy.zeros(num_n_int)
+    vec_time_vec = numpy.zeros(num_n_int)
+    for j in range(num_n_int):
+        n_int = n_vec[j]
+        a_mat = numpy.random.randn(m_int, n_int)
+        for i in range(repeat_int):
+            hash_vec = numpy.random.choice(s_int, n_int, replace=True)
+            sign_vec = numpy.random.choice(2, n_int, replace=True) * 2 - 1
+
+            t0 = time.perf_counter()
+            c1_mat = countsketch_loop(a_mat, hash_vec, sign_vec, s_int)
+            loop_time_vec[j] += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            s_mat = countsketch.countsketch_mat(hash_vec, sign_vec, s_int)
+            c2_mat = countsketch.countsketch_apply(a_mat, s_mat)
+            vec_time_vec[j] += time.perf_counter() - t0
+
+            # the two implementations must give the same sketch
+            assert numpy.allclose(c1_mat, c2_mat)
+
+        loop_time_vec[j] /= repeat_int
+        vec_time_vec[j] /= repeat_int
+        print('n = ' + str(n_int) + ':  loop ' + str(loop_time_vec[j]) + 's,  vectorized '
+              + str(vec_time_vec[j]) + 's,  speedup ' + str(loop_time_vec[j] / vec_time_vec[j]))
+
+    return loop_time_vec, vec_time_vec
+
+
+if __name__ == '__main__':
+    m_int = 90 # the number of features of YearPredictionMSD
+    s_int = 500
+    n_vec = [10000, 100000, 1000000]
+    repeat_int = 3
+
+    demo_speed(m_int, n_vec, s_int, repeat_int)
@@ -0,0 +1,60 @@
+# Demo of Multi-Core Sketching
+#
+# "countsketch", "srft", and "srft2" take an optional argument "workers".
+# The rows of A are split into blocks that are sketched by a thread pool,
+# or, if A has few but long rows, the threads are used inside scipy.fft.
+# We report the time and the strong-scaling efficiency T(1) / (p * T(p))
+# for p = 1, 2, 4, ... threads on a fixed problem.
+
+import numpy
+import os
+import time
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from sketch import countsketch, srft
+
+
+def timing(func, repeat_int):
+    t0 = time.perf_counter()
+    for i in range(repeat_int):
+        func()
+    return (time.perf_counter() - t0) / repeat_int
+
+
+def demo_scaling(a_mat, b_mat, s_int, workers_vec, repeat_int):
+    '''
+    Input
+        a_mat: m-by-n dense matrix A;
+        b_mat: d-by-n dense matrix B;
+        s_int: sketch size;
+        workers_vec: numbers of threads in the ascending order (starting from 1);
+        repeat_int: number of repeats.
+    '''
+    func_dict = {'countsketch': lambda w: countsketch.countsketch(a_mat, s_int, workers=w),
+                 'srft': lambda w: srft.srft(a_mat, s_int, workers=w),
+                 'srft2': lambda w: srft.srft2(a_mat, b_mat, s_int, workers=w)}
+    for name in ['countsketch', 'srft', 'srft2']:
+        func = func_dict[name]
+        time1 = None
+        for w in workers_vec:
+            t = timing(lambda: func(w), repeat_int)
+            if time1 is None:
+                time1 = t
+            print(name + ', workers = ' + str(w) + ':  ' + str(t) + 's,  speedup ' + str(time1 / t)
+                  + ',  efficiency ' + str(time1 / (w * t)))
+
+
+if __name__ == '__main__':
+    m_int = 512
+    n_int = 100000
+    s_int = 500
+    repeat_int = 3
+    a_mat = numpy.random.randn(m_int, n_int)
+    b_mat = numpy.random.randn(1, n_int)
+
+    cpu_int = os.cpu_count() or 1
+    workers_vec = [w for w in [1, 2, 4, 8, 16, 32] if w <= cpu_int]
+    demo_scaling(a_mat, b_mat, s_int, workers_vec, repeat_int)
@@ -0,0 +1,95 @@
+# Demo of the Speed of the Real FFT
+#
+# We compare "srft.realfft_row" and "srft.realfft_col",
+# which are based on the real FFT (scipy.fft.rfft) and write into a preallocated real matrix,
+# with the original implementation based on the complex numpy.fft.fft.
+# Both compute exactly the same orthogonal real transform.
+# Even and odd n are both tested.
+
+import numpy
+import time
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from sketch import srft
+
+
+def realfft_row_complex(a_mat):
+    '''
+    The Original Real FFT Applied to Each Row of A (based on the complex FFT)
+    '''
+    n_int = a_mat.shape[1]
+    fft_mat = numpy.fft.fft(a_mat, n=None, axis=1) / numpy.sqrt(n_int)
+    if n_int % 2 == 1:
+        cutoff_int = int((n_int+1) / 2)
+        idx_real_vec = list(range(1, cutoff_int))
+        idx_imag_vec = list(range(cutoff_int, n_int))
+    else:
+        cutoff_int = int(n_int/2)
+        idx_real_vec = list(range(1, cutoff_int))
+        idx_imag_vec = list(range(cutoff_int+1, n_int))
+    c_mat = fft_mat.real
+    c_mat[:, idx_real_vec] *= numpy.sqrt(2)
+    c_mat[:, idx_imag_vec] = fft_mat[:, idx_imag_vec].imag * numpy.sqrt(2)
+    return c_mat
+
+
+def realfft_col_complex(a_mat):
+    '''
+    The Original Real FFT Applied to Each Column of A (based on the complex FFT)
+    '''
+    n_int = a_mat.shape[0]
+    fft_mat = numpy.fft.fft(a_mat, n=None, axis=0) / numpy.sqrt(n_int)
+    if n_int % 2 == 1:
+        cutoff_int = int((n_int+1) / 2)
+        idx_real_vec = list(range(1, cutoff_int))
+        idx_imag_vec = list(range(cutoff_int, n_int))
+    else:
+        cutoff_int = int(n_int/2)
+        idx_real_vec = list(range(1, cutoff_int))
+        idx_imag_vec = list(range(cutoff_int+1, n_int))
+    c_mat = fft_mat.real
+    c_mat[idx_real_vec, :] *= numpy.sqrt(2)
+    c_mat[idx_imag_vec, :] = fft_mat[idx_imag_vec, :].imag * numpy.sqrt(2)
+    return c_mat
+
+
+def timing(func, a_mat, repeat_int):
+    t0 = time.perf_counter()
+    for i in range(repeat_int):
+        c_mat = func(a_mat)
+    return (time.perf_counter() - t0) / repeat_int, c_mat
+
+
+def demo_speed(m_int, n_vec, repeat_int):
+    '''
+    Input
+        m_int: number of rows of A;
+        n_vec: numbers of columns of A (even and odd);
+        repeat_int: number of repeats.
+    '''
+    for n_int in n_vec:
+        a_mat = numpy.random.randn(m_int, n_int)
+
+        time_old, c1_mat = timing(realfft_row_complex, a_mat, repeat_int)
+        time_new, c2_mat = timing(srft.realfft_row, a_mat, repeat_int)
+        assert numpy.allclose(c1_mat, c2_mat)
+        print('realfft_row, n = ' + str(n_int) + ':  fft ' + str(time_old) + 's,  rfft '
+              + str(time_new) + 's,  speedup ' + str(time_old / time_new))
+
+        a_mat = numpy.ascontiguousarray(a_mat.T)
+        time_old, c1_mat = timing(realfft_col_complex, a_mat, repeat_int)
+        time_new, c2_mat = timing(srft.realfft_col, a_mat, repeat_int)
+        assert numpy.allclose(c1_mat, c2_mat)
+        print('realfft_col, n = ' + str(n_int) + ':  fft ' + str(time_old) + 's,  rfft '
+              + str(time_new) + 's,  speedup ' + str(time_old / time_new))
+
+
+if __name__ == '__main__':
+    m_int = 90 # the number of features of YearPredictionMSD
+    n_vec = [2 ** 16, 2 ** 16 + 1, 100000, 100001, 400000, 400001]
+    repeat_int = 3
+
+    demo_speed(m_int, n_vec, repeat_int)
@@ -0,0 +1,52 @@
+# Demo of the Speed of the Pruned SRFT
+#
+# The standard SRFT computes the full length-n real FFT of every row of A
+# and then keeps only s columns.
+# The pruned SRFT computes only the s sampled frequencies,
+# using n/l short FFTs of length l (l is about s) and combining them.
+# We compare the time of the two for several n and s.
+
+import numpy
+import time
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from sketch import srft
+
+
+def demo_speed(m_int, n_vec, s_vec, repeat_int):
+    '''
+    Input
+        m_int: number of rows of A;
+        n_vec: numbers of columns of A;
+        s_vec: sketch sizes;
+        repeat_int: number of repeats.
+    '''
+    for n_int in n_vec:
+        a_mat = numpy.random.randn(m_int, n_int)
+        for s_int in s_vec:
+            full_time = 0
+            pruned_time = 0
+            for i in range(repeat_int):
+                t0 = time.perf_counter()
+                srft.srft(a_mat, s_int)
+                full_time += time.perf_counter() - t0
+
+                t0 = time.perf_counter()
+                srft.srft(a_mat, s_int, pruned=True)
+                pruned_time += time.perf_counter() - t0
+            full_time /= repeat_int
+            pruned_time /= repeat_int
+            print('n = ' + str(n_int) + ', s = ' + str(s_int) + ':  full ' + str(full_time) + 's,  pruned '
+                  + str(pruned_time) + 's,  speedup ' + str(full_time / pruned_time))
+
+
+if __name__ == '__main__':
+    m_int = 90 # the number of features of YearPredictionMSD
+    n_vec = [100000, 1000000]
+    s_vec = [100, 270, 1000]
+    repeat_int = 3
+
+    demo_speed(m_int, n_vec, s_vec, repeat_int)
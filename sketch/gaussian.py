@@ -1,30 +1,103 @@
 import numpy
+import scipy.sparse
 
-def gaussian_proj(a_mat, s_int):
+# number of rows of S generated from a single counter of the Philox generator
+TILE_ROWS = 1024
+
+
+def gaussian_rows(seed_int, start_int, stop_int, s_int):
     '''
-    Random Gaussian Projection
-    
+    Rows of A Seeded Gaussian Sketching Matrix
+
     Input
-        a_mat: m-by-n dense matrix A;
+        seed_int: integer seed that determines the n-by-s matrix S;
+        start_int, stop_int: the rows start_int, ..., stop_int-1 of S are returned;
         s_int: sketch size.
+    Output
+        s_mat: (stop-start)-by-s matrix containing the rows of S.
+
+    S is split into tiles of TILE_ROWS rows.
+    Tile k is drawn by the counter-based Philox generator with key seed_int and counter k,
+    so any block of rows can be regenerated independently of the other rows.
+    '''
+    tile_start_int = start_int // TILE_ROWS
+    tile_stop_int = (stop_int - 1) // TILE_ROWS + 1
+    s_mat = numpy.empty(((tile_stop_int - tile_start_int) * TILE_ROWS, s_int))
+    for k in range(tile_start_int, tile_stop_int):
+        rng = numpy.random.Generator(numpy.random.Philox(key=seed_int, counter=[0, 0, 0, k]))
+        i = (k - tile_start_int) * TILE_ROWS
+        rng.standard_normal(out=s_mat[i:i+TILE_ROWS, :])
+    offset_int = tile_start_int * TILE_ROWS
+    s_mat = s_mat[start_int-offset_int:stop_int-offset_int, :]
+    s_mat /= numpy.sqrt(s_int)
+    return s_mat
+
+
+def gaussian_apply(a_mat, seed_int, s_int, memory_budget=None):
+    '''
+    Blocked Gaussian Projection with A Seeded Sketching Matrix
+
+    Input
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A;
+        seed_int: integer seed that determines S (see gaussian_rows);
+        s_int: sketch size;
+        memory_budget: bytes available for the sketch and one block of S (optional);
+                    if None, S is formed as a whole.
+    Output
+        sketch_a_mat: m-by-s matrix A * S.
+
+    The sketch is accumulated as the sum of A[:, block] * S[block, :],
+    so the peak memory is O(m*s + block*s) rather than O(n*s).
+    '''
+    m_int, n_int = a_mat.shape
+    if memory_budget is None:
+        blk_int = n_int
+    else:
+        blk_int = int((memory_budget / 8 - m_int * s_int) / s_int)
+        blk_int = max(TILE_ROWS, blk_int // TILE_ROWS * TILE_ROWS)
+    if scipy.sparse.issparse(a_mat):
+        a_mat = scipy.sparse.csc_matrix(a_mat)
+
+    sketch_a_mat = numpy.zeros((m_int, s_int))
+    for i in range(0, n_int, blk_int):
+        j = min(i + blk_int, n_int)
+        s_mat = gaussian_rows(seed_int, i, j, s_int)
+        sketch_a_mat += a_mat[:, i:j].dot(s_mat)
+    return sketch_a_mat
+
+
+def gaussian_proj(a_mat, s_int, memory_budget=None):
+    '''
+    Random Gaussian Projection
+
+    Input
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A;
+        s_int: sketch size;
+        memory_budget: bytes available for the sketch and one block of S (optional);
+                    if given, S is never materialized (see gaussian_apply).
     Output
         sketch_a_mat: m-by-s matrix A * S.
         Here S is n-by-s sketching matrix.
     '''
     m_int, n_int = a_mat.shape
+    if memory_budget is not None:
+        seed_int = int(numpy.random.randint(2 ** 62, dtype=numpy.int64))
+        return gaussian_apply(a_mat, seed_int, s_int, memory_budget)
     s_mat = numpy.random.randn(n_int, s_int) / numpy.sqrt(s_int)
-    sketch_a_mat = numpy.dot(a_mat, s_mat)
+    sketch_a_mat = a_mat.dot(s_mat)
     return sketch_a_mat
-    
 
-def gaussian_proj2(a_mat, b_mat, s_int):
+
+def gaussian_proj2(a_mat, b_mat, s_int, memory_budget=None):
     '''
     Random Gaussian Projection for 2 Matrices
-    
+
     Input
-        a_mat: m-by-n dense matrix A;
-        b_mat: d-by-n dense matrix B;
-        s_int: sketch size.
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A;
+        b_mat: d-by-n dense matrix or scipy.sparse matrix B;
+        s_int: sketch size;
+        memory_budget: bytes available for the sketches and one block of S (optional);
+                    if given, S is never materialized (see gaussian_apply).
     Output
         sketch_a_mat: m-by-s matrix A * S;
         sketch_b_mat: d-by-s matrix B * S.
@@ -32,12 +105,17 @@ def gaussian_proj2(a_mat, b_mat, s_int):
     '''
     m_int, n_int = a_mat.shape
     d_int = b_mat.shape[0]
+    if memory_budget is not None:
+        seed_int = int(numpy.random.randint(2 ** 62, dtype=numpy.int64))
+        sketch_a_mat = gaussian_apply(a_mat, seed_int, s_int, memory_budget)
+        sketch_b_mat = gaussian_apply(b_mat, seed_int, s_int, memory_budget)
+        return sketch_a_mat, sketch_b_mat
     s_mat = numpy.random.randn(n_int, s_int) / numpy.sqrt(s_int)
-    sketch_a_mat = numpy.dot(a_mat, s_mat)
-    sketch_b_mat = numpy.dot(b_mat, s_mat)
+    sketch_a_mat = a_mat.dot(s_mat)
+    sketch_b_mat = b_mat.dot(s_mat)
     return sketch_a_mat, sketch_b_mat
-    
 
-    
-    
-    
+
+
+
+
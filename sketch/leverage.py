@@ -1,7 +1,13 @@
 import numpy
+import scipy.linalg
+import scipy.sparse
 
 import sketch.countsketch as cs
 import sketch.srft as srft
+import sketch.srht as srht
+
+# number of columns of a sparse A that are multiplied by T at a time
+BLOCK_COLS = 4096
 
 def lev_exact(a_mat):
     '''
@@ -19,18 +25,75 @@ def lev_exact(a_mat):
     return lev_vec
     
 
+def lev_transformed(t_mat, a_mat):
+    '''
+    Compute the Squared Column Norms of T * A
+    
+    Input
+        t_mat: p-by-m dense matrix T;
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A.
+    
+    Output
+        lev_vec: n-dim vector containing the squared column norms of Y = T * A
+        
+    If A is sparse, Y is formed for BLOCK_COLS columns at a time,
+    so the p-by-n dense matrix Y is never held in memory.
+    '''
+    if not scipy.sparse.issparse(a_mat):
+        y_mat = numpy.dot(t_mat, a_mat)
+        lev_vec = numpy.sum(y_mat ** 2, axis=0)
+        return lev_vec
     
-def lev_approx(a_mat, sketch_size=5, sketch_type='count'):
+    a_mat = scipy.sparse.csc_matrix(a_mat)
+    n_int = a_mat.shape[1]
+    lev_vec = numpy.zeros(n_int)
+    for j in range(0, n_int, BLOCK_COLS):
+        y_mat = a_mat[:, j:j+BLOCK_COLS].T.dot(t_mat.T)
+        lev_vec[j:j+BLOCK_COLS] = numpy.sum(y_mat ** 2, axis=1)
+    return lev_vec
+
+
+def lev_triangular(r_mat, a_mat):
+    '''
+    Compute the Squared Column Norms of R^{-T} * A
+    
+    Input
+        r_mat: m-by-m upper triangular matrix R;
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A.
+    
+    Output
+        lev_vec: n-dim vector containing the squared column norms of Y = R^{-T} * A
+        
+    Y is computed by a triangular solve, so R^{-1} is never formed;
+    as in lev_transformed, a sparse A is processed BLOCK_COLS columns at a time.
+    '''
+    if not scipy.sparse.issparse(a_mat):
+        y_mat = scipy.linalg.solve_triangular(r_mat, a_mat, trans='T')
+        lev_vec = numpy.sum(y_mat ** 2, axis=0)
+        return lev_vec
+    
+    a_mat = scipy.sparse.csc_matrix(a_mat)
+    n_int = a_mat.shape[1]
+    lev_vec = numpy.zeros(n_int)
+    for j in range(0, n_int, BLOCK_COLS):
+        y_mat = scipy.linalg.solve_triangular(r_mat, a_mat[:, j:j+BLOCK_COLS].toarray(), trans='T')
+        lev_vec[j:j+BLOCK_COLS] = numpy.sum(y_mat ** 2, axis=0)
+    return lev_vec
+
+    
+def lev_approx(a_mat, sketch_size=5, sketch_type='count', method='svd'):
     '''
     Compute Approximate Column Leverage Scores
     
     Input
-        a_mat: m-by-n dense matrix A (n >> m);
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A (n >> m);
         sketch_size: a real number bigger than 1 (s = sketch_size * m)
-        sketch_type: 'count' or 'srft';
+        sketch_type: 'count', 'srft', 'srht', or 'uniform';
                     'count' for count sketch;
                     'srft' for subsampled randomized Fourier transform;
-                    'uniform' for uniform sampling.
+                    'srht' for subsampled randomized Hadamard transform;
+                    'uniform' for uniform sampling;
+        method: 'svd' or 'qr'.
     
     Output
         lev_vec: n-dim vector containing the approximate leverage scores
@@ -39,9 +102,13 @@ def lev_approx(a_mat, sketch_size=5, sketch_type='count'):
         1. sketch size: s_int = m_int * sketch_size
         2. draw m-by-s sketch B = A * S, where S is n-by-s sketching matrix
         3. compute the SVD B = U * Sig * V
+           (method='qr': compute the QR decomposition B^T = Q * R)
         4. let T = Sig^{-1} * U^T
+           (method='qr': T = R^{-T}, applied by triangular solves)
         5. Y = T * A
         6. return the n column leverage scores of Y
+    Both T make the rows of T * B orthonormal, so the scores are equally accurate;
+    the QR decomposition is cheaper than the SVD.
     '''
     m_int, n_int = a_mat.shape
     s_int = int(m_int * sketch_size)
@@ -49,29 +116,38 @@ def lev_approx(a_mat, sketch_size=5, sketch_type='count'):
         b_mat = cs.countsketch(a_mat, s_int)
     elif sketch_type == 'srft':
         b_mat = srft.srft(a_mat, s_int)
+    elif sketch_type == 'srht':
+        b_mat = srht.srht(a_mat, s_int)
     elif sketch_type == 'uniform':
         idx_vec = numpy.random.choice(n_int, s_int, replace=False)
         b_mat = a_mat[:, idx_vec] * (n_int / s_int)
+        if scipy.sparse.issparse(b_mat):
+            b_mat = b_mat.toarray()
+    if method == 'qr':
+        r_mat = numpy.linalg.qr(b_mat.T, mode='r')
+        lev_vec = lev_triangular(r_mat, a_mat)
+        return lev_vec
     u_mat, sig_vec, _ = numpy.linalg.svd(b_mat, full_matrices=False)
     t_mat = u_mat.T / sig_vec.reshape(len(sig_vec), 1)
-    y_mat = numpy.dot(t_mat, a_mat)
-    lev_vec = numpy.sum(y_mat ** 2, axis=0)
+    lev_vec = lev_transformed(t_mat, a_mat)
     return lev_vec
 
 
-def lev_approx_fast(a_mat, sketch_size=5, sketch_type='count', speedup=2):
+def lev_approx_fast(a_mat, sketch_size=5, sketch_type='count', speedup=2, method='svd'):
     '''
     Compute Approximate Exact Column Leverage Scores
     
     This algorithm is useful only if m_int is big
     
     Input
-        a_mat: m-by-n dense matrix A (n >> m);
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A (n >> m);
         sketch_size: a real number bigger than 1 (s = sketch_size * m)
-        sketch_type: 'count' or 'srft';
+        sketch_type: 'count', 'srft', or 'srht';
                     'count' for count sketch;
                     'srft' for subsampled randomized Fourier transform;
-        speedup: a real number bigger than 1.
+                    'srht' for subsampled randomized Hadamard transform;
+        speedup: a real number bigger than 1;
+        method: 'svd' or 'qr' (see lev_approx).
     
     Output
         lev_vec: n-dim vector containing the approximate leverage scores
@@ -95,14 +171,19 @@ def lev_approx_fast(a_mat, sketch_size=5, sketch_type='count', speedup=2):
         b_mat = cs.countsketch(a_mat, s_int)
     elif sketch_type == 'srft':
         b_mat = srft.srft(a_mat, s_int)
-    u_mat, sig_vec, _ = numpy.linalg.svd(b_mat, full_matrices=False)
-    t_mat = u_mat.T / sig_vec.reshape(len(sig_vec), 1)
-    
+    elif sketch_type == 'srht':
+        b_mat = srht.srht(a_mat, s_int)
     p_mat = numpy.random.randn(p_int, m_int) / numpy.sqrt(p_int)
-    t_mat = numpy.dot(p_mat, t_mat)
+    if method == 'qr':
+        # P * R^{-T} = (R^{-1} * P^T)^T
+        r_mat = numpy.linalg.qr(b_mat.T, mode='r')
+        t_mat = scipy.linalg.solve_triangular(r_mat, p_mat.T).T
+    else:
+        u_mat, sig_vec, _ = numpy.linalg.svd(b_mat, full_matrices=False)
+        t_mat = u_mat.T / sig_vec.reshape(len(sig_vec), 1)
+        t_mat = numpy.dot(p_mat, t_mat)
     
-    y_mat = numpy.dot(t_mat, a_mat)
-    lev_vec = numpy.sum(y_mat ** 2, axis=0)
+    lev_vec = lev_transformed(t_mat, a_mat)
     return lev_vec
     
 
@@ -111,7 +192,7 @@ def col_sample(a_mat, s_int, prob_vec):
     Random Sampling according to A Given Distribution
     
     Input
-        a_mat: m-by-n dense matrix A;
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A;
         s_int: sketch size;
         prob_vec: n-dim vector, containing the sampling probabilities.
         
@@ -123,5 +204,8 @@ def col_sample(a_mat, s_int, prob_vec):
     prob_vec /= sum(prob_vec)
     idx_vec = numpy.random.choice(n_int, s_int, replace=False, p=prob_vec)
     scaling_vec = numpy.sqrt(s_int * prob_vec[idx_vec]) + 1e-10
-    c_mat = a_mat[:, idx_vec] / scaling_vec.reshape(1, len(scaling_vec))
+    c_mat = a_mat[:, idx_vec]
+    if scipy.sparse.issparse(c_mat):
+        c_mat = c_mat.toarray()
+    c_mat = c_mat / scaling_vec.reshape(1, len(scaling_vec))
     return idx_vec, c_mat
@@ -0,0 +1,253 @@
+import numpy
+import multiprocessing
+import multiprocessing.util
+from multiprocessing import shared_memory
+
+import sketch.operators as op
+import sketch.stream as stream
+
+
+class PartialSketch(object):
+    '''
+    Mergeable Partial Sketch
+
+    The sketch S^T * B is linear in the rows of B:
+    it is the sum of S[rows, :]^T * B[rows, :] over any partition of the rows.
+    A partial sketch holds the sum over the row ranges it has seen,
+    so partial sketches of disjoint shards, computed by different processes or machines
+    with the same operator, are merged by adding them.
+
+    Input
+        sketch_op: operators.SketchOperator representing the n-by-s matrix S.
+
+    Attributes
+        c_mat: s-by-d partial sum (None if no rows were added);
+        range_list: sorted list of disjoint row ranges (start, stop) that were added.
+    '''
+    def __init__(self, sketch_op):
+        self.sketch_op = sketch_op
+        self.c_mat = None
+        self.range_list = []
+
+    def update(self, b_mat, start_int):
+        '''
+        Add the chunk b_mat containing the rows start_int, ..., start_int+c-1 of B.
+        '''
+        stop_int = start_int + b_mat.shape[0]
+        self.range_list = merge_ranges(self.range_list, [(start_int, stop_int)])
+        part_mat = self.sketch_op.apply_left_rows(b_mat, start_int)
+        if self.c_mat is None:
+            self.c_mat = part_mat
+        else:
+            self.c_mat += part_mat
+        return self
+
+    def merge(self, other):
+        '''
+        Merge another partial sketch of the same operator on disjoint rows into this one.
+        '''
+        if not same_operator(self.sketch_op, other.sketch_op):
+            raise ValueError('Partial sketches built with different sketching matrices cannot be merged.')
+        self.range_list = merge_ranges(self.range_list, other.range_list)
+        if self.c_mat is None:
+            self.c_mat = None if other.c_mat is None else other.c_mat.copy()
+        elif other.c_mat is not None:
+            self.c_mat += other.c_mat
+        return self
+
+    def is_complete(self):
+        '''
+        Whether all the n rows of B were added.
+        '''
+        return self.range_list == [(0, self.sketch_op.n_int)]
+
+    def result(self):
+        '''
+        Output
+            c_mat: s-by-d sketch S^T * B; all the rows of B must have been added.
+        '''
+        if not self.is_complete():
+            raise ValueError('The partial sketch covers the rows ' + str(self.range_list)
+                             + ' instead of all the ' + str(self.sketch_op.n_int) + ' rows.')
+        return self.c_mat
+
+    def get_state(self):
+        '''
+        Output
+            state_dict: dict containing the operator state, the partial sum and the row ranges;
+                        it can be pickled and sent to another process (see from_state).
+        '''
+        return {'op_state': self.sketch_op.get_state(), 'c_mat': self.c_mat, 'range_list': list(self.range_list)}
+
+
+def from_state(state_dict):
+    '''
+    Rebuild A Partial Sketch from the Output of PartialSketch.get_state
+    '''
+    partial = PartialSketch(op.from_state(state_dict['op_state']))
+    partial.c_mat = state_dict['c_mat']
+    partial.range_list = [tuple(r) for r in state_dict['range_list']]
+    return partial
+
+
+def merge_ranges(range1_list, range2_list):
+    '''
+    Union of Two Lists of Row Ranges
+
+    Output
+        sorted list of disjoint ranges, where adjacent ranges are joined.
+    An error is raised if two ranges overlap, because the rows would be counted twice.
+    '''
+    range_list = sorted([r for r in list(range1_list) + list(range2_list) if r[1] > r[0]])
+    merged_list = []
+    for start_int, stop_int in range_list:
+        if len(merged_list) > 0 and start_int < merged_list[-1][1]:
+            raise ValueError('The row ranges ' + str(merged_list[-1]) + ' and ' + str((start_int, stop_int)) + ' overlap.')
+        if len(merged_list) > 0 and start_int == merged_list[-1][1]:
+            merged_list[-1] = (merged_list[-1][0], stop_int)
+        else:
+            merged_list.append((start_int, stop_int))
+    return merged_list
+
+
+def same_operator(op1, op2):
+    '''
+    Whether two operators represent the same sketching matrix S
+    '''
+    state1_dict = op1.get_state()
+    state2_dict = op2.get_state()
+    if state1_dict.keys() != state2_dict.keys():
+        return False
+    for name in state1_dict.keys():
+        value1, value2 = state1_dict[name], state2_dict[name]
+        if value1 is None or value2 is None:
+            if not (value1 is None and value2 is None):
+                return False
+        elif not numpy.array_equal(value1, value2):
+            return False
+    return True
+
+
+def tree_reduce(partial_list):
+    '''
+    Merge Partial Sketches Pairwise
+
+    Input
+        partial_list: list of PartialSketch objects of the same operator on disjoint rows.
+    Output
+        partial: the merged PartialSketch.
+
+    The partial sketches are merged in about log2(len(partial_list)) rounds of pairs,
+    as a reduction over processes or machines would be done.
+    '''
+    partial_list = list(partial_list)
+    if len(partial_list) == 0:
+        raise ValueError('No partial sketch to merge.')
+    while len(partial_list) > 1:
+        merged_list = [partial_list[i].merge(partial_list[i+1]) for i in range(0, len(partial_list) - 1, 2)]
+        if len(partial_list) % 2 == 1:
+            merged_list.append(partial_list[-1])
+        partial_list = merged_list
+    return partial_list[0]
+
+
+# the operator and the matrix B of a worker process, set by init_worker
+worker_dict = {}
+
+
+def init_worker(op_state, src_dict):
+    '''
+    Initialize A Worker Process: rebuild the operator and attach to B without copying it.
+    '''
+    worker_dict['op'] = op.from_state(op_state)
+    worker_dict['col_idx'] = src_dict['col_idx']
+    worker_dict['chunk_rows'] = src_dict['chunk_rows']
+    if 'shm_name' in src_dict:
+        shm = shared_memory.SharedMemory(name=src_dict['shm_name'])
+        worker_dict['shm'] = shm
+        worker_dict['b_mat'] = numpy.ndarray(src_dict['shape'], dtype=src_dict['dtype'], buffer=shm.buf)
+        # run when the worker exits normally (sketch_processes closes and joins the pool)
+        multiprocessing.util.Finalize(None, close_worker, exitpriority=10)
+    else:
+        worker_dict['b_mat'] = numpy.load(src_dict['file_name'], mmap_mode='r')
+
+
+def close_worker():
+    '''
+    Detach a worker process from the shared memory (the array viewing it must go first).
+    '''
+    worker_dict.pop('b_mat', None)
+    shm = worker_dict.pop('shm', None)
+    if shm is not None:
+        shm.close()
+
+
+def sketch_shard(range_tuple):
+    '''
+    Partial sketch of the rows range_tuple = (start, stop) of B in a worker process
+    '''
+    start_int, stop_int = range_tuple
+    partial = PartialSketch(worker_dict['op'])
+    b_mat = worker_dict['b_mat'][start_int:stop_int]
+    chunk_iter = stream.iter_rows(b_mat, worker_dict['chunk_rows'], worker_dict['col_idx'])
+    i = start_int
+    for chunk_mat in chunk_iter:
+        partial.update(chunk_mat, i)
+        i += chunk_mat.shape[0]
+    return partial.get_state()
+
+
+def sketch_processes(sketch_op, b_src, processes=None, chunk_rows=stream.CHUNK_ROWS, col_idx=None, shards_per_process=4):
+    '''
+    Sketch S^T * B with A Pool of Local Processes
+
+    Input
+        sketch_op: operators.SketchOperator representing the n-by-s matrix S;
+        b_src: n-by-d NumPy array, or the file name of a .npy file containing it;
+        processes: number of worker processes (default: the number of CPUs);
+        chunk_rows: number of rows of B a worker sketches at a time;
+        col_idx: columns of B to keep (optional), e.g. slice(1, None);
+        shards_per_process: the rows are split into about processes * shards_per_process shards,
+                            which are handed out to the workers as they become free.
+    Output
+        c_mat: s-by-d sketch S^T * B.
+
+    A .npy file is memory-mapped by every worker, so it is never loaded as a whole.
+    An array is copied once into shared memory (multiprocessing.shared_memory),
+    which every worker maps without copying; the workers detach from it when they exit,
+    and the segment is removed when the sketch is done (or fails).
+    Only the operator state and the s-by-d partial sketches are sent between processes;
+    the partial sketches are combined by tree_reduce.
+    '''
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    src_dict = {'col_idx': col_idx, 'chunk_rows': chunk_rows}
+    if isinstance(b_src, str):
+        n_int = numpy.load(b_src, mmap_mode='r').shape[0]
+        src_dict['file_name'] = b_src
+    else:
+        b_src = numpy.asarray(b_src)
+        n_int = b_src.shape[0]
+    if n_int != sketch_op.n_int:
+        raise ValueError('B has ' + str(n_int) + ' rows, but S has ' + str(sketch_op.n_int) + ' rows.')
+
+    num_shard_int = max(1, min(n_int, processes * shards_per_process))
+    bound_vec = (numpy.arange(num_shard_int + 1) * n_int) // num_shard_int
+    range_list = [(int(bound_vec[i]), int(bound_vec[i+1])) for i in range(num_shard_int)]
+    shm = None
+    try:
+        if 'file_name' not in src_dict:
+            shm = shared_memory.SharedMemory(create=True, size=max(1, b_src.nbytes))
+            numpy.ndarray(b_src.shape, dtype=b_src.dtype, buffer=shm.buf)[...] = b_src
+            src_dict.update({'shm_name': shm.name, 'shape': b_src.shape, 'dtype': b_src.dtype.str})
+        with multiprocessing.Pool(processes, initializer=init_worker, initargs=(sketch_op.get_state(), src_dict)) as pool:
+            state_list = pool.map(sketch_shard, range_list)
+            # let the workers exit normally, so that they detach from the shared memory (see close_worker)
+            pool.close()
+            pool.join()
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+    partial = tree_reduce([from_state(state_dict) for state_dict in state_list])
+    return partial.result()
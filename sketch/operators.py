@@ -0,0 +1,319 @@
+import numpy
+import scipy.sparse
+
+import sketch.countsketch as cs
+import sketch.gaussian as gp
+import sketch.osnap as osnap
+import sketch.srft as srft
+import sketch.srht as srht
+
+
+class SketchOperator(object):
+    '''
+    Reusable Sketching Operator (Base Class)
+
+    An operator represents an n-by-s sketching matrix S.
+    It is constructed once from (n, s, seed) and keeps only compact state,
+    e.g. hash and sign vectors or sampled indices, never S itself.
+    The same S can then be applied to any number of matrices.
+
+    Input
+        n_int: number of rows of S;
+        s_int: sketch size (number of columns of S);
+        seed: None, int, or numpy.random.Generator;
+              the randomness of S is drawn from numpy.random.default_rng(seed).
+
+    Methods
+        apply(a_mat): m-by-s sketch A * S of an m-by-n matrix A;
+        apply_left(b_mat): s-by-d sketch S^T * B of an n-by-d matrix B;
+        rows(start_int, stop_int): the rows start_int, ..., stop_int-1 of S;
+        apply_left_rows(b_mat, start_int): s-by-d sketch of a chunk of consecutive rows of B;
+        get_state(): the compact state of S (see from_state).
+    '''
+    # names of the attributes that determine S, besides n_int and s_int
+    state_names = ()
+
+    def __init__(self, n_int, s_int, seed=None):
+        self.n_int = n_int
+        self.s_int = s_int
+        rng = numpy.random.default_rng(seed)
+        self.draw(rng)
+
+    def draw(self, rng):
+        '''
+        Draw the compact random state of S from the generator rng.
+        '''
+        raise NotImplementedError
+
+    def apply(self, a_mat):
+        '''
+        Input
+            a_mat: m-by-n dense matrix or scipy.sparse matrix A.
+        Output
+            c_mat: m-by-s dense sketch C = A * S.
+        '''
+        raise NotImplementedError
+
+    def apply_left(self, b_mat):
+        '''
+        Input
+            b_mat: n-by-d dense matrix or scipy.sparse matrix B.
+        Output
+            c_mat: s-by-d dense sketch C = S^T * B.
+        '''
+        c_mat = self.apply(b_mat.T).T
+        return c_mat
+
+    def get_state(self):
+        '''
+        Output
+            state_dict: dict containing the class name, n_int, s_int and the attributes in state_names;
+                        it contains only numbers, None and NumPy arrays, so it can be pickled
+                        and sent to another process, where from_state(state_dict) rebuilds the same S.
+        '''
+        state_dict = {'class': type(self).__name__, 'n_int': self.n_int, 's_int': self.s_int}
+        for name in self.state_names:
+            state_dict[name] = getattr(self, name)
+        return state_dict
+
+    def rows(self, start_int, stop_int):
+        '''
+        Output
+            s_mat: (stop-start)-by-s dense matrix or scipy.sparse matrix
+                   containing the rows start_int, ..., stop_int-1 of S.
+        '''
+        raise NotImplementedError
+
+    def apply_left_rows(self, b_mat, start_int):
+        '''
+        Input
+            b_mat: c-by-d dense matrix or scipy.sparse matrix containing
+                   the rows start_int, ..., start_int+c-1 of an n-by-d matrix B.
+        Output
+            c_mat: s-by-d dense matrix S[start:start+c, :]^T * B[start:start+c, :].
+
+        S^T * B is the sum of apply_left_rows over any partition of B into row chunks,
+        so B can be streamed from disk (see stream.sketch_chunks).
+        '''
+        s_mat = self.rows(start_int, start_int + b_mat.shape[0])
+        if scipy.sparse.issparse(s_mat):
+            c_mat = s_mat.T.dot(b_mat)
+            if scipy.sparse.issparse(c_mat):
+                c_mat = c_mat.toarray()
+        else:
+            c_mat = b_mat.T.dot(s_mat).T
+        return numpy.asarray(c_mat)
+
+
+class GaussianOperator(SketchOperator):
+    '''
+    Random Gaussian Projection Operator
+
+    S has i.i.d. N(0, 1/s) entries.
+    Only an integer seed is stored; S is regenerated from it tile by tile when applied,
+    so every application uses exactly the same S.
+
+    Additional Input
+        memory_budget: bytes available for the sketch and one block of S (optional);
+                    see gaussian.gaussian_apply.
+    '''
+    state_names = ('memory_budget', 'seed_int')
+
+    def __init__(self, n_int, s_int, seed=None, memory_budget=None):
+        self.memory_budget = memory_budget
+        SketchOperator.__init__(self, n_int, s_int, seed)
+
+    def draw(self, rng):
+        self.seed_int = int(rng.integers(2 ** 62))
+
+    def apply(self, a_mat):
+        c_mat = gp.gaussian_apply(a_mat, self.seed_int, self.s_int, self.memory_budget)
+        return c_mat
+
+    def rows(self, start_int, stop_int):
+        return gp.gaussian_rows(self.seed_int, start_int, stop_int, self.s_int)
+
+
+class CountSketchOperator(SketchOperator):
+    '''
+    Count Sketch Operator
+
+    Each row of S has a single nonzero (+1 or -1) in a random column.
+    The hash and sign vectors (n-dim) are stored.
+    '''
+    state_names = ('hash_vec', 'sign_vec')
+
+    def draw(self, rng):
+        self.hash_vec = rng.integers(self.s_int, size=self.n_int)
+        self.sign_vec = rng.integers(2, size=self.n_int, dtype=numpy.int8) * 2 - 1
+
+    def apply(self, a_mat):
+        s_mat = cs.countsketch_mat(self.hash_vec, self.sign_vec, self.s_int)
+        c_mat = cs.countsketch_apply(a_mat, s_mat)
+        return c_mat
+
+    def rows(self, start_int, stop_int):
+        return cs.countsketch_mat(self.hash_vec[start_int:stop_int], self.sign_vec[start_int:stop_int], self.s_int)
+
+
+class OSNAPOperator(SketchOperator):
+    '''
+    Sparse Embedding (OSNAP) Operator
+
+    Each row of S has k nonzeros (+1/sqrt(k) or -1/sqrt(k)),
+    one in each of k blocks of the s columns (see osnap.osnap_hash).
+    The n-by-k hash and sign matrices are stored.
+
+    Additional Input
+        k_int: number of nonzeros in each row of S.
+    '''
+    state_names = ('k_int', 'hash_mat', 'sign_mat')
+
+    def __init__(self, n_int, s_int, seed=None, k_int=2):
+        self.k_int = k_int
+        SketchOperator.__init__(self, n_int, s_int, seed)
+
+    def draw(self, rng):
+        self.hash_mat, self.sign_mat = osnap.osnap_hash(self.n_int, self.s_int, self.k_int, rng)
+
+    def apply(self, a_mat):
+        s_mat = osnap.osnap_mat(self.hash_mat, self.sign_mat, self.s_int)
+        c_mat = cs.countsketch_apply(a_mat, s_mat)
+        return c_mat
+
+    def rows(self, start_int, stop_int):
+        return osnap.osnap_mat(self.hash_mat[start_int:stop_int, :], self.sign_mat[start_int:stop_int, :], self.s_int)
+
+
+class SRFTOperator(SketchOperator):
+    '''
+    Subsampled Randomized Fourier Transform (SRFT) Operator
+
+    S = D * F * P * sqrt(n / s), where D has random signs on its diagonal,
+    F is the orthogonal real FFT matrix, and P samples s columns.
+    The sign vector (n-dim) and the sampled indices (s-dim) are stored.
+
+    Additional Input
+        pruned: if True, the rows are zero-padded as in srft.srft_pruned_apply
+                and only the s sampled frequencies are computed.
+    '''
+    state_names = ('pruned', 'sign_vec', 'idx_vec')
+
+    def __init__(self, n_int, s_int, seed=None, pruned=False):
+        self.pruned = pruned
+        SketchOperator.__init__(self, n_int, s_int, seed)
+
+    def draw(self, rng):
+        self.sign_vec = rng.integers(2, size=self.n_int, dtype=numpy.int8) * 2 - 1
+        if self.pruned:
+            p_int = srft.pruned_size(self.n_int, self.s_int)[2]
+            self.idx_vec = rng.choice(p_int, self.s_int, replace=False)
+        else:
+            self.idx_vec = rng.choice(self.n_int, self.s_int, replace=False)
+
+    def apply(self, a_mat):
+        if self.pruned:
+            return srft.srft_pruned_apply(a_mat, self.sign_vec, self.idx_vec)
+        c_mat = srft.srft_apply(a_mat, self.sign_vec, self.idx_vec)
+        return c_mat
+
+    def rows(self, start_int, stop_int):
+        '''
+        The rows are formed from srft.realfft_entries at the cost of O((stop-start) * s),
+        so streaming costs O(n * s * d) instead of O(n * log(n) * d).
+        '''
+        if self.pruned:
+            p_int = srft.pruned_size(self.n_int, self.s_int)[2]
+        else:
+            p_int = self.n_int
+        s_mat = srft.realfft_entries(numpy.arange(start_int, stop_int), self.idx_vec, p_int)
+        s_mat *= self.sign_vec[start_int:stop_int].reshape(stop_int - start_int, 1) * numpy.sqrt(p_int / self.s_int)
+        return s_mat
+
+
+class SRHTOperator(SketchOperator):
+    '''
+    Subsampled Randomized Hadamard Transform (SRHT) Operator
+
+    S = D * [I; 0] * H * P * sqrt(p / s), where D has random signs on its diagonal,
+    the n columns are zero-padded to p (the next power of two),
+    H is the p-by-p orthogonal Walsh-Hadamard matrix, and P samples s of the p columns.
+    The sign vector (n-dim) and the sampled indices (s-dim) are stored.
+    '''
+    state_names = ('sign_vec', 'idx_vec')
+
+    def draw(self, rng):
+        self.sign_vec = rng.integers(2, size=self.n_int, dtype=numpy.int8) * 2 - 1
+        self.idx_vec = rng.choice(srht.next_pow2(self.n_int), self.s_int, replace=False)
+
+    def apply(self, a_mat):
+        c_mat = srht.srht_apply(a_mat, self.sign_vec, self.idx_vec)
+        return c_mat
+
+    def rows(self, start_int, stop_int):
+        p_int = srht.next_pow2(self.n_int)
+        s_mat = srht.hadamard_entries(numpy.arange(start_int, stop_int), self.idx_vec, p_int)
+        s_mat *= self.sign_vec[start_int:stop_int].reshape(stop_int - start_int, 1) * numpy.sqrt(p_int / self.s_int)
+        return s_mat
+
+
+class SamplingOperator(SketchOperator):
+    '''
+    Random Column Sampling Operator
+
+    S samples s columns without replacement according to prob_vec
+    (uniformly if prob_vec is None) and rescales them.
+    The sampled indices and the scaling factors (s-dim) are stored.
+
+    Additional Input
+        prob_vec: n-dim vector containing the sampling probabilities (optional),
+                  e.g. the (approximate) leverage scores.
+    '''
+    state_names = ('prob_vec', 'idx_vec', 'scaling_vec')
+
+    def __init__(self, n_int, s_int, seed=None, prob_vec=None):
+        self.prob_vec = prob_vec
+        SketchOperator.__init__(self, n_int, s_int, seed)
+
+    def draw(self, rng):
+        if self.prob_vec is None:
+            self.idx_vec = rng.choice(self.n_int, self.s_int, replace=False)
+            self.scaling_vec = numpy.ones(self.s_int) * numpy.sqrt(self.s_int / self.n_int)
+        else:
+            prob_vec = self.prob_vec / numpy.sum(self.prob_vec)
+            self.idx_vec = rng.choice(self.n_int, self.s_int, replace=False, p=prob_vec)
+            self.scaling_vec = numpy.sqrt(self.s_int * prob_vec[self.idx_vec]) + 1e-10
+
+    def apply(self, a_mat):
+        c_mat = a_mat[:, self.idx_vec]
+        if scipy.sparse.issparse(c_mat):
+            c_mat = c_mat.toarray()
+        c_mat = c_mat / self.scaling_vec.reshape(1, self.s_int)
+        return c_mat
+
+    def rows(self, start_int, stop_int):
+        j_vec = numpy.flatnonzero((self.idx_vec >= start_int) & (self.idx_vec < stop_int))
+        s_mat = scipy.sparse.csr_matrix((1 / self.scaling_vec[j_vec], (self.idx_vec[j_vec] - start_int, j_vec)),
+                                        shape=(stop_int - start_int, self.s_int))
+        return s_mat
+
+
+operator_dict = {op_class.__name__: op_class for op_class in
+                 [GaussianOperator, CountSketchOperator, OSNAPOperator, SRFTOperator, SRHTOperator, SamplingOperator]}
+
+
+def from_state(state_dict):
+    '''
+    Rebuild A Sketching Operator from Its State
+
+    Input
+        state_dict: output of SketchOperator.get_state.
+    Output
+        sketch_op: operator representing the same S; no randomness is drawn.
+    '''
+    op_class = operator_dict[str(state_dict['class'])]
+    sketch_op = op_class.__new__(op_class)
+    for name, value in state_dict.items():
+        if name != 'class':
+            setattr(sketch_op, name, value)
+    return sketch_op
@@ -0,0 +1,96 @@
+import numpy
+import scipy.sparse
+
+import sketch.countsketch as cs
+
+
+def osnap_hash(n_int, s_int, k_int, rng=None):
+    '''
+    Draw the Buckets and Signs of A Sparse Embedding
+
+    Input
+        n_int: number of rows of S;
+        s_int: sketch size;
+        k_int: number of nonzeros in each row of S (1 <= k <= s);
+        rng: numpy.random.Generator (optional); the global numpy.random state is used if it is None.
+    Output
+        hash_mat: n-by-k matrix; the j-th column contains buckets in the j-th block of {0, ..., s-1};
+        sign_mat: n-by-k matrix of random signs (+1 or -1).
+
+    The s columns of S are split into k nearly equal blocks,
+    and each row of S has exactly one nonzero in each block,
+    so the k nonzeros of a row are always in distinct columns.
+    '''
+    bound_vec = (numpy.arange(k_int + 1) * s_int) // k_int
+    width_vec = bound_vec[1:] - bound_vec[0:-1]
+    if rng is None:
+        rand_mat = numpy.random.rand(n_int, k_int)
+    else:
+        rand_mat = rng.random((n_int, k_int))
+    hash_mat = numpy.floor(rand_mat * width_vec.reshape(1, k_int)).astype(numpy.int64)
+    hash_mat += bound_vec[0:-1].reshape(1, k_int)
+    if rng is None:
+        sign_mat = numpy.random.choice(2, (n_int, k_int), replace=True) * 2 - 1
+    else:
+        sign_mat = rng.integers(2, size=(n_int, k_int), dtype=numpy.int8) * 2 - 1
+    return hash_mat, sign_mat
+
+
+def osnap_mat(hash_mat, sign_mat, s_int):
+    '''
+    Sparse Embedding Matrix (OSNAP)
+
+    Input
+        hash_mat: n-by-k matrix containing the columns of the nonzeros of each row of S;
+        sign_mat: n-by-k matrix containing the signs of the nonzeros;
+        s_int: sketch size.
+    Output
+        s_mat: n-by-s scipy.sparse CSR matrix S with k nonzeros (+1/sqrt(k) or -1/sqrt(k)) in each row.
+    '''
+    n_int, k_int = hash_mat.shape
+    data_vec = sign_mat.ravel().astype(numpy.float64) / numpy.sqrt(k_int)
+    indptr_vec = numpy.arange(0, n_int * k_int + 1, k_int)
+    s_mat = scipy.sparse.csr_matrix((data_vec, hash_mat.ravel(), indptr_vec), shape=(n_int, s_int))
+    return s_mat
+
+
+def osnap(a_mat, s_int, k_int=2):
+    '''
+    Sparse Embedding (OSNAP) for Dense or Sparse Matrix
+
+    Input
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A;
+        s_int: sketch size;
+        k_int: number of nonzeros in each row of S;
+               k=1 is count sketch; larger k needs a smaller s for the same accuracy.
+    Output
+        sketch_a_mat: m-by-s matrix A * S.
+        Here S is n-by-s sketching matrix.
+    '''
+    m_int, n_int = a_mat.shape
+    hash_mat, sign_mat = osnap_hash(n_int, s_int, k_int)
+    s_mat = osnap_mat(hash_mat, sign_mat, s_int)
+    sketch_a_mat = cs.countsketch_apply(a_mat, s_mat)
+    return sketch_a_mat
+
+
+def osnap2(a_mat, b_mat, s_int, k_int=2):
+    '''
+    Sparse Embedding (OSNAP) for 2 Dense or Sparse Matrices
+
+    Input
+        a_mat: m-by-n dense matrix or scipy.sparse matrix A;
+        b_mat: d-by-n dense matrix or scipy.sparse matrix B;
+        s_int: sketch size;
+        k_int: number of nonzeros in each row of S.
+    Output
+        sketch_a_mat: m-by-s matrix A * S;
+        sketch_b_mat: d-by-s matrix B * S.
+        Here S is n-by-s sketching matrix
+    '''
+    m_int, n_int = a_mat.shape
+    hash_mat, sign_mat = osnap_hash(n_int, s_int, k_int)
+    s_mat = osnap_mat(hash_mat, sign_mat, s_int)
+    sketch_a_mat = cs.countsketch_apply(a_mat, s_mat)
+    sketch_b_mat = cs.countsketch_apply(b_mat, s_mat)
+    return sketch_a_mat, sketch_b_mat
@@ -0,0 +1,43 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def num_workers(workers):
+    '''
+    Number of Threads
+
+    Input
+        workers: None, a positive integer, or a negative integer;
+                None means 1;
+                a negative value counts back from the number of CPUs (-1 means all CPUs),
+                as the "workers" argument of scipy.fft.
+    Output
+        the number of threads (>= 1).
+    '''
+    if workers is None:
+        return 1
+    if workers < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + workers)
+    return max(1, workers)
+
+
+def map_blocks(func, start_list, workers=None):
+    '''
+    Process Row Blocks with A Thread Pool
+
+    Input
+        func: function of the first row of a block; it writes its result into a shared output;
+        start_list: the first rows of the blocks;
+        workers: number of threads (see num_workers).
+
+    NumPy, scipy.sparse and scipy.fft release the GIL in their compiled kernels,
+    so the blocks are processed in parallel.
+    Exceptions raised in a thread are re-raised here.
+    '''
+    workers = num_workers(workers)
+    if workers == 1 or len(start_list) <= 1:
+        for i in start_list:
+            func(i)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(func, start_list))
@@ -1,15 +1,44 @@
 import numpy
+import scipy.fft
+import scipy.sparse
+
+import sketch.parallel as parallel
+
+# number of entries of a row block of A that is transformed at a time
+BLOCK_ENTRIES = 2 ** 22
 
 # Remark:
 #   Real FFT with even n is faster than real FFT with odd n.
 #   I do not know why.
 
-def realfft_col(a_mat):
+def split_workers(num_blk_int, workers):
+    '''
+    Split the Threads between Row Blocks and the FFT
+    
+    Input
+        num_blk_int: number of row blocks of A;
+        workers: number of threads (see parallel.num_workers).
+    
+    Output
+        pool_workers: number of threads that process row blocks in parallel;
+        fft_workers: number of threads used inside each FFT.
+    
+    Row blocks are processed in parallel if there are enough of them;
+    otherwise (few but long rows) the threads are used inside scipy.fft.
+    '''
+    workers = parallel.num_workers(workers)
+    if num_blk_int >= workers:
+        return workers, 1
+    return 1, workers
+
+
+def realfft_col(a_mat, workers=None):
     '''
     Real Fast Fourier Transform (FFT) Independently Applied to Each Column of A
     
     Input
-        a_mat: n-by-d dense NumPy matrix.
+        a_mat: n-by-d dense NumPy matrix;
+        workers: number of threads used by scipy.fft (optional).
     
     Output
         c_mat: n-by-d matrix C = F * A.
@@ -17,29 +46,32 @@ def realfft_col(a_mat):
     
     Notice that $C^T * C = A^T * A$; 
     however, $C * C^T = A * A^T$ is not true.
+    
+    The rows of C are arranged as the columns of realfft_row.
     '''
-    n_int = a_mat.shape[0]
-    fft_mat = numpy.fft.fft(a_mat, n=None, axis=0) / numpy.sqrt(n_int)
-    if n_int % 2 == 1:
-        cutoff_int = int((n_int+1) / 2)
-        idx_real_vec = list(range(1, cutoff_int))
-        idx_imag_vec = list(range(cutoff_int, n_int))
-    else:
-        cutoff_int = int(n_int/2)
-        idx_real_vec = list(range(1, cutoff_int))
-        idx_imag_vec = list(range(cutoff_int+1, n_int))
-    c_mat = fft_mat.real
-    c_mat[idx_real_vec, :] *= numpy.sqrt(2)
-    c_mat[idx_imag_vec, :] = fft_mat[idx_imag_vec, :].imag * numpy.sqrt(2)
+    n_int, d_int = a_mat.shape
+    half_int = n_int // 2
+    pair_int = (n_int - 1) // 2
+    fft_mat = scipy.fft.rfft(a_mat, axis=0, workers=workers)
+    scale_real = 1 / numpy.sqrt(n_int)
+    c_mat = numpy.empty((n_int, d_int))
+    c_mat[0, :] = fft_mat[0, :].real * scale_real
+    c_mat[1:pair_int+1, :] = fft_mat[1:pair_int+1, :].real
+    c_mat[1:pair_int+1, :] *= scale_real * numpy.sqrt(2)
+    if n_int % 2 == 0:
+        c_mat[half_int, :] = fft_mat[half_int, :].real * scale_real
+    c_mat[n_int-pair_int:, :] = fft_mat[pair_int:0:-1, :].imag
+    c_mat[n_int-pair_int:, :] *= - scale_real * numpy.sqrt(2)
     return c_mat
 
 
-def realfft_row(a_mat):
+def realfft_row(a_mat, workers=None):
     '''
     Real Fast Fourier Transform (FFT) Independently Applied to Each Row of A
     
     Input
-        a_mat: m-by-n dense NumPy matrix.
+        a_mat: m-by-n dense NumPy matrix;
+        workers: number of threads used by scipy.fft (optional).
     
     Output
         c_mat: m-by-n matrix C = A * F.
@@ -47,52 +79,216 @@ def realfft_row(a_mat):
     
     Notice that $C * C^T = A * A^T$; 
     however, $C^T * C = A^T * A$ is not true.
+    
+    Let X = scipy.fft.rfft(A) / sqrt(n) (the non-negative frequencies 0, 1, ..., floor(n/2)).
+    The columns of C are
+        C[:, 0] = Re X[:, 0];
+        C[:, k] = sqrt(2) * Re X[:, k] for 0 < k < n/2;
+        C[:, n/2] = Re X[:, n/2] if n is even;
+        C[:, n-k] = - sqrt(2) * Im X[:, k] for 0 < k < n/2,
+    which is the same layout as taking the real and imaginary parts of the full complex FFT.
     '''
-    n_int = a_mat.shape[1]
-    fft_mat = numpy.fft.fft(a_mat, n=None, axis=1) / numpy.sqrt(n_int)
-    if n_int % 2 == 1:
-        cutoff_int = int((n_int+1) / 2)
-        idx_real_vec = list(range(1, cutoff_int))
-        idx_imag_vec = list(range(cutoff_int, n_int))
-    else:
-        cutoff_int = int(n_int/2)
-        idx_real_vec = list(range(1, cutoff_int))
-        idx_imag_vec = list(range(cutoff_int+1, n_int))
-    c_mat = fft_mat.real
-    c_mat[:, idx_real_vec] *= numpy.sqrt(2)
-    c_mat[:, idx_imag_vec] = fft_mat[:, idx_imag_vec].imag * numpy.sqrt(2)
+    m_int, n_int = a_mat.shape
+    half_int = n_int // 2
+    # number of frequencies (except 0 and n/2) that give two real columns each
+    pair_int = (n_int - 1) // 2
+    fft_mat = scipy.fft.rfft(a_mat, axis=1, workers=workers)
+    scale_real = 1 / numpy.sqrt(n_int)
+    c_mat = numpy.empty((m_int, n_int))
+    c_mat[:, 0] = fft_mat[:, 0].real * scale_real
+    c_mat[:, 1:pair_int+1] = fft_mat[:, 1:pair_int+1].real
+    c_mat[:, 1:pair_int+1] *= scale_real * numpy.sqrt(2)
+    if n_int % 2 == 0:
+        c_mat[:, half_int] = fft_mat[:, half_int].real * scale_real
+    c_mat[:, n_int-pair_int:] = fft_mat[:, pair_int:0:-1].imag
+    c_mat[:, n_int-pair_int:] *= - scale_real * numpy.sqrt(2)
     return c_mat
 
     
-def srft(a_mat, s_int):
+def realfft_entries(t_vec, j_vec, n_int):
     '''
-    Subsampled Randomized Fourier Transform (SRFT) for Dense Matrix
+    Entries of the Orthogonal Real FFT Matrix
+
+    Input
+        t_vec: row indices in {0, ..., n-1};
+        j_vec: column indices in {0, ..., n-1};
+        n_int: size of the transform.
+    Output
+        f_mat: len(t)-by-len(j) matrix containing F[t, j],
+        where F is the n-by-n orthogonal real FFT matrix (realfft_row(A) = A * F).
+
+    Column j <= n/2 is a cosine and column j > n/2 is a sine of frequency n-j.
+    The phases are reduced modulo n in integer arithmetic, so they are exact for large n.
+    '''
+    t_vec = numpy.asarray(t_vec, dtype=numpy.int64)
+    j_vec = numpy.asarray(j_vec, dtype=numpy.int64)
+    half_int = n_int // 2
+    freq_vec = numpy.where(j_vec <= half_int, j_vec, n_int - j_vec)
+    phase_mat = (numpy.outer(t_vec, freq_vec) % n_int) * (2 * numpy.pi / n_int)
+    scale_vec = numpy.where((freq_vec == 0) | (2 * freq_vec == n_int), 1.0, numpy.sqrt(2)) / numpy.sqrt(n_int)
+    f_mat = numpy.where(j_vec <= half_int, numpy.cos(phase_mat), numpy.sin(phase_mat))
+    f_mat *= scale_vec.reshape(1, len(j_vec))
+    return f_mat
+
+
+def srft_apply(a_mat, sign_vec, idx_vec, workers=None):
+    '''
+    Apply SRFT with Given Random Signs and Sampled Indices
+
+    Input
+        a_mat: m-by-n dense NumPy matrix or scipy.sparse matrix;
+        sign_vec: n-dim vector of random signs (the diagonal of D);
+        idx_vec: s-dim vector of sampled column indices (the sampling matrix P);
+        workers: number of threads (optional, see split_workers).
+
+    Output
+        c_mat: m-by-s dense sketch C = A * D * F * P * sqrt(n / s).
+
+    The rows of A are transformed in blocks of about BLOCK_ENTRIES entries,
+    so a sparse A is never densified as a whole.
+    '''
+    m_int, n_int = a_mat.shape
+    s_int = len(idx_vec)
+    is_sparse_bool = scipy.sparse.issparse(a_mat)
+    if is_sparse_bool:
+        a_mat = scipy.sparse.csr_matrix(a_mat)
+    blk_int = max(1, BLOCK_ENTRIES // n_int)
+    start_list = list(range(0, m_int, blk_int))
+    pool_workers, fft_workers = split_workers(len(start_list), workers)
+    c_mat = numpy.zeros((m_int, s_int))
+    def sketch_block(i):
+        a_blk_mat = a_mat[i:i+blk_int, :]
+        if is_sparse_bool:
+            a_blk_mat = a_blk_mat.toarray()
+        a_blk_mat = realfft_row(a_blk_mat * sign_vec.reshape(1, n_int), fft_workers)
+        c_mat[i:i+blk_int, :] = a_blk_mat[:, idx_vec]
+    parallel.map_blocks(sketch_block, start_list, pool_workers)
+    c_mat *= numpy.sqrt(n_int / s_int)
+    return c_mat
+
+
+def pruned_size(n_int, s_int):
+    '''
+    Sizes Used by the Pruned SRFT
     
     Input
-        a_mat: m-by-n dense NumPy matrix;
+        n_int: number of columns of A;
         s_int: sketch size.
     
+    Output
+        l_int: length of the short FFTs, the smallest power of two no smaller than s;
+        q_int: number of short FFTs, q = ceil(n / l);
+        p_int: length of the zero-padded rows of A, p = l * q.
+    '''
+    l_int = 1 << max(s_int - 1, 0).bit_length()
+    q_int = -(-n_int // l_int)
+    p_int = l_int * q_int
+    return l_int, q_int, p_int
+
+
+def srft_pruned_apply(a_mat, sign_vec, idx_vec, workers=None):
+    '''
+    Apply Pruned SRFT with Given Random Signs and Sampled Indices
+    
+    Input
+        a_mat: m-by-n dense NumPy matrix or scipy.sparse matrix;
+        sign_vec: n-dim vector of random signs (the diagonal of D);
+        idx_vec: s-dim vector of sampled column indices in {0, ..., p-1} (the sampling matrix P),
+                where p is given by pruned_size(n, s);
+        workers: number of threads (optional, see split_workers).
+    
+    Output
+        c_mat: m-by-s dense sketch C = [A * D, 0] * F * P * sqrt(p / s).
+        Here F is the p-by-p orthogonal real FFT matrix (see realfft_row).
+    
+    Only the s sampled outputs of the real FFT are computed.
+    Write t = j * q + r (0 <= j < l, 0 <= r < q) for the padded column index;
+    the k-th Fourier coefficient is
+        X_k = sum_r exp(-2 pi i k r / p) * Y[k mod l, r],
+    where Y[:, r] is the length-l FFT of the r-th decimated subsequence of the row.
+    The q short FFTs cost O(p * log(s)) per row, and combining them for the s sampled frequencies costs O(s * q) = O(p),
+    so the cost is O(m * n * log(s)) instead of O(m * n * log(n)).
+    '''
+    m_int, n_int = a_mat.shape
+    s_int = len(idx_vec)
+    l_int, q_int, p_int = pruned_size(n_int, s_int)
+    half_int = p_int // 2
+    
+    # the sampled real outputs are the real or the imaginary parts of these frequencies
+    freq_vec = numpy.where(idx_vec <= half_int, idx_vec, p_int - idx_vec)
+    is_imag_vec = idx_vec > half_int
+    scale_vec = numpy.where((freq_vec == 0) | (2 * freq_vec == p_int), 1.0, numpy.sqrt(2))
+    scale_vec = numpy.where(is_imag_vec, -scale_vec, scale_vec) * numpy.sqrt(p_int / s_int) / numpy.sqrt(p_int)
+    
+    # the short FFTs are real, so only the residues 0, ..., l/2 are computed;
+    # for the other residues sum_r conj(Y[l-k, r]) * w_r = conj(sum_r Y[l-k, r] * conj(w_r))
+    res_vec = freq_vec % l_int
+    is_conj_vec = res_vec > l_int // 2
+    res_vec = numpy.where(is_conj_vec, l_int - res_vec, res_vec)
+    twiddle_mat = numpy.exp(-2j * numpy.pi * numpy.outer(freq_vec, numpy.arange(q_int)) / p_int)
+    twiddle_mat[is_conj_vec, :] = twiddle_mat[is_conj_vec, :].conj()
+    imag_sign_vec = numpy.where(is_conj_vec, -1.0, 1.0)
+    
+    is_sparse_bool = scipy.sparse.issparse(a_mat)
+    if is_sparse_bool:
+        a_mat = scipy.sparse.csr_matrix(a_mat)
+    blk_int = max(1, BLOCK_ENTRIES // p_int)
+    start_list = list(range(0, m_int, blk_int))
+    pool_workers, fft_workers = split_workers(len(start_list), workers)
+    c_mat = numpy.zeros((m_int, s_int))
+    def sketch_block(i):
+        a_blk_mat = a_mat[i:i+blk_int, :]
+        if is_sparse_bool:
+            a_blk_mat = a_blk_mat.toarray()
+        b_int = a_blk_mat.shape[0]
+        x_mat = numpy.zeros((b_int, p_int))
+        numpy.multiply(a_blk_mat, sign_vec.reshape(1, n_int), out=x_mat[:, 0:n_int])
+        y_mat = scipy.fft.rfft(x_mat.reshape(b_int, l_int, q_int), axis=1, workers=fft_workers)
+        # s-by-b-by-q times s-by-q-by-1: one short dot product per sampled frequency and row
+        y_mat = y_mat[:, res_vec, :].transpose(1, 0, 2)
+        fft_mat = numpy.matmul(y_mat, twiddle_mat[:, :, None])[:, :, 0].T
+        c_mat[i:i+blk_int, :] = numpy.where(is_imag_vec, fft_mat.imag * imag_sign_vec, fft_mat.real)
+    parallel.map_blocks(sketch_block, start_list, pool_workers)
+    c_mat *= scale_vec.reshape(1, s_int)
+    return c_mat
+
+
+def srft(a_mat, s_int, pruned=False, workers=None):
+    '''
+    Subsampled Randomized Fourier Transform (SRFT) for Dense or Sparse Matrix
+    
+    Input
+        a_mat: m-by-n dense NumPy matrix or scipy.sparse matrix;
+        s_int: sketch size;
+        pruned: if True, only the s sampled frequencies are computed (see srft_pruned_apply);
+                recommended when s << n;
+        workers: number of threads (optional, see split_workers).
+    
     Output
         c_mat: m-by-s sketch C = A * S.
         Here S is the sketching matrix (not explicitly formed)
     '''
     n_int = a_mat.shape[1]
     sign_vec = numpy.random.choice(2, n_int) * 2 - 1
+    if pruned:
+        p_int = pruned_size(n_int, s_int)[2]
+        idx_vec = numpy.random.choice(p_int, s_int, replace=False)
+        return srft_pruned_apply(a_mat, sign_vec, idx_vec, workers)
     idx_vec = numpy.random.choice(n_int, s_int, replace=False)
-    a_mat = a_mat * sign_vec.reshape(1, n_int)
-    a_mat = realfft_row(a_mat)
-    c_mat = a_mat[:, idx_vec] * numpy.sqrt(n_int / s_int)
+    c_mat = srft_apply(a_mat, sign_vec, idx_vec, workers)
     return c_mat
 
     
-def srft2(a_mat, b_mat, s_int):
+def srft2(a_mat, b_mat, s_int, pruned=False, workers=None):
     '''
-    Subsampled Randomized Fourier Transform (SRFT) for Dense Matrix
+    Subsampled Randomized Fourier Transform (SRFT) for Dense or Sparse Matrix
     
     Input
-        a_mat: m-by-n dense NumPy matrix;
-        b_mat: d-by-n dense NumPy matrix;
-        s_int: sketch size.
+        a_mat: m-by-n dense NumPy matrix or scipy.sparse matrix;
+        b_mat: d-by-n dense NumPy matrix or scipy.sparse matrix;
+        s_int: sketch size;
+        pruned: if True, only the s sampled frequencies are computed (see srft_pruned_apply);
+        workers: number of threads (optional, see split_workers).
     
     Output
         c_mat: m-by-s sketch C = A * S;
@@ -101,13 +297,13 @@ def srft2(a_mat, b_mat, s_int):
     '''
     n_int = a_mat.shape[1]
     sign_vec = numpy.random.choice(2, n_int) * 2 - 1
+    if pruned:
+        p_int = pruned_size(n_int, s_int)[2]
+        idx_vec = numpy.random.choice(p_int, s_int, replace=False)
+        c_mat = srft_pruned_apply(a_mat, sign_vec, idx_vec, workers)
+        d_mat = srft_pruned_apply(b_mat, sign_vec, idx_vec, workers)
+        return c_mat, d_mat
     idx_vec = numpy.random.choice(n_int, s_int, replace=False)
-    
-    a_mat = a_mat * sign_vec.reshape(1, n_int)
-    a_mat = realfft_row(a_mat)
-    c_mat = a_mat[:, idx_vec] * numpy.sqrt(n_int / s_int)
-    
-    b_mat = b_mat * sign_vec.reshape(1, n_int)
-    b_mat = realfft_row(b_mat)
-    d_mat = b_mat[:, idx_vec] * numpy.sqrt(n_int / s_int)
+    c_mat = srft_apply(a_mat, sign_vec, idx_vec, workers)
+    d_mat = srft_apply(b_mat, sign_vec, idx_vec, workers)
     return c_mat, d_mat
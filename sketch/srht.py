@@ -0,0 +1,163 @@
+import numpy
+import scipy.linalg
+import scipy.sparse
+
+# number of entries of a row block of A that is transformed at a time
+BLOCK_ENTRIES = 2 ** 22
+
+# H is applied as a Kronecker product of Hadamard matrices no larger than MAX_FACTOR
+MAX_FACTOR = 64
+
+
+def next_pow2(n_int):
+    '''
+    The smallest power of two that is no smaller than n_int
+    '''
+    return 1 << max(n_int - 1, 0).bit_length()
+
+
+def fwht_row(a_mat):
+    '''
+    Fast Walsh-Hadamard Transform (FWHT) Independently Applied to Each Row of A
+
+    Input
+        a_mat: m-by-n dense NumPy matrix.
+
+    Output
+        c_mat: m-by-p matrix C = [A, 0] * H, where p is the smallest power of two no smaller than n.
+        Here H is the p-by-p orthogonal Walsh-Hadamard matrix (not explicitly formed),
+        and A is padded with zero columns.
+
+    Notice that $C * C^T = A * A^T$.
+    The Walsh-Hadamard matrix is real, so no complex arithmetic is involved.
+
+    The butterfly stages are grouped using H_p = H_{f_k} kron ... kron H_{f_1},
+    where each factor f_i <= MAX_FACTOR is a power of two.
+    Each factor is one (batched) matrix product along one axis of the reshaped A,
+    so A is passed over only a few times instead of log2(p) times.
+    '''
+    m_int, n_int = a_mat.shape
+    p_int = next_pow2(n_int)
+    c_mat = numpy.zeros((m_int, p_int))
+    c_mat[:, 0:n_int] = a_mat
+
+    # split log2(p) into nearly equal exponents, each at most log2(MAX_FACTOR)
+    log_p_int = p_int.bit_length() - 1
+    log_max_int = MAX_FACTOR.bit_length() - 1
+    num_factor_int = max(1, -(-log_p_int // log_max_int))
+    log_f_list = [log_p_int // num_factor_int + (1 if i < log_p_int % num_factor_int else 0)
+                  for i in range(num_factor_int)]
+
+    # r_int is the product of the factors already applied (the lower bits of the column index)
+    r_int = 1
+    for log_f_int in log_f_list:
+        f_int = 1 << log_f_int
+        q_int = p_int // (f_int * r_int)
+        h_mat = scipy.linalg.hadamard(f_int).astype(numpy.float64)
+        if r_int == 1:
+            c_mat = numpy.dot(c_mat.reshape(m_int * q_int, f_int), h_mat)
+        else:
+            c_mat = numpy.matmul(h_mat, c_mat.reshape(m_int * q_int, f_int, r_int))
+        c_mat = c_mat.reshape(m_int, p_int)
+        r_int *= f_int
+
+    c_mat /= numpy.sqrt(p_int)
+    return c_mat
+
+
+def hadamard_entries(t_vec, j_vec, p_int):
+    '''
+    Entries of the Orthogonal Walsh-Hadamard Matrix
+
+    Input
+        t_vec: row indices in {0, ..., p-1};
+        j_vec: column indices in {0, ..., p-1};
+        p_int: size of the transform (a power of two).
+    Output
+        h_mat: len(t)-by-len(j) matrix containing H[t, j] = (-1)^{popcount(t AND j)} / sqrt(p),
+        where H is the p-by-p orthogonal Walsh-Hadamard matrix (fwht_row(A) = [A, 0] * H).
+    '''
+    x_mat = numpy.bitwise_and.outer(numpy.asarray(t_vec, dtype=numpy.int64),
+                                    numpy.asarray(j_vec, dtype=numpy.int64))
+    # parity of the number of ones
+    shift_int = 32
+    while shift_int > 0:
+        x_mat ^= x_mat >> shift_int
+        shift_int //= 2
+    h_mat = (1 - 2 * (x_mat & 1)) / numpy.sqrt(p_int)
+    return h_mat
+
+
+def srht_apply(a_mat, sign_vec, idx_vec):
+    '''
+    Apply SRHT with Given Random Signs and Sampled Indices
+
+    Input
+        a_mat: m-by-n dense NumPy matrix or scipy.sparse matrix;
+        sign_vec: n-dim vector of random signs (the diagonal of D);
+        idx_vec: s-dim vector of sampled column indices in {0, ..., p-1} (the sampling matrix P),
+                where p is the smallest power of two no smaller than n.
+
+    Output
+        c_mat: m-by-s dense sketch C = [A * D, 0] * H * P * sqrt(p / s).
+
+    The rows of A are transformed in blocks of about BLOCK_ENTRIES entries,
+    so a sparse A is never densified as a whole.
+    '''
+    m_int, n_int = a_mat.shape
+    p_int = next_pow2(n_int)
+    s_int = len(idx_vec)
+    is_sparse_bool = scipy.sparse.issparse(a_mat)
+    if is_sparse_bool:
+        a_mat = scipy.sparse.csr_matrix(a_mat)
+    blk_int = max(1, BLOCK_ENTRIES // p_int)
+    c_mat = numpy.zeros((m_int, s_int))
+    for i in range(0, m_int, blk_int):
+        a_blk_mat = a_mat[i:i+blk_int, :]
+        if is_sparse_bool:
+            a_blk_mat = a_blk_mat.toarray()
+        a_blk_mat = fwht_row(a_blk_mat * sign_vec.reshape(1, n_int))
+        c_mat[i:i+blk_int, :] = a_blk_mat[:, idx_vec]
+    c_mat *= numpy.sqrt(p_int / s_int)
+    return c_mat
+
+
+def srht(a_mat, s_int):
+    '''
+    Subsampled Randomized Hadamard Transform (SRHT) for Dense or Sparse Matrix
+
+    Input
+        a_mat: m-by-n dense NumPy matrix or scipy.sparse matrix;
+        s_int: sketch size.
+
+    Output
+        c_mat: m-by-s sketch C = A * S.
+        Here S is the sketching matrix (not explicitly formed)
+    '''
+    n_int = a_mat.shape[1]
+    sign_vec = numpy.random.choice(2, n_int) * 2 - 1
+    idx_vec = numpy.random.choice(next_pow2(n_int), s_int, replace=False)
+    c_mat = srht_apply(a_mat, sign_vec, idx_vec)
+    return c_mat
+
+
+def srht2(a_mat, b_mat, s_int):
+    '''
+    Subsampled Randomized Hadamard Transform (SRHT) for Dense or Sparse Matrix
+
+    Input
+        a_mat: m-by-n dense NumPy matrix or scipy.sparse matrix;
+        b_mat: d-by-n dense NumPy matrix or scipy.sparse matrix;
+        s_int: sketch size.
+
+    Output
+        c_mat: m-by-s sketch C = A * S;
+        d_mat: d-by-s sketch D = B * S.
+        Here S is the sketching matrix (not explicitly formed)
+    '''
+    n_int = a_mat.shape[1]
+    sign_vec = numpy.random.choice(2, n_int) * 2 - 1
+    idx_vec = numpy.random.choice(next_pow2(n_int), s_int, replace=False)
+    c_mat = srht_apply(a_mat, sign_vec, idx_vec)
+    d_mat = srht_apply(b_mat, sign_vec, idx_vec)
+    return c_mat, d_mat
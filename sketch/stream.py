@@ -0,0 +1,171 @@
+import numpy
+
+import sketch.operators as op
+
+# default number of rows of B in a chunk
+CHUNK_ROWS = 8192
+
+
+def iter_rows(b_mat, chunk_rows=CHUNK_ROWS, col_idx=None):
+    '''
+    Consecutive Row Chunks of A Matrix
+
+    Input
+        b_mat: n-by-d array, e.g. numpy.load(file_name, mmap_mode='r');
+        chunk_rows: number of rows in a chunk;
+        col_idx: columns to keep (optional), e.g. slice(1, None).
+    Output
+        a generator of chunk_rows-by-d dense chunks (the last chunk may be smaller).
+
+    Only one chunk is copied into memory at a time.
+    '''
+    n_int = b_mat.shape[0]
+    for i in range(0, n_int, chunk_rows):
+        if col_idx is None:
+            chunk_mat = b_mat[i:i+chunk_rows]
+        else:
+            chunk_mat = b_mat[i:i+chunk_rows, col_idx]
+        yield numpy.array(chunk_mat, dtype=numpy.float64)
+
+
+def iter_npy(file_name, chunk_rows=CHUNK_ROWS, col_idx=None):
+    '''
+    Consecutive Row Chunks of A .npy File
+
+    Input
+        file_name: path of a .npy file containing a C-ordered n-by-d array;
+        chunk_rows: number of rows in a chunk;
+        col_idx: columns to keep (optional), e.g. slice(1, None).
+    Output
+        a generator of chunk_rows-by-d dense chunks (the last chunk may be smaller).
+
+    Unlike a memory map, the chunks are read with ordinary file reads,
+    so pages of the file that were already processed are not counted in the resident memory.
+    '''
+    with open(file_name, 'rb') as f:
+        version = numpy.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(f)
+        if fortran_order or len(shape) != 2:
+            raise ValueError('iter_npy requires a C-ordered 2D array.')
+        n_int, d_int = shape
+        for i in range(0, n_int, chunk_rows):
+            c_int = min(chunk_rows, n_int - i)
+            chunk_mat = numpy.fromfile(f, dtype=dtype, count=c_int*d_int).reshape(c_int, d_int)
+            if col_idx is not None:
+                chunk_mat = chunk_mat[:, col_idx]
+            yield numpy.array(chunk_mat, dtype=numpy.float64)
+
+
+def sketch_chunks(sketch_op, chunk_iter):
+    '''
+    Streaming Sketch S^T * B of Row Chunks
+
+    Input
+        sketch_op: operators.SketchOperator representing the n-by-s matrix S;
+        chunk_iter: iterable of dense or sparse chunks of consecutive rows of an n-by-d matrix B,
+                    e.g. iter_rows or iter_npy.
+    Output
+        c_mat: s-by-d sketch S^T * B.
+
+    The sketch is accumulated as the sum of S[chunk, :]^T * B[chunk, :],
+    so the memory is O(s * d) plus one chunk.
+    '''
+    c_mat = None
+    start_int = 0
+    for chunk_mat in chunk_iter:
+        part_mat = sketch_op.apply_left_rows(chunk_mat, start_int)
+        if c_mat is None:
+            c_mat = part_mat
+        else:
+            c_mat += part_mat
+        start_int += chunk_mat.shape[0]
+    if start_int != sketch_op.n_int:
+        raise ValueError('The chunks contain ' + str(start_int) + ' rows, but S has ' + str(sketch_op.n_int) + ' rows.')
+    return c_mat
+
+
+def sketch_source(sketch_op, b_src, chunk_rows=CHUNK_ROWS):
+    '''
+    Streaming Sketch of An Array or An Iterable of Row Chunks
+
+    Input
+        sketch_op: operators.SketchOperator;
+        b_src: n-by-d array (e.g. a memory map) or iterable of row chunks of B;
+        chunk_rows: number of rows in a chunk if b_src is an array.
+    Output
+        c_mat: m-by-s sketch A * S, where A = B^T.
+        (This is what countsketch, gaussian_proj and srft return for A.)
+    '''
+    if hasattr(b_src, 'shape'):
+        b_src = iter_rows(b_src, chunk_rows)
+    c_mat = sketch_chunks(sketch_op, b_src).T
+    return c_mat
+
+
+def num_rows(b_src, n_int):
+    '''
+    The number of rows of B; required if b_src is an iterable of chunks.
+    '''
+    if hasattr(b_src, 'shape'):
+        return b_src.shape[0]
+    if n_int is None:
+        raise ValueError('n_int must be given if the chunks are streamed from an iterable.')
+    return n_int
+
+
+def countsketch_stream(b_src, s_int, n_int=None, seed=None, chunk_rows=CHUNK_ROWS):
+    '''
+    Streaming Count Sketch
+
+    Input
+        b_src: n-by-d array (e.g. a memory map) or iterable of row chunks of B;
+        s_int: sketch size;
+        n_int: number of rows of B (required if b_src is an iterable);
+        seed: seed of S (see operators.SketchOperator);
+        chunk_rows: number of rows in a chunk if b_src is an array.
+    Output
+        c_mat: d-by-s sketch A * S, where A = B^T, as countsketch(A, s).
+    '''
+    sketch_op = op.CountSketchOperator(num_rows(b_src, n_int), s_int, seed)
+    return sketch_source(sketch_op, b_src, chunk_rows)
+
+
+def gaussian_stream(b_src, s_int, n_int=None, seed=None, chunk_rows=CHUNK_ROWS):
+    '''
+    Streaming Gaussian Projection
+
+    Input
+        b_src: n-by-d array (e.g. a memory map) or iterable of row chunks of B;
+        s_int: sketch size;
+        n_int: number of rows of B (required if b_src is an iterable);
+        seed: seed of S (see operators.SketchOperator);
+        chunk_rows: number of rows in a chunk if b_src is an array.
+    Output
+        c_mat: d-by-s sketch A * S, where A = B^T, as gaussian_proj(A, s).
+    '''
+    sketch_op = op.GaussianOperator(num_rows(b_src, n_int), s_int, seed)
+    return sketch_source(sketch_op, b_src, chunk_rows)
+
+
+def srft_stream(b_src, s_int, n_int=None, seed=None, chunk_rows=CHUNK_ROWS):
+    '''
+    Streaming Subsampled Randomized Fourier Transform (SRFT)
+
+    Input
+        b_src: n-by-d array (e.g. a memory map) or iterable of row chunks of B;
+        s_int: sketch size;
+        n_int: number of rows of B (required if b_src is an iterable);
+        seed: seed of S (see operators.SketchOperator);
+        chunk_rows: number of rows in a chunk if b_src is an array.
+    Output
+        c_mat: d-by-s sketch A * S, where A = B^T, as srft(A, s).
+
+    An FFT needs the whole row of A, so the sampled columns of the real FFT matrix
+    are formed chunk by chunk instead (see operators.SRFTOperator.rows);
+    the cost is O(n * s * d) rather than O(n * log(n) * d).
+    '''
+    sketch_op = op.SRFTOperator(num_rows(b_src, n_int), s_int, seed)
+    return sketch_source(sketch_op, b_src, chunk_rows)
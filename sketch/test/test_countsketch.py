@@ -1,4 +1,5 @@
 import numpy
+import scipy.sparse
 import unittest
 import sys
 
@@ -121,6 +122,41 @@ class TestCountSketch(unittest.TestCase):
         self.assertTrue(err2xy < err1xy)
         self.assertTrue(err3xy < err2xy)
         
+    def test_sparse(self):
+        '''
+        Test scipy.sparse input of the function "countsketch"
+        With the same random seed, the sketch of a sparse matrix
+        must be the same as the sketch of its dense copy.
+        '''
+        a_mat = x_mat * (numpy.random.rand(m_int, n_int) < 0.05)
+        a_sparse_mat = scipy.sparse.csr_matrix(a_mat)
+        s_int = 400
+        
+        numpy.random.seed(0)
+        c1_mat = cs.countsketch(a_mat, s_int)
+        numpy.random.seed(0)
+        c2_mat = cs.countsketch(a_sparse_mat, s_int)
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        
+        numpy.random.seed(0)
+        c1_mat, d1_mat = cs.countsketch2(a_mat, y_mat, s_int)
+        numpy.random.seed(0)
+        c2_mat, d2_mat = cs.countsketch2(a_sparse_mat, scipy.sparse.csr_matrix(y_mat), s_int)
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        self.assertTrue(numpy.allclose(d1_mat, d2_mat))
+        
+    def test_workers(self):
+        '''
+        Test the multi-threaded "countsketch"
+        With the same random seed, the sketch must not depend on the number of threads.
+        '''
+        s_int = 400
+        numpy.random.seed(0)
+        c1_mat = cs.countsketch(x_mat, s_int)
+        for workers in [2, 3, -1]:
+            numpy.random.seed(0)
+            c2_mat = cs.countsketch(x_mat, s_int, workers=workers)
+            self.assertTrue(numpy.allclose(c1_mat, c2_mat))
         
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
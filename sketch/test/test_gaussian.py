@@ -1,4 +1,5 @@
 import numpy
+import scipy.sparse
 import unittest
 import sys
 
@@ -121,6 +122,44 @@ class TestCountSketch(unittest.TestCase):
         self.assertTrue(err2xy < err1xy)
         self.assertTrue(err3xy < err2xy)
         
+    def test_sparse(self):
+        '''
+        Test scipy.sparse input of the function "gaussian_proj"
+        With the same random seed, the sketch of a sparse matrix
+        must be the same as the sketch of its dense copy.
+        '''
+        a_mat = x_mat * (numpy.random.rand(m_int, n_int) < 0.05)
+        a_sparse_mat = scipy.sparse.csr_matrix(a_mat)
+        s_int = 400
+        
+        numpy.random.seed(0)
+        c1_mat = gp.gaussian_proj(a_mat, s_int)
+        numpy.random.seed(0)
+        c2_mat = gp.gaussian_proj(a_sparse_mat, s_int)
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        
+    def test_blocked(self):
+        '''
+        Test the blocked mode of "gaussian_proj"
+        S is regenerated from the same seed tile by tile,
+        so the sketch must not depend on the memory budget.
+        '''
+        s_int = 400
+        numpy.random.seed(0)
+        c1_mat = gp.gaussian_proj(x_mat, s_int, memory_budget=2**20)
+        numpy.random.seed(0)
+        c2_mat = gp.gaussian_proj(x_mat, s_int, memory_budget=2**30)
+        self.assertEqual(c1_mat.shape[0], m_int)
+        self.assertEqual(c1_mat.shape[1], s_int)
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        
+        numpy.random.seed(0)
+        c3_mat, d3_mat = gp.gaussian_proj2(x_mat, y_mat, s_int, memory_budget=2**20)
+        self.assertTrue(numpy.allclose(c1_mat, c3_mat))
+        
+        err = numpy.linalg.norm(xx_mat - numpy.dot(c1_mat, c1_mat.T), ord='fro') / xx_norm
+        print('Approximation error of blocked Gaussian projection for s=' + str(s_int) + ':    ' + str(err))
+        self.assertTrue(err < 1)
         
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
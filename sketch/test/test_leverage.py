@@ -1,4 +1,5 @@
 import numpy
+import scipy.sparse
 import unittest
 import sys
 
@@ -146,6 +147,44 @@ class TestCountSketch(unittest.TestCase):
         self.assertTrue(err2 < err1)
         self.assertTrue(err3 < err2)
         
+    def test_sparse(self):
+        '''
+        Test scipy.sparse input of the function "lev_approx"
+        With the same random seed, the leverage scores of a sparse matrix
+        must be the same as those of its dense copy.
+        '''
+        a_mat = x_mat * (numpy.random.rand(m_int, n_int) < 0.05)
+        a_sparse_mat = scipy.sparse.csr_matrix(a_mat)
+        
+        for sketch_type in ['count', 'srft', 'uniform']:
+            numpy.random.seed(0)
+            lev1_vec = lev.lev_approx(a_mat, sketch_type=sketch_type)
+            numpy.random.seed(0)
+            lev2_vec = lev.lev_approx(a_sparse_mat, sketch_type=sketch_type)
+            self.assertTrue(numpy.allclose(lev1_vec, lev2_vec))
+        
+    def test_qr(self):
+        '''
+        With the same sketch, the QR and SVD routes give the same leverage scores,
+        for dense and sparse A.
+        '''
+        a_sparse_mat = scipy.sparse.csr_matrix(x_mat * (numpy.random.rand(m_int, n_int) < 0.05))
+        for a_mat in [x_mat, a_sparse_mat]:
+            numpy.random.seed(0)
+            lev1_vec = lev.lev_approx(a_mat, method='svd')
+            numpy.random.seed(0)
+            lev2_vec = lev.lev_approx(a_mat, method='qr')
+            self.assertTrue(numpy.allclose(lev1_vec, lev2_vec))
+            numpy.random.seed(0)
+            lev1_vec = lev.lev_approx_fast(a_mat, method='svd')
+            numpy.random.seed(0)
+            lev2_vec = lev.lev_approx_fast(a_mat, method='qr')
+            # P * T differs by an orthogonal factor between the routes, so only the accuracy is compared
+            exact_vec = lev.lev_exact(a_mat.toarray() if scipy.sparse.issparse(a_mat) else a_mat)
+            err1 = numpy.linalg.norm(lev1_vec - exact_vec) / numpy.linalg.norm(exact_vec)
+            err2 = numpy.linalg.norm(lev2_vec - exact_vec) / numpy.linalg.norm(exact_vec)
+            print('Relative error of lev_approx_fast: svd ' + str(err1) + ',  qr ' + str(err2))
+            self.assertTrue(err2 < 2 * err1 + 0.1)
         
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import numpy
+import pickle
+import tempfile
+import unittest
+import os
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from sketch import operators, merge
+
+file_name = PyRLA_dir + 'data/YearPredictionMSD.npy'
+rawdata_mat = numpy.load(file_name, mmap_mode='r')
+n_int = 20000
+x_mat = numpy.array(rawdata_mat[0:n_int, 1:]) # n-by-d, the rows are sharded
+d_int = x_mat.shape[1]
+
+
+operator_list = [operators.GaussianOperator, operators.CountSketchOperator, operators.OSNAPOperator,
+                 operators.SRFTOperator, operators.SRHTOperator, operators.SamplingOperator]
+
+class TestMerge(unittest.TestCase):
+    def test_state(self):
+        '''
+        An operator rebuilt from its (pickled) state must apply the same S.
+        '''
+        s_int = 50
+        for op_class in operator_list:
+            op = op_class(n_int, s_int, seed=0)
+            op2 = operators.from_state(pickle.loads(pickle.dumps(op.get_state())))
+            self.assertTrue(merge.same_operator(op, op2))
+            self.assertTrue(numpy.allclose(op.apply_left(x_mat), op2.apply_left(x_mat)))
+            self.assertFalse(merge.same_operator(op, op_class(n_int, s_int, seed=1)))
+
+    def test_merge(self):
+        s_int = 50
+        bound_list = [0, 3000, 3001, 9000, 15000, n_int]
+        for op_class in operator_list:
+            op = op_class(n_int, s_int, seed=0)
+            partial_list = []
+            for i in range(len(bound_list) - 1):
+                partial = merge.PartialSketch(operators.from_state(op.get_state()))
+                partial.update(x_mat[bound_list[i]:bound_list[i+1], :], bound_list[i])
+                # partial sketches travel between processes as their states
+                partial_list.append(merge.from_state(pickle.loads(pickle.dumps(partial.get_state()))))
+            partial_list = partial_list[::-1]
+            self.assertFalse(partial_list[0].is_complete())
+            partial = merge.tree_reduce(partial_list)
+            self.assertTrue(partial.is_complete())
+            self.assertTrue(numpy.allclose(partial.result(), op.apply_left(x_mat)))
+
+    def test_error(self):
+        op = operators.CountSketchOperator(n_int, 10, seed=0)
+        partial1 = merge.PartialSketch(op).update(x_mat[0:100, :], 0)
+        partial2 = merge.PartialSketch(op).update(x_mat[50:200, :], 50)
+        with self.assertRaises(ValueError):
+            partial1.merge(partial2)
+        with self.assertRaises(ValueError):
+            partial1.result()
+        partial3 = merge.PartialSketch(operators.CountSketchOperator(n_int, 10, seed=1))
+        partial3.update(x_mat[100:200, :], 100)
+        with self.assertRaises(ValueError):
+            partial1.merge(partial3)
+
+    def test_processes(self):
+        s_int = 100
+        for op_class in [operators.GaussianOperator, operators.CountSketchOperator, operators.SRFTOperator]:
+            op = op_class(n_int, s_int, seed=0)
+            c1_mat = op.apply_left(x_mat)
+            c2_mat = merge.sketch_processes(op, x_mat, processes=2, chunk_rows=3000)
+            self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        with tempfile.TemporaryDirectory() as dir_name:
+            npy_name = os.path.join(dir_name, 'b.npy')
+            numpy.save(npy_name, numpy.array(rawdata_mat[0:n_int, :]))
+            c3_mat = merge.sketch_processes(op, npy_name, processes=2, col_idx=slice(1, None))
+        self.assertTrue(numpy.allclose(c1_mat, c3_mat))
+        # the rows are checked before B is copied into shared memory
+        with self.assertRaises(ValueError):
+            merge.sketch_processes(op_class(n_int + 1, s_int, seed=0), x_mat, processes=2)
+        
+        
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import numpy
+import scipy.sparse
+import unittest
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from sketch import operators
+
+rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
+rawdata_mat = rawdata_mat[0:50000, :]
+x_mat = rawdata_mat[:, 1:].T
+m_int, n_int = x_mat.shape
+y_mat = rawdata_mat[:, 0].reshape((1, n_int))
+d_int = y_mat.shape[0]
+
+
+xx_mat = numpy.dot(x_mat, x_mat.T)
+xx_norm = numpy.linalg.norm(xx_mat, ord='fro')
+
+operator_list = [operators.GaussianOperator, operators.CountSketchOperator, operators.OSNAPOperator,
+                 operators.SRFTOperator, operators.SRHTOperator, operators.SamplingOperator]
+
+class TestSketchOperator(unittest.TestCase):
+    def test_size(self):
+        s_int = 19
+        for op_class in operator_list:
+            op = op_class(n_int, s_int, seed=0)
+            c_mat = op.apply(x_mat)
+            self.assertEqual(c_mat.shape[0], m_int)
+            self.assertEqual(c_mat.shape[1], s_int)
+            c_mat = op.apply_left(x_mat.T)
+            self.assertEqual(c_mat.shape[0], s_int)
+            self.assertEqual(c_mat.shape[1], m_int)
+
+    def test_reuse(self):
+        '''
+        The same operator must apply the same S every time,
+        and two operators built from the same seed must be the same.
+        '''
+        s_int = 400
+        for op_class in operator_list:
+            op = op_class(n_int, s_int, seed=7)
+            c1_mat = op.apply(x_mat)
+            c2_mat = op.apply(x_mat)
+            self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+
+            c3_mat = op_class(n_int, s_int, seed=7).apply(x_mat)
+            self.assertTrue(numpy.allclose(c1_mat, c3_mat))
+
+            # A * S and S^T * A^T are transposes of each other
+            c4_mat = op.apply_left(x_mat.T)
+            self.assertTrue(numpy.allclose(c1_mat, c4_mat.T))
+
+            # the sketch of [A; Y] contains the sketches of A and Y
+            d_mat = op.apply(y_mat)
+            e_mat = op.apply(numpy.concatenate((x_mat, y_mat), axis=0))
+            self.assertTrue(numpy.allclose(e_mat[0:m_int, :], c1_mat))
+            self.assertTrue(numpy.allclose(e_mat[m_int:, :], d_mat))
+
+    def test_generator(self):
+        s_int = 100
+        for op_class in operator_list:
+            c1_mat = op_class(n_int, s_int, seed=numpy.random.default_rng(3)).apply(x_mat)
+            c2_mat = op_class(n_int, s_int, seed=3).apply(x_mat)
+            self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+
+    def test_sparse(self):
+        a_mat = x_mat * (numpy.random.rand(m_int, n_int) < 0.05)
+        a_sparse_mat = scipy.sparse.csr_matrix(a_mat)
+        s_int = 400
+        for op_class in operator_list:
+            op = op_class(n_int, s_int, seed=0)
+            self.assertTrue(numpy.allclose(op.apply(a_mat), op.apply(a_sparse_mat)))
+
+    def test_multiply_error(self):
+        '''
+        As the sketch size s_int increases, the approximation error should decrease.
+        If the test fails, say twice in 10 tests, it is fine.
+        '''
+        repeat = 5
+        for op_class in operator_list[0:5]:
+            err_list = []
+            for s_int in [150, 400, 1500]:
+                err = 0
+                for i in range(repeat):
+                    c_mat = op_class(n_int, s_int, seed=i).apply(x_mat)
+                    err += numpy.linalg.norm(xx_mat - numpy.dot(c_mat, c_mat.T), ord='fro') / xx_norm
+                err_list.append(float(err / repeat))
+            print(op_class.__name__ + ' approximation errors: ' + str(err_list))
+            self.assertTrue(err_list[1] < err_list[0])
+            self.assertTrue(err_list[2] < err_list[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
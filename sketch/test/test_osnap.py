@@ -0,0 +1,160 @@
+import numpy
+import scipy.sparse
+import unittest
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+import sketch.osnap as osnap
+
+rawdata_mat = numpy.load(PyRLA_dir + 'data/YearPredictionMSD.npy', mmap_mode='r')
+rawdata_mat = rawdata_mat[0:100000, :]
+x_mat = rawdata_mat[:, 1:].T
+m_int, n_int = x_mat.shape
+y_mat = rawdata_mat[:, 0].reshape((1, n_int))
+d_int = y_mat.shape[0]
+
+
+xx_mat = numpy.dot(x_mat, x_mat.T)
+xx_norm = numpy.linalg.norm(xx_mat, ord='fro')
+xy_mat = numpy.dot(x_mat, y_mat.T)
+xy_norm = numpy.linalg.norm(xy_mat, ord='fro')
+
+class TestOSNAP(unittest.TestCase):
+    def test_size(self):
+        s_int = 19
+        
+        c_mat = osnap.osnap(x_mat, s_int, 4)
+        self.assertEqual(c_mat.shape[0], m_int)
+        self.assertEqual(c_mat.shape[1], s_int)
+        
+        c_mat, d_mat = osnap.osnap2(x_mat, y_mat, s_int, 4)
+        self.assertEqual(c_mat.shape[0], m_int)
+        self.assertEqual(c_mat.shape[1], s_int)
+        self.assertEqual(d_mat.shape[0], d_int)
+        self.assertEqual(d_mat.shape[1], s_int)
+        
+    def test_structure(self):
+        '''
+        Each row of S has k nonzeros +1/sqrt(k) or -1/sqrt(k) in k distinct columns.
+        '''
+        s_int = 50
+        for k_int in [1, 3, 8]:
+            hash_mat, sign_mat = osnap.osnap_hash(n_int, s_int, k_int)
+            s_mat = osnap.osnap_mat(hash_mat, sign_mat, s_int).toarray()
+            self.assertTrue(numpy.all(numpy.sum(s_mat != 0, axis=1) == k_int))
+            self.assertTrue(numpy.allclose(numpy.sum(s_mat ** 2, axis=1), 1))
+        
+    def test_multiply_error(self):
+        '''
+        Test the function "osnap"
+        As the sketch size s_int increases, the approximation error should decrease.
+        If the test fails, say twice in 10 tests, it is fine.
+        '''
+        repeat = 10
+        
+        s_int1 = 150
+        err1 = 0
+        for i in range(repeat):
+            c_mat = osnap.osnap(x_mat, s_int1, 4)
+            err1 += numpy.linalg.norm(xx_mat - numpy.dot(c_mat, c_mat.T), ord='fro') / xx_norm
+        err1 /= repeat
+        
+        s_int2 = 400
+        err2 = 0
+        for i in range(repeat):
+            c_mat = osnap.osnap(x_mat, s_int2, 4)
+            err2 += numpy.linalg.norm(xx_mat - numpy.dot(c_mat, c_mat.T), ord='fro') / xx_norm
+        err2 /= repeat
+        
+        s_int3 = 1500
+        err3 = 0
+        for i in range(repeat):
+            c_mat = osnap.osnap(x_mat, s_int3, 4)
+            err3 += numpy.linalg.norm(xx_mat - numpy.dot(c_mat, c_mat.T), ord='fro') / xx_norm
+        err3 /= repeat
+        
+        print('Approximation error for s=' + str(s_int1) + ':    ' + str(err1))
+        print('Approximation error for s=' + str(s_int2) + ':    ' + str(err2))
+        print('Approximation error for s=' + str(s_int3) + ':    ' + str(err3))
+        self.assertTrue(err2 < err1)
+        self.assertTrue(err3 < err2)
+        
+        
+    def test_multiply_error2(self):
+        '''
+        Test the function "osnap2"
+        As the sketch size s_int increases, the approximation error should decrease.
+        If the test fails, say twice in 10 tests, it is fine.
+        '''
+        
+        repeat = 10
+        
+        s_int1 = 150
+        err1xx = 0
+        err1xy = 0
+        for i in range(repeat):
+            c_mat, d_mat = osnap.osnap2(x_mat, y_mat, s_int1, 4)
+            err1xx += numpy.linalg.norm(xx_mat - numpy.dot(c_mat, c_mat.T), ord='fro') / xx_norm
+            err1xy += numpy.linalg.norm(xy_mat - numpy.dot(c_mat, d_mat.T), ord='fro') / xy_norm
+        err1xx /= repeat
+        err1xy /= repeat
+        
+        s_int2 = 400
+        err2xx = 0
+        err2xy = 0
+        for i in range(repeat):
+            c_mat, d_mat = osnap.osnap2(x_mat, y_mat, s_int2, 4)
+            err2xx += numpy.linalg.norm(xx_mat - numpy.dot(c_mat, c_mat.T), ord='fro') / xx_norm
+            err2xy += numpy.linalg.norm(xy_mat - numpy.dot(c_mat, d_mat.T), ord='fro') / xy_norm
+        err2xx /= repeat
+        err2xy /= repeat
+        
+        s_int3 = 1500
+        err3xx = 0
+        err3xy = 0
+        for i in range(repeat):
+            c_mat, d_mat = osnap.osnap2(x_mat, y_mat, s_int3, 4)
+            err3xx += numpy.linalg.norm(xx_mat - numpy.dot(c_mat, c_mat.T), ord='fro') / xx_norm
+            err3xy += numpy.linalg.norm(xy_mat - numpy.dot(c_mat, d_mat.T), ord='fro') / xy_norm
+        err3xx /= repeat
+        err3xy /= repeat
+        
+        print('Approximation error xx for s=' + str(s_int1) + ':    ' + str(err1xx))
+        print('Approximation error xx for s=' + str(s_int2) + ':    ' + str(err2xx))
+        print('Approximation error xx for s=' + str(s_int3) + ':    ' + str(err3xx))
+        self.assertTrue(err2xx < err1xx)
+        self.assertTrue(err3xx < err2xx)
+        
+        print('Approximation error xy for s=' + str(s_int1) + ':    ' + str(err1xy))
+        print('Approximation error xy for s=' + str(s_int2) + ':    ' + str(err2xy))
+        print('Approximation error xy for s=' + str(s_int3) + ':    ' + str(err3xy))
+        self.assertTrue(err2xy < err1xy)
+        self.assertTrue(err3xy < err2xy)
+        
+    def test_sparse(self):
+        '''
+        Test scipy.sparse input of the function "osnap"
+        With the same random seed, the sketch of a sparse matrix
+        must be the same as the sketch of its dense copy.
+        '''
+        a_mat = x_mat * (numpy.random.rand(m_int, n_int) < 0.05)
+        a_sparse_mat = scipy.sparse.csr_matrix(a_mat)
+        s_int = 400
+        
+        numpy.random.seed(0)
+        c1_mat = osnap.osnap(a_mat, s_int, 4)
+        numpy.random.seed(0)
+        c2_mat = osnap.osnap(a_sparse_mat, s_int, 4)
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        
+        numpy.random.seed(0)
+        c1_mat, d1_mat = osnap.osnap2(a_mat, y_mat, s_int, 4)
+        numpy.random.seed(0)
+        c2_mat, d2_mat = osnap.osnap2(a_sparse_mat, scipy.sparse.csr_matrix(y_mat), s_int, 4)
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        self.assertTrue(numpy.allclose(d1_mat, d2_mat))
+        
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -1,4 +1,5 @@
 import numpy
+import scipy.sparse
 import unittest
 import sys
 
@@ -146,6 +147,73 @@ class TestCountSketch(unittest.TestCase):
         self.assertTrue(err2xy < err1xy)
         self.assertTrue(err3xy < err2xy)
         
+    def test_sparse(self):
+        '''
+        Test scipy.sparse input of the function "srft"
+        With the same random seed, the sketch of a sparse matrix
+        must be the same as the sketch of its dense copy.
+        '''
+        a_mat = x_mat * (numpy.random.rand(m_int, n_int) < 0.05)
+        a_sparse_mat = scipy.sparse.csr_matrix(a_mat)
+        s_int = 400
+        
+        numpy.random.seed(0)
+        c1_mat = srft.srft(a_mat, s_int)
+        numpy.random.seed(0)
+        c2_mat = srft.srft(a_sparse_mat, s_int)
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        
+        numpy.random.seed(0)
+        c1_mat, d1_mat = srft.srft2(a_mat, y_mat, s_int)
+        numpy.random.seed(0)
+        c2_mat, d2_mat = srft.srft2(a_sparse_mat, scipy.sparse.csr_matrix(y_mat), s_int)
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        self.assertTrue(numpy.allclose(d1_mat, d2_mat))
+        
+    def test_pruned(self):
+        '''
+        Test the pruned mode of "srft"
+        It must equal the full real FFT of the zero-padded rows at the sampled columns,
+        and the approximation error should decrease as s_int increases.
+        '''
+        s_int = 300
+        l_int, q_int, p_int = srft.pruned_size(n_int, s_int)
+        sign_vec = numpy.random.choice(2, n_int) * 2 - 1
+        idx_vec = numpy.random.choice(p_int, s_int, replace=False)
+        c1_mat = srft.srft_pruned_apply(x_mat, sign_vec, idx_vec)
+        a_mat = numpy.zeros((m_int, p_int))
+        a_mat[:, 0:n_int] = x_mat * sign_vec.reshape(1, n_int)
+        c2_mat = srft.realfft_row(a_mat)[:, idx_vec] * numpy.sqrt(p_int / s_int)
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        
+        c_mat, d_mat = srft.srft2(x_mat, y_mat, s_int, pruned=True)
+        self.assertEqual(c_mat.shape[1], s_int)
+        self.assertEqual(d_mat.shape[1], s_int)
+        
+        repeat = 10
+        err1 = 0
+        err2 = 0
+        for i in range(repeat):
+            c_mat = srft.srft(x_mat, 150, pruned=True)
+            err1 += numpy.linalg.norm(xx_mat - numpy.dot(c_mat, c_mat.T), ord='fro') / xx_norm
+            c_mat = srft.srft(x_mat, 1500, pruned=True)
+            err2 += numpy.linalg.norm(xx_mat - numpy.dot(c_mat, c_mat.T), ord='fro') / xx_norm
+        print('Approximation error of pruned SRFT for s=150:    ' + str(err1 / repeat))
+        print('Approximation error of pruned SRFT for s=1500:    ' + str(err2 / repeat))
+        self.assertTrue(err2 < err1)
+        
+    def test_workers(self):
+        '''
+        Test the multi-threaded "srft"
+        With the same random seed, the sketch must not depend on the number of threads.
+        '''
+        s_int = 400
+        numpy.random.seed(0)
+        c1_mat = srft.srft(x_mat, s_int)
+        for workers in [2, 3, -1]:
+            numpy.random.seed(0)
+            c2_mat = srft.srft(x_mat, s_int, workers=workers)
+            self.assertTrue(numpy.allclose(c1_mat, c2_mat))
         
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
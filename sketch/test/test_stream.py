@@ -0,0 +1,85 @@
+import numpy
+import scipy.sparse
+import tempfile
+import unittest
+import os
+import sys
+
+PyRLA_dir = '../../'
+sys.path.append(PyRLA_dir)
+
+from sketch import operators, stream
+
+file_name = PyRLA_dir + 'data/YearPredictionMSD.npy'
+rawdata_mat = numpy.load(file_name, mmap_mode='r')
+n_int = 20000
+x_mat = numpy.array(rawdata_mat[0:n_int, 1:]) # n-by-d, the rows are streamed
+d_int = x_mat.shape[1]
+
+
+operator_list = [operators.GaussianOperator, operators.CountSketchOperator, operators.OSNAPOperator,
+                 operators.SRFTOperator, operators.SRHTOperator, operators.SamplingOperator]
+
+class TestStream(unittest.TestCase):
+    def test_rows(self):
+        '''
+        The rows of S must agree with the in-memory sketch S^T * B.
+        '''
+        s_int = 50
+        for op_class in operator_list:
+            op = op_class(n_int, s_int, seed=0)
+            c1_mat = op.apply_left(x_mat)
+            c2_mat = stream.sketch_chunks(op, stream.iter_rows(x_mat, 3000))
+            self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+        op = operators.SRFTOperator(n_int, s_int, seed=0, pruned=True)
+        c1_mat = op.apply_left(x_mat)
+        c2_mat = stream.sketch_chunks(op, stream.iter_rows(x_mat, 3000))
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+
+    def test_sparse(self):
+        b_mat = x_mat * (numpy.random.rand(n_int, d_int) < 0.05)
+        chunk_list = [scipy.sparse.csr_matrix(b_mat[i:i+4000, :]) for i in range(0, n_int, 4000)]
+        s_int = 50
+        for op_class in operator_list:
+            op = op_class(n_int, s_int, seed=1)
+            c1_mat = op.apply_left(b_mat)
+            c2_mat = stream.sketch_chunks(op, chunk_list)
+            self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+
+    def test_memmap(self):
+        '''
+        The streaming functions must agree with the operators applied to A = B^T.
+        '''
+        s_int = 100
+        b_mat = rawdata_mat[0:n_int, :]
+        for stream_func, op_class in [(stream.countsketch_stream, operators.CountSketchOperator),
+                                      (stream.gaussian_stream, operators.GaussianOperator),
+                                      (stream.srft_stream, operators.SRFTOperator)]:
+            c1_mat = op_class(n_int, s_int, seed=5).apply(x_mat.T)
+            chunk_iter = stream.iter_rows(b_mat, 2500, col_idx=slice(1, None))
+            c2_mat = stream_func(chunk_iter, s_int, n_int=n_int, seed=5)
+            self.assertEqual(c2_mat.shape, (d_int, s_int))
+            self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+            c3_mat = stream_func(x_mat, s_int, seed=5, chunk_rows=7000)
+            self.assertTrue(numpy.allclose(c1_mat, c3_mat))
+
+    def test_npy(self):
+        s_int = 100
+        with tempfile.TemporaryDirectory() as dir_name:
+            npy_name = os.path.join(dir_name, 'b.npy')
+            numpy.save(npy_name, numpy.array(rawdata_mat[0:n_int, :]))
+            chunk_iter = stream.iter_npy(npy_name, 3000, col_idx=slice(1, None))
+            c1_mat = stream.countsketch_stream(chunk_iter, s_int, n_int=n_int, seed=2)
+        c2_mat = stream.countsketch_stream(x_mat, s_int, seed=2)
+        self.assertTrue(numpy.allclose(c1_mat, c2_mat))
+
+    def test_num_rows(self):
+        op = operators.CountSketchOperator(n_int, 10, seed=0)
+        with self.assertRaises(ValueError):
+            stream.sketch_chunks(op, stream.iter_rows(x_mat[0:n_int-1, :]))
+        with self.assertRaises(ValueError):
+            stream.countsketch_stream(stream.iter_rows(x_mat), 10)
+        
+        
+if __name__ == '__main__':
+    unittest.main()